@@ -0,0 +1,298 @@
+"""Dose events in columnar form and adherence analytics over them.
+
+Once a day is over, every dose that was scheduled for it becomes one
+event: the day, the medicine, the scheduled minute, the delay until it
+was acknowledged (minutes) and the outcome (on time, late or missed).
+Events are stored per patient in monthly partitions under
+history/events/YYYY-MM.events, one packed array per column, so a year
+of history loads without parsing anything and is aggregated with a
+handful of vector operations: adherence, on-time rate, average delay
+and missed-dose streaks per medicine or per patient.
+
+Uses NumPy when installed and plain Python loops otherwise.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+import os
+import sys
+import tempfile
+
+from codec import dumps, loads
+from records import TIME_LABELS
+from storage import atomic_write_json
+
+try:
+    import numpy as np
+except ImportError:  # NumPy opsional; tanpa NumPy dihitung per baris
+    np = None
+
+ON_TIME, LATE, MISSED = 0, 1, 2
+OUTCOME_LABELS = ("Tepat waktu", "Terlambat", "Terlewat")
+# Kolom dan typecode array-nya; hari disimpan sebagai date.toordinal()
+COLUMNS = (('day', 'i'), ('medicine_id', 'i'), ('minute', 'h'), ('delay', 'i'), ('outcome', 'b'))
+FILE_VERSION = 1
+
+
+def on_time_from_env(default=60):
+    """On-time window in minutes from MEDIMATE_ON_TIME_MINUTES, or `default` if unset or invalid"""
+    value = os.environ.get("MEDIMATE_ON_TIME_MINUTES")
+    if value is None:
+        return default
+    try:
+        minutes = int(value)
+    except ValueError:
+        minutes = -1
+    if minutes < 0:
+        print(f"[WARNING] MEDIMATE_ON_TIME_MINUTES={value!r} tidak valid, memakai {default} menit")
+        return default
+    return minutes
+
+
+# Dosis yang dikonfirmasi lebih dari ini setelah jadwalnya dihitung terlambat
+ON_TIME_MINUTES = on_time_from_env()
+
+
+class DoseEvents:
+    """Dose events as parallel columns (array.array), ordered by day and minute"""
+
+    __slots__ = tuple(name for name, _ in COLUMNS)
+
+    def __init__(self, columns=None):
+        for name, typecode in COLUMNS:
+            setattr(self, name, columns[name] if columns else array(typecode))
+
+    def __len__(self):
+        return len(self.day)
+
+    def append(self, day, medicine_id, minute, delay, outcome):
+        self.day.append(day)
+        self.medicine_id.append(medicine_id)
+        self.minute.append(minute)
+        self.delay.append(delay)
+        self.outcome.append(outcome)
+
+    def extend(self, other):
+        for name in self.__slots__:
+            getattr(self, name).extend(getattr(other, name))
+
+    def between(self, first, last):
+        """Events of the days first..last (ordinals, inclusive)"""
+        lo = bisect_left(self.day, first)
+        hi = bisect_right(self.day, last)
+        if lo == 0 and hi == len(self.day):
+            return self
+        return DoseEvents({name: getattr(self, name)[lo:hi] for name in self.__slots__})
+
+
+def day_events(day, doses, taken, on_time_minutes=ON_TIME_MINUTES):
+    """Events of one finished day.
+
+    `doses` are the scheduled (minute, medicine_id) pairs in time order;
+    `taken` maps (medicine_id, "HH:MM") to the ISO time it was
+    acknowledged, as recorded in the dose history.
+    """
+    events = DoseEvents()
+    ordinal = day.toordinal()
+    midnight = datetime(day.year, day.month, day.day)
+    for minute, medicine_id in doses:
+        taken_at = taken.get((medicine_id, TIME_LABELS[minute]))
+        if taken_at is None:
+            events.append(ordinal, medicine_id, minute, 0, MISSED)
+            continue
+        try:
+            delay = int((datetime.fromisoformat(taken_at) - midnight).total_seconds() // 60) - minute
+        except (TypeError, ValueError):
+            delay = 0
+        events.append(ordinal, medicine_id, minute, delay, ON_TIME if delay <= on_time_minutes else LATE)
+    return events
+
+
+def taken_times(entries):
+    """{(medicine_id, time): taken_at} from dose history entries (first acknowledgement wins)"""
+    taken = {}
+    for entry in entries:
+        taken.setdefault((entry.get('medicine_id'), entry.get('time')), entry.get('taken_at'))
+    return taken
+
+
+class EventLog:
+    """Monthly column files of one patient's dose events.
+
+    Each partition is a JSON header line followed by the raw bytes of
+    every column. Partitions are rewritten whole (atomically) when days
+    are appended, which happens once per finished day, and cached in
+    memory until their file changes. closed.json records the last day
+    that has been turned into events.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._cache = {}        # path -> (mtime_ns, DoseEvents)
+        self._closed = None
+
+    def closed_through(self):
+        """Last day already recorded as events, or None"""
+        if self._closed is None:
+            path = os.path.join(self.directory, "closed.json")
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    self._closed = date.fromisoformat(loads(f.read())['closed_through'])
+        return self._closed
+
+    def append(self, events, closed_through):
+        """Add the events of newly finished days (later than any stored)"""
+        months = {}
+        for ordinal in sorted(set(events.day)):
+            day = date.fromordinal(ordinal)
+            months.setdefault((day.year, day.month), []).append(ordinal)
+        for (year, month), ordinals in months.items():
+            path = self._path(year, month)
+            partition = DoseEvents()
+            partition.extend(self._read(path))
+            partition.extend(events.between(ordinals[0], ordinals[-1]))
+            self._write(path, partition)
+        atomic_write_json(os.path.join(self.directory, "closed.json"),
+                          {'closed_through': closed_through.isoformat()})
+        self._closed = closed_through
+
+    def load(self, first, last):
+        """Events of the days first..last (dates, inclusive)"""
+        events = DoseEvents()
+        year, month = first.year, first.month
+        while (year, month) <= (last.year, last.month):
+            events.extend(self._read(self._path(year, month)).between(first.toordinal(), last.toordinal()))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return events
+
+    def _path(self, year, month):
+        return os.path.join(self.directory, f"{year:04d}-{month:02d}.events")
+
+    def _read(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return DoseEvents()
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path, 'rb') as f:
+            header = loads(f.readline())
+            columns = {}
+            for name, typecode in COLUMNS:
+                column = array(typecode)
+                column.fromfile(f, header['rows'])
+                if header['byteorder'] != sys.byteorder:
+                    column.byteswap()
+                columns[name] = column
+        events = DoseEvents(columns)
+        self._cache[path] = (mtime, events)
+        return events
+
+    def _write(self, path, events):
+        os.makedirs(self.directory, exist_ok=True)
+        header = {'version': FILE_VERSION, 'rows': len(events), 'byteorder': sys.byteorder,
+                  'columns': [f"{name}:{typecode}" for name, typecode in COLUMNS]}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-", suffix=".events")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(dumps(header) + b"\n")
+                for name in DoseEvents.__slots__:
+                    getattr(events, name).tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._cache.pop(path, None)
+
+
+def summarize(keys, events):
+    """Adherence per group: {key: stats} for the group key of every event.
+
+    `keys` is one int per event (e.g. the medicine_id column). Events of
+    a group must be in time order for the streaks, which they are when
+    they come from EventLog. Stats: scheduled, taken, on_time, late,
+    missed, adherence and on_time_rate (0..1), avg_delay (minutes, taken
+    doses only, early counts as 0), longest_missed_streak and
+    current_missed_streak (consecutive missed doses, the latter ending at
+    the last dose of the period).
+    """
+    if not len(events):
+        return {}
+    if np is None:
+        return _summarize_rows(keys, events)
+    keys = np.asarray(keys, dtype=np.int64)
+    outcome = np.frombuffer(events.outcome, dtype=np.int8)
+    delay = np.frombuffer(events.delay, dtype=np.int32)
+    unique, group = np.unique(keys, return_inverse=True)
+    count = len(unique)
+    counts = np.bincount(group * 3 + outcome, minlength=count * 3).reshape(count, 3)
+    taken = outcome != MISSED
+    delay_total = np.bincount(group[taken], weights=np.maximum(delay[taken], 0), minlength=count)
+
+    # Streak dosis terlewat: urutkan per grup (stable, urutan waktu tetap),
+    # lalu panjang run = jarak ke "pemutus" terakhir (dosis diminum atau awal grup)
+    order = np.argsort(group, kind='stable')
+    group = group[order]
+    missed = ~taken[order]
+    index = np.arange(len(group))
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    breaks = np.where(missed, -1, index)
+    breaks[starts] = np.where(missed[starts], starts - 1, starts)
+    runs = np.where(missed, index - np.maximum.accumulate(breaks), 0)
+    longest = np.maximum.reduceat(runs, starts)
+    current = runs[np.r_[starts[1:], len(group)] - 1]
+
+    stats = {}
+    for row, key in enumerate(unique.tolist()):
+        on_time, late, missed_count = counts[row].tolist()
+        stats[key] = _stats(on_time, late, missed_count, float(delay_total[row]),
+                            int(longest[row]), int(current[row]))
+    return stats
+
+
+def _summarize_rows(keys, events):
+    totals = {}   # key -> [on_time, late, missed, delay_total, longest, current]
+    for key, outcome, delay in zip(keys, events.outcome, events.delay):
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = [0, 0, 0, 0.0, 0, 0]
+        total[outcome] += 1
+        if outcome == MISSED:
+            total[5] += 1
+            total[4] = max(total[4], total[5])
+        else:
+            total[3] += max(delay, 0)
+            total[5] = 0
+    return {key: _stats(*total) for key, total in totals.items()}
+
+
+def _stats(on_time, late, missed, delay_total, longest, current):
+    taken = on_time + late
+    scheduled = taken + missed
+    return {
+        'scheduled': scheduled,
+        'taken': taken,
+        'on_time': on_time,
+        'late': late,
+        'missed': missed,
+        'adherence': taken / scheduled if scheduled else 0.0,
+        'on_time_rate': on_time / scheduled if scheduled else 0.0,
+        'avg_delay': delay_total / taken if taken else 0.0,
+        'longest_missed_streak': longest,
+        'current_missed_streak': current,
+    }
+
+
+def combine(rows):
+    """Totals over several stats rows (streaks: the longest of any row)"""
+    on_time = sum(row['on_time'] for row in rows)
+    late = sum(row['late'] for row in rows)
+    missed = sum(row['missed'] for row in rows)
+    delay_total = sum(row['avg_delay'] * row['taken'] for row in rows)
+    return _stats(on_time, late, missed, delay_total,
+                  max((row['longest_missed_streak'] for row in rows), default=0),
+                  max((row['current_missed_streak'] for row in rows), default=0))
@@ -0,0 +1,81 @@
+from datetime import datetime, time, timedelta
+import heapq
+
+from schedule_index import parse_time
+
+
+class AlarmScheduler:
+    """Fires due doses from a priority queue using one single-shot timer.
+
+    The scheduler does not own a timer: `arm_timer(seconds)` is called
+    with the delay until the next wake-up (the Qt app passes a single-shot
+    QTimer, tests can pass a fake). `clock` returns the current datetime.
+    Every wake-up fires all doses that became due since the previous one,
+    so a stalled event loop delays alarms but never drops them. Fired
+    items carry the day they were scheduled for as 'date' ("YYYY-MM-DD"),
+    so a dose caught up after midnight still belongs to its own day.
+    """
+
+    # Batas tidur agar perubahan jam sistem / suspend tetap terkejar
+    MAX_SLEEP = 300
+
+    def __init__(self, get_schedule, on_due, arm_timer, clock=datetime.now):
+        self.get_schedule = get_schedule
+        self.on_due = on_due
+        self.arm_timer = arm_timer
+        self.clock = clock
+        self._queue = []
+        self._day = None
+        now = clock()
+        # Dosis di menit yang sedang berjalan tetap dibunyikan
+        self._fired_until = now.replace(second=0, microsecond=0) - timedelta(microseconds=1)
+
+    def start(self):
+        self.reschedule()
+
+    def reschedule(self):
+        """Rebuild the queue from the current schedule and re-arm the timer"""
+        self._build_queue(self.clock())
+        self._arm(self.clock())
+
+    def wake(self):
+        """Timer callback: fire everything that is due and re-arm"""
+        now = self.clock()
+        due = self._pop_due(now)
+        if now.date() != self._day:
+            self._build_queue(now)
+            due.extend(self._pop_due(now))
+        self._fired_until = max(self._fired_until, now)
+        self._arm(now)
+        # Callback dipanggil terakhir karena bisa membuka dialog / reschedule
+        for item in due:
+            if item['status'] == 'Belum Diminum':
+                self.on_due(item)
+
+    def next_due(self):
+        """Datetime of the next queued dose, or None"""
+        return self._queue[0][0] if self._queue else None
+
+    def _build_queue(self, now):
+        self._day = now.date()
+        queue = []
+        for seq, item in enumerate(self.get_schedule()):
+            minute = parse_time(item['time'])
+            due = datetime.combine(self._day, time(minute // 60, minute % 60))
+            if due > self._fired_until:
+                queue.append((due, seq, item))
+        heapq.heapify(queue)
+        self._queue = queue
+
+    def _pop_due(self, now):
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            due_at, _, item = heapq.heappop(self._queue)
+            due.append(dict(item, date=due_at.date().isoformat()))
+        return due
+
+    def _arm(self, now):
+        midnight = datetime.combine(self._day + timedelta(days=1), time())
+        target = self._queue[0][0] if self._queue else midnight
+        delay = (min(target, midnight) - now).total_seconds()
+        self.arm_timer(max(0, min(delay, self.MAX_SLEEP)))
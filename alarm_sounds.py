@@ -0,0 +1,138 @@
+import os
+import time
+
+from PyQt6.QtCore import QUrl
+
+SOUND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# sound id -> (file, volume); urutan = dari yang paling mendesak
+SOUNDS = {
+    'urgent': ("alarm.wav", 1.0),
+    'default': ("alarm.wav", 0.7),
+    'gentle': ("alarm.mp3", 0.5),
+}
+
+# Prioritas obat (field 'priority') -> sound id
+PRIORITY_SOUNDS = {
+    'Tinggi': 'urgent',
+    'Normal': 'default',
+    'Rendah': 'gentle',
+}
+
+LATENCY_TARGET_MS = 50
+
+
+def sound_for(medicine):
+    """Sound id for a medicine: its own 'alarm_sound', else by priority"""
+    sound_id = medicine.get('alarm_sound')
+    if sound_id in SOUNDS:
+        return sound_id
+    return PRIORITY_SOUNDS.get(medicine.get('priority'), 'default')
+
+
+def most_urgent(sound_ids):
+    order = list(SOUNDS)
+    return min(sound_ids, key=order.index, default='default')
+
+
+class AlarmSoundBank:
+    """Alarm tones loaded and decoded once at startup, keyed by sound id.
+
+    WAV files play through QSoundEffect (decoded into memory, lowest
+    latency); anything else, like alarm.mp3, goes through a QMediaPlayer
+    whose source is set up front so only playback is left at alarm time.
+    play() takes the perf_counter() timestamp of the trigger, and the
+    delay until audio is actually coming out is kept as the
+    trigger-to-audio latency: for QSoundEffect when it reports playing,
+    for QMediaPlayer at the first position update past 0 (its
+    PlayingState is set as soon as play() is called, before anything has
+    been decoded), so mp3 latencies are an upper bound that may include
+    up to one position-notify interval.
+
+    QtMultimedia is only imported here, so it stays off the startup path.
+    If it cannot be loaded the bank stays silent instead of failing.
+    """
+
+    def __init__(self, sounds=SOUNDS, directory=SOUND_DIR):
+        self._players = {}
+        self._current = None
+        self._triggered_at = None
+        self.latencies = []  # ms, per alarm
+        try:
+            from PyQt6 import QtMultimedia
+        except ImportError as e:
+            print(f"[WARNING] QtMultimedia tidak tersedia ({e}). Alarm tidak akan berbunyi.")
+            return
+        self.qt = QtMultimedia
+        for sound_id, (filename, volume) in sounds.items():
+            path = os.path.join(directory, filename)
+            if not os.path.exists(path):
+                print(f"[WARNING] File {filename} tidak ditemukan. Nada '{sound_id}' tidak akan berbunyi.")
+                continue
+            self._players[sound_id] = self._load(path, volume)
+
+    def _load(self, path, volume):
+        if path.lower().endswith(".wav"):
+            effect = self.qt.QSoundEffect()
+            effect.setSource(QUrl.fromLocalFile(path))
+            effect.setLoopCount(self.qt.QSoundEffect.Loop.Infinite.value)
+            effect.setVolume(volume)
+            effect.playingChanged.connect(lambda: effect.isPlaying() and self._on_started())
+            return effect
+        QMediaPlayer = self.qt.QMediaPlayer
+        player = QMediaPlayer()
+        output = self.qt.QAudioOutput(player)
+        output.setVolume(volume)
+        player.setAudioOutput(output)
+        player.setSource(QUrl.fromLocalFile(path))
+        player.setLoops(QMediaPlayer.Loops.Infinite)
+        # Posisi baru bergerak setelah buffer pertama ter-decode dan diputar
+        player.positionChanged.connect(
+            lambda position: position > 0 and player is self._current and self._on_started())
+        return player
+
+    def play(self, sound_id, triggered_at=None):
+        """Start looping `sound_id` (falls back to 'default'), stopping any other tone"""
+        player = self._players.get(sound_id) or self._players.get('default')
+        if player is None:
+            return
+        if player is self._current and self.is_playing():
+            return
+        self.stop()
+        self._triggered_at = triggered_at if triggered_at is not None else time.perf_counter()
+        self._current = player
+        player.play()
+
+    def stop(self):
+        if self._current is not None:
+            self._current.stop()
+        self._current = None
+        self._triggered_at = None
+
+    def is_playing(self):
+        player = self._current
+        if player is None:
+            return False
+        if isinstance(player, self.qt.QSoundEffect):
+            return player.isPlaying()
+        return player.playbackState() == self.qt.QMediaPlayer.PlaybackState.PlayingState
+
+    def metrics(self):
+        """Trigger-to-audio latency stats in milliseconds"""
+        latencies = self.latencies
+        return {
+            'alarms': len(latencies),
+            'first_ms': latencies[0] if latencies else 0.0,
+            'last_ms': latencies[-1] if latencies else 0.0,
+            'max_ms': max(latencies, default=0.0),
+            'avg_ms': sum(latencies) / len(latencies) if latencies else 0.0,
+        }
+
+    def _on_started(self):
+        if self._triggered_at is None:
+            return
+        latency = (time.perf_counter() - self._triggered_at) * 1000
+        self._triggered_at = None
+        self.latencies.append(latency)
+        note = "" if latency <= LATENCY_TARGET_MS else f" (di atas target {LATENCY_TARGET_MS} ms)"
+        print(f"Alarm audio latency: {latency:.1f} ms{note}")
@@ -0,0 +1,386 @@
+"""Micro-benchmarks for MediMate's data layer and row widgets.
+
+Usage: python benchmark.py [name ...]   (no name runs everything)
+"""
+import contextlib
+from datetime import date, datetime, timedelta
+import io
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import adherence
+from codec import available_codecs, dumps, loads, paused_gc
+from daemon_client import DaemonClient
+import forecast
+from import_export import export_medicines, import_medicines
+from medicine_manager import MedicineManager
+from patients import PatientRegistry
+from records import Medicine, decode_medicines
+from storage import MemoryStorage, open_storage
+
+SIZES = (100, 1_000, 10_000, 100_000)
+CODEC_SIZES = (1_000, 10_000, 100_000)
+
+
+def make_medicines(count, seed=42):
+    """Generate `count` synthetic medicine records"""
+    rng = random.Random(seed)
+    names = ["Paracetamol", "Amoxicillin", "Metformin", "Amlodipin", "Omeprazol",
+             "Simvastatin", "Captopril", "Ibuprofen", "Cetirizin", "Vitamin C"]
+    medicines = []
+    for i in range(1, count + 1):
+        times = sorted({f"{rng.randrange(24):02d}:{rng.choice((0, 15, 30, 45)):02d}"
+                        for _ in range(rng.randint(1, 3))})
+        medicines.append({
+            'id': i,
+            'name': f"{rng.choice(names)} {i}",
+            'dose': f"{rng.choice((1, 2, 500))} {rng.choice(('tablet', 'mg', 'kapsul'))}",
+            'stock': rng.randint(0, 120),
+            'stock_unit': 'tablet',
+            'times': times,
+            'notes': "",
+        })
+    return medicines
+
+
+def make_manager(count):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return MedicineManager(MemoryStorage(make_medicines(count)))
+
+
+def per_op_us(fn, repeat):
+    """Run fn `repeat` times and return the mean cost in microseconds"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for i in range(repeat):
+            fn(i)
+        elapsed = time.perf_counter() - start
+    return elapsed / repeat * 1e6
+
+
+def print_table(title, columns, rows):
+    print(f"\n{title}")
+    print("  " + "".join(f"{c:>14}" for c in columns))
+    for row in rows:
+        print("  " + "".join(f"{v:>14.2f}" if isinstance(v, float) else f"{v:>14}" for v in row))
+
+
+def bench_id_index():
+    """Lookup / edit / add cost per operation should stay flat as inventory grows"""
+    rows = []
+    for size in SIZES:
+        manager = make_manager(size)
+        ids = [random.randint(1, size) for _ in range(1000)]
+        lookup = per_op_us(lambda i: manager.get_medicine_by_id(ids[i]), 1000)
+        edit = per_op_us(lambda i: manager.edit_medicine(
+            ids[i], {'name': "Edit", 'dose': "1 tablet", 'stock': 5, 'times': ["08:00"]}), 1000)
+        add = per_op_us(lambda i: manager.add_medicine(
+            {'name': "Baru", 'dose': "1 tablet", 'stock': 5, 'times': ["08:00"]}), 1000)
+        rows.append((size, lookup, edit, add))
+    print_table("id index (us/op)", ("records", "lookup", "edit", "add"), rows)
+
+
+def bench_search():
+    """As-you-type search latency over name, dose and notes"""
+    queries = ["p", "para", "paracetamol 1", "mol", "500 mg", "vitamin c", "xyz"]
+    rows = []
+    for size in SIZES:
+        manager = make_manager(size)
+        rows.append((size,) + tuple(
+            per_op_us(lambda i, q=query: manager.search(q), 20) / 1000 for query in queries))
+    print_table("search (ms/query)", ("records",) + tuple(repr(q) for q in queries), rows)
+
+
+def bench_row_build():
+    """Build + polish cost of a dashboard row: shared app stylesheet vs one parsed per row"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    from medimate import MedicationRow
+    from theme import STYLESHEET
+
+    app = QApplication.instance() or QApplication([])
+    app.setStyleSheet(STYLESHEET)
+    rows = []
+    for count in (100, 1_000):
+        def build(i, per_row_sheet):
+            row = MedicationRow("08:00", f"Paracetamol {i} - 500 mg", "Belum Diminum")
+            if per_row_sheet:
+                row.setStyleSheet(STYLESHEET)
+            row.ensurePolished()
+            row.deleteLater()
+        shared = per_op_us(lambda i: build(i, False), count)
+        per_row = per_op_us(lambda i: build(i, True), count)
+        app.processEvents()
+        rows.append((count, shared, per_row))
+    print_table("row build (us/row)", ("rows", "app sheet", "per-row sheet"), rows)
+
+
+def bench_patients():
+    """Cross-patient due queries stay cheap without opening every shard"""
+    rows = []
+    for count in (100, 1_000):
+        with tempfile.TemporaryDirectory() as data_dir:
+            with contextlib.redirect_stdout(io.StringIO()):
+                registry = PatientRegistry(data_dir, max_open=8)
+                for i in range(count):
+                    patient = registry.add_patient(f"Pasien {i}")
+                    storage = open_storage("json", registry.shard_dir(patient['id']))
+                    storage.save_all(make_medicines(5, seed=i))
+                    storage.close()
+                registry.close()
+            load = per_op_us(lambda i: PatientRegistry(data_dir, max_open=8), 5) / 1000
+            with contextlib.redirect_stdout(io.StringIO()):
+                registry = PatientRegistry(data_dir, max_open=8)
+                registry.due_between("00:00", "23:59")  # ringkasan kosong diisi sekali
+                registry.flush()
+            due_window = per_op_us(lambda i: registry.due_between("08:00", "09:00"), 100) / 1000
+            due_now = per_op_us(lambda i: registry.due_now(), 10) / 1000
+            ids = [random.randint(2, count + 1) for _ in range(200)]
+            open_shard = per_op_us(lambda i: registry.manager(ids[i]), 200) / 1000
+            rows.append((count, load, due_window, due_now, open_shard, registry.open_count()))
+            with contextlib.redirect_stdout(io.StringIO()):
+                registry.close()
+    print_table("patients (ms/op)", ("patients", "registry", "due window", "due now", "open shard", "open"), rows)
+
+
+def bench_daemon():
+    """Round trips per second against a daemon process over its Unix socket"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        socket_path = os.path.join(data_dir, "bench.sock")
+        daemon = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "daemon.py"),
+             "--socket", socket_path, "--data-dir", data_dir],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.time() + 10
+            while not os.path.exists(socket_path) and time.time() < deadline:
+                time.sleep(0.05)
+            client = DaemonClient(socket_path)
+            for medicine in make_medicines(1_000):
+                client.call('add', patient_id=1, medicine=medicine)
+            ids = [random.randint(1, 1_000) for _ in range(5_000)]
+            rows = []
+            for name, request in (
+                    ('ping', lambda i: client.call('ping')),
+                    ('get', lambda i: client.call('get', patient_id=1, medicine_id=ids[i])),
+                    ('edit', lambda i: client.call('edit', patient_id=1, medicine_id=ids[i], medicine={
+                        'name': "Edit", 'dose': "1 tablet", 'stock': i, 'times': ["08:00"]})),
+                    ('ack', lambda i: client.call('ack', patient_id=1, doses=[[ids[i], "08:00"]])),
+                    ('schedule', lambda i: client.call('schedule', patient_id=1))):
+                repeat = 100 if name == 'schedule' else 5_000
+                us = per_op_us(request, repeat)
+                rows.append((name, us, 1e6 / us))
+            client.close()
+        finally:
+            daemon.send_signal(signal.SIGINT)
+            daemon.wait(10)
+    print_table("daemon, 1 client, 1,000 medicines", ("method", "us/request", "requests/s"), rows)
+
+
+def bench_codec():
+    """Snapshot save / load per JSON backend, compact vs pretty, plus schema validation"""
+    codecs = available_codecs()
+    rows = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        path = os.path.join(data_dir, "medicines.json")
+        for size in CODEC_SIZES:
+            medicines = make_medicines(size)
+            for name, codec in codecs.items():
+                for pretty in (False, True):
+                    def save(i):
+                        with open(path, 'wb') as f:
+                            f.write(codec.dumps(medicines, pretty))
+
+                    def load(i):
+                        with open(path, 'rb') as f, paused_gc():
+                            return codec.loads(f.read())
+                    repeat = 20 if size <= 10_000 else 3
+                    save_ms = per_op_us(save, repeat) / 1000
+                    load_ms = per_op_us(load, repeat) / 1000
+                    records = load(0)
+                    validate_ms = per_op_us(lambda i: decode_medicines(records, path), repeat) / 1000
+                    rows.append((size, name, "pretty" if pretty else "compact",
+                                 os.path.getsize(path) // 1024, save_ms, load_ms, validate_ms))
+    print_table("json codec (ms per snapshot)",
+                ("records", "codec", "mode", "size KiB", "save", "load", "validate"), rows)
+
+
+def bench_forecast():
+    """Days-until-empty for the whole inventory (NumPy vs plain lists) and per change"""
+    numpy = forecast.np
+    rows = []
+    for size in SIZES:
+        medicines = [Medicine.from_dict(med) for med in make_medicines(size)]
+        row = [size]
+        for np in (numpy, None):
+            if np is None and numpy is None:
+                row += ["-", "-"]
+                continue
+            forecast.np = np
+            engine = forecast.StockForecast()
+            row.append(per_op_us(lambda i: engine.rebuild(medicines), 5) / 1000)
+            row.append(per_op_us(lambda i: engine.update(medicines[i % size]), 1000))
+        forecast.np = numpy
+        rows.append(tuple(row))
+    print_table("stock forecast", ("records", "rebuild ms", "update us", "rebuild ms*", "update us*"), rows)
+    print("  * tanpa NumPy")
+
+
+def traced_bytes(build):
+    """Memory still held by what build() returns (tracemalloc)"""
+    tracemalloc.start()
+    try:
+        result = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return current
+
+
+def bench_records():
+    """Memory per record after load: decoded dicts vs Medicine slots"""
+    rows = []
+    for size in SIZES:
+        data = dumps(make_medicines(size))
+        dict_bytes = traced_bytes(lambda: loads(data))
+        medicine_bytes = traced_bytes(lambda: [Medicine.from_dict(med) for med in loads(data)])
+        dicts = loads(data)
+        medicines = [Medicine.from_dict(med) for med in dicts]
+        with paused_gc():
+            convert_ms = per_op_us(lambda i: [Medicine.from_dict(med) for med in dicts], 3) / 1000
+            dump_ms = per_op_us(lambda i: [med.to_dict() for med in medicines], 3) / 1000
+        rows.append((size, dict_bytes / 2**20, medicine_bytes / 2**20,
+                     dict_bytes // size, medicine_bytes // size, convert_ms, dump_ms))
+    print_table("medicine records",
+                ("records", "dict MiB", "slots MiB", "dict B/rec", "slots B/rec", "from_dict ms", "to_dict ms"),
+                rows)
+
+
+IMPORT_SIZES = (1_000, 10_000, 50_000)
+
+
+def bench_import():
+    """Importing a CSV/JSON file into a JSON-backed manager (one bulk write)"""
+    rows = []
+    for size in IMPORT_SIZES:
+        medicines = [Medicine.from_dict(med) for med in make_medicines(size)]
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt in ("csv", "json"):
+                path = os.path.join(tmp, f"import.{fmt}")
+                export_medicines(medicines, path)
+                row = [size, fmt]
+                for workers in (1, None):
+                    def run(i):
+                        manager = MedicineManager(open_storage("json", os.path.join(tmp, f"{fmt}{workers}-{i}")))
+                        import_medicines(manager, path, workers=workers)
+                        manager.close()
+                    row.append(per_op_us(run, 1) / 1000)
+                rows.append(tuple(row))
+        # Pembanding: add_medicine per obat (satu tulisan journal per obat)
+        if size <= 1_000:
+            with tempfile.TemporaryDirectory() as tmp:
+                manager = make_manager(0)
+                manager.storage = open_storage("json", tmp)
+                one_by_one = per_op_us(lambda i: manager.add_medicine(medicines[i].to_dict()), size) * size / 1000
+                rows.append((size, "add_medicine", one_by_one, "-"))
+    print_table("import (ms per file)", ("records", "format", "1 thread", "pool"), rows)
+
+
+RECURRENCE_RULES = (
+    {'freq': 'weekly', 'byday': ['MO', 'WE', 'FR']},
+    {'freq': 'hourly', 'interval': 8},
+    {'freq': 'daily', 'interval': 2},
+    {'freq': 'daily', 'count': 20},
+    {'freq': 'daily', 'taper': [[5, "2 tablet"], [5, "1 tablet"]]},
+)
+
+
+def bench_recurrence():
+    """Expanding a year of doses across 1k medicines (share with a recurrence rule varies)"""
+    rows = []
+    start = datetime.combine(date.today(), datetime.min.time())
+    for share in (0.0, 0.5, 1.0):
+        medicines = make_medicines(1_000)
+        for i, medicine in enumerate(medicines[:int(len(medicines) * share)]):
+            medicine['recurrence'] = RECURRENCE_RULES[i % len(RECURRENCE_RULES)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager = MedicineManager(MemoryStorage(medicines))
+        week = (start, start + timedelta(days=7))
+        year_ms = per_op_us(lambda i: sum(1 for _ in manager.get_schedule_window(
+            start, start + timedelta(days=365))), 1) / 1000
+        doses = sum(1 for _ in manager.get_schedule_window(start, start + timedelta(days=365)))
+        manager.calendar.invalidate()
+        cold_week_ms = per_op_us(lambda i: sum(1 for _ in manager.get_schedule_window(*week)), 1) / 1000
+        week_ms = per_op_us(lambda i: sum(1 for _ in manager.get_schedule_window(*week)), 20) / 1000
+        today_ms = per_op_us(lambda i: manager.get_today_schedule(), 20) / 1000
+        rows.append((f"{share:.0%}", doses, year_ms, cold_week_ms, week_ms, today_ms))
+    print_table("recurrence (1k medicines, ms)",
+                ("with rule", "doses/year", "year", "week cold", "week cached", "today"), rows)
+
+
+def bench_adherence(patients=1_000, days=365):
+    """Adherence over a year of dose events for 1k patients (columnar files, NumPy vs plain)"""
+    rng = random.Random(7)
+    today = date.today()
+    last = today - timedelta(days=1)
+    first = last - timedelta(days=days - 1)
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        registry = PatientRegistry(tmp)
+        registry._patients[1]['schedule'] = []
+        for _ in range(patients - 1):
+            registry.add_patient("Pasien")
+        for patient_id in list(registry._patients):
+            events = adherence.DoseEvents()
+            for day in range(first.toordinal(), last.toordinal() + 1):
+                for medicine_id, minute in ((1, 480), (2, 480), (1, 1200), (3, 1260)):
+                    roll = rng.random()
+                    outcome = adherence.MISSED if roll < 0.1 else adherence.LATE if roll < 0.25 else adherence.ON_TIME
+                    events.append(day, medicine_id, minute, rng.randrange(0, 180) if outcome == adherence.LATE
+                                  else rng.randrange(-10, 30), outcome)
+            registry._event_log(patient_id).append(events, last)
+        rows = []
+        numpy = adherence.np
+        for np in (numpy, None):
+            if np is None and numpy is None:
+                continue
+            adherence.np = np
+            registry._event_logs = {}
+            cold_ms = per_op_us(lambda i: registry.adherence(first, last), 1) / 1000
+            warm_ms = per_op_us(lambda i: registry.adherence(first, last), 3) / 1000
+            patient_ms = per_op_us(lambda i: registry.adherence(first, last, 1 + i % patients), 50) / 1000
+            count = sum(row['scheduled'] for row in registry.adherence(first, last))
+            rows.append(("numpy" if np is not None else "plain", count, cold_ms, warm_ms, patient_ms))
+        adherence.np = numpy
+    print_table(f"adherence ({patients} patients x {days} days, ms)",
+                ("engine", "events", "all cold", "all cached", "1 patient"), rows)
+
+
+BENCHMARKS = {
+    'id-index': bench_id_index,
+    'search': bench_search,
+    'row-build': bench_row_build,
+    'patients': bench_patients,
+    'daemon': bench_daemon,
+    'codec': bench_codec,
+    'forecast': bench_forecast,
+    'records': bench_records,
+    'import': bench_import,
+    'recurrence': bench_recurrence,
+    'adherence': bench_adherence,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+            sys.exit(1)
+        BENCHMARKS[name]()
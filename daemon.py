@@ -0,0 +1,421 @@
+"""Headless MediMate: medicine data and alarms without a GUI session.
+
+Usage: python daemon.py [--socket PATH] [--data-dir DIR]
+
+The daemon owns the patient registry and the alarm scheduler and serves
+JSON-RPC 2.0 over a Unix socket, one JSON object per line. Clients that
+call "subscribe" also receive notifications: "due" for every dose that
+comes due, "changed" for every medicine change (any client's). The PyQt
+app connects as a thin client when a daemon is listening.
+"""
+import argparse
+import asyncio
+from datetime import date
+import inspect
+import os
+import signal
+import socket
+import sys
+import time
+
+from alarm_scheduler import AlarmScheduler
+from codec import loads
+from daemon_client import default_socket_path, encode_message
+from medicine_manager import MEDICINE_REMOVED
+from patients import PatientRegistry
+from recurrence import Recurrence
+from schedule_index import parse_time
+
+# Kode error JSON-RPC
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+NOT_FOUND = -32001
+
+TOPICS = ('due', 'changes')
+# Klien yang tidak membaca dilepas daripada menumpuk memori
+MAX_CLIENT_BUFFER = 8 * 1024 * 1024
+# Batas satu baris request (bulk_add membawa ribuan obat sekaligus)
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+# Perubahan beruntun dalam jeda ini cukup satu kali susun ulang antrean alarm
+RESCHEDULE_DELAY = 0.25
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class Connection:
+    def __init__(self, writer):
+        self.writer = writer
+        self.topics = set()
+
+    def send(self, message):
+        transport = self.writer.transport
+        if transport.is_closing():
+            return
+        if transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+            print("Client is not reading, disconnecting it")
+            transport.abort()
+            return
+        self.writer.write(encode_message(message))
+
+
+class MediMateDaemon:
+    """Serves a PatientRegistry over a Unix socket and fires its alarms.
+
+    Every request is handled on the event loop thread: the registry works
+    from memory and writes go through the write-behind storage, so a
+    request costs microseconds and needs no locking. Methods are the
+    rpc_* methods below, called with the request's named params.
+    """
+
+    def __init__(self, registry, socket_path):
+        self.registry = registry
+        self.socket_path = socket_path
+        self.connections = set()
+        self.requests = 0
+        self.started = time.time()
+        self.server = None
+        self.loop = None
+        self._timer = None
+        self._reschedule_pending = False
+        self._signatures = {}
+        self.scheduler = AlarmScheduler(self.schedule_with_status, self.on_dose_due, self.arm_timer)
+
+    # --- server ---
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._remove_stale_socket()
+        self.server = await asyncio.start_unix_server(self.handle_client, self.socket_path, limit=MAX_REQUEST_BYTES)
+        os.chmod(self.socket_path, 0o600)
+        self.registry.subscribe(self.on_medicine_changed)
+        self.scheduler.start()
+        print(f"MediMate daemon listening on {self.socket_path}")
+        stopped = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self.loop.add_signal_handler(signum, stopped.set)
+        async with self.server:
+            await stopped.wait()
+        self.shutdown()
+
+    def shutdown(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self.registry.unsubscribe(self.on_medicine_changed)
+        self.registry.close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+        print("MediMate daemon stopped")
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(self.socket_path)  # sisa daemon yang mati
+        else:
+            raise RuntimeError(f"Another daemon is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+    async def handle_client(self, reader, writer):
+        connection = Connection(writer)
+        self.connections.add(connection)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # baris terlalu panjang atau koneksi putus
+                if not line:
+                    break
+                reply = self.handle_line(connection, line)
+                if reply is not None:
+                    connection.send(reply)
+                if writer.transport.get_write_buffer_size() > 2 ** 20:
+                    await writer.drain()
+        finally:
+            self.connections.discard(connection)
+            writer.close()
+
+    def handle_line(self, connection, line):
+        """Reply for one request line (None for notifications without an id)"""
+        try:
+            request = loads(line)
+        except ValueError:
+            return self._error(None, PARSE_ERROR, "Parse error")
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return self._error(None, INVALID_REQUEST, "Invalid request")
+        request_id = request.get('id')
+        params = request.get('params') or {}
+        self.requests += 1
+        try:
+            handler = self._handler(request['method'])
+            if not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, "Params must be an object")
+            try:
+                self._signatures[handler.__name__].bind(connection, **params)
+            except TypeError as e:
+                raise RpcError(INVALID_PARAMS, str(e))
+            result = handler(connection, **params)
+        except RpcError as e:
+            return self._error(request_id, e.code, str(e))
+        except Exception as e:
+            print(f"Error handling {request['method']}: {e}")
+            return self._error(request_id, -32603, f"Internal error: {e}")
+        if request_id is None:
+            return None
+        return {'jsonrpc': "2.0", 'id': request_id, 'result': result}
+
+    def _handler(self, method):
+        handler = getattr(self, f"rpc_{method}", None)
+        if handler is None:
+            raise RpcError(METHOD_NOT_FOUND, f"Unknown method {method!r}")
+        if handler.__name__ not in self._signatures:
+            self._signatures[handler.__name__] = inspect.signature(handler)
+        return handler
+
+    @staticmethod
+    def _error(request_id, code, message):
+        return {'jsonrpc': "2.0", 'id': request_id, 'error': {'code': code, 'message': message}}
+
+    def broadcast(self, topic, method, params):
+        message = None
+        for connection in list(self.connections):
+            if topic in connection.topics:
+                message = message or {'jsonrpc': "2.0", 'method': method, 'params': params}
+                connection.send(message)
+
+    # --- alarm ---
+
+    def arm_timer(self, seconds):
+        if self._timer is not None:
+            self._timer.cancel()
+        if self.loop is not None:
+            self._timer = self.loop.call_later(seconds, self.scheduler.wake)
+
+    def schedule_with_status(self):
+        """All patients' doses today with their real status (closed shards included)"""
+        histories = {}
+        items = self.registry.today_schedule()
+        for item in items:
+            if self.registry.is_dose_taken(item['patient_id'], item['medicine_id'], item['time'], histories):
+                item['status'] = "Sudah Diminum"
+        return items
+
+    def on_dose_due(self, item):
+        if self.registry.is_dose_taken(item['patient_id'], item['medicine_id'], item['time']):
+            return
+        print(f"Dose due {item['time']}: {item['patient_name']} - {item['medicine']}")
+        self.broadcast('due', 'due', item)
+
+    def on_medicine_changed(self, patient_id, event, medicine_id, medicine):
+        taken = []
+        if event != MEDICINE_REMOVED and medicine is not None:
+            manager = self.registry.manager(patient_id)
+            taken = [t for t in medicine.times if manager.is_dose_taken(medicine_id, t)]
+        self.broadcast('changes', 'changed', {
+            'patient_id': patient_id,
+            'event': event,
+            'medicine_id': medicine_id,
+            'medicine': None if medicine is None else medicine.to_dict(),
+            'taken': taken,
+        })
+        if not self._reschedule_pending and self.loop is not None:
+            self._reschedule_pending = True
+            self.loop.call_later(RESCHEDULE_DELAY, self._reschedule)
+
+    def _reschedule(self):
+        self._reschedule_pending = False
+        self.scheduler.reschedule()
+        # Ringkasan jadwal ditulis sekali per gelombang perubahan
+        self.registry.flush()
+
+    # --- RPC methods ---
+
+    def _manager(self, patient_id):
+        try:
+            return self.registry.manager(patient_id)
+        except KeyError:
+            raise RpcError(NOT_FOUND, f"Unknown patient {patient_id}")
+
+    def _medicine(self, manager, medicine_id):
+        medicine = manager.get_medicine_by_id(medicine_id)
+        if medicine is None:
+            raise RpcError(NOT_FOUND, f"Unknown medicine {medicine_id}")
+        return medicine
+
+    @staticmethod
+    def _validate(medicine):
+        if not isinstance(medicine, dict) or not isinstance(medicine.get('name'), str) or not medicine['name']:
+            raise RpcError(INVALID_PARAMS, "Medicine needs a non-empty 'name'")
+        times = medicine.get('times', [])
+        try:
+            if not isinstance(times, list) or any(not 0 <= parse_time(t) < 24 * 60 for t in times):
+                raise ValueError
+        except (ValueError, AttributeError):
+            raise RpcError(INVALID_PARAMS, "'times' must be a list of \"HH:MM\" strings")
+        if medicine.get('recurrence') is not None:
+            try:
+                Recurrence.from_dict(medicine['recurrence'])
+            except ValueError as e:
+                raise RpcError(INVALID_PARAMS, f"Invalid 'recurrence': {e}")
+
+    def rpc_ping(self, connection):
+        return "pong"
+
+    def rpc_stats(self, connection):
+        return {
+            'requests': self.requests,
+            'clients': len(self.connections),
+            'uptime': time.time() - self.started,
+            'open_shards': self.registry.open_count(),
+        }
+
+    def rpc_subscribe(self, connection, topics=TOPICS):
+        unknown = set(topics) - set(TOPICS)
+        if unknown:
+            raise RpcError(INVALID_PARAMS, f"Unknown topics: {', '.join(sorted(unknown))}")
+        connection.topics.update(topics)
+        return sorted(connection.topics)
+
+    def rpc_unsubscribe(self, connection, topics=TOPICS):
+        connection.topics.difference_update(topics)
+        return sorted(connection.topics)
+
+    def rpc_patients(self, connection):
+        return self.registry.patients()
+
+    def rpc_add_patient(self, connection, name):
+        if not isinstance(name, str) or not name.strip():
+            raise RpcError(INVALID_PARAMS, "Patient needs a name")
+        return self.registry.add_patient(name.strip())
+
+    def rpc_list(self, connection, patient_id):
+        """Snapshot of one patient: medicines plus doses taken today"""
+        manager = self._manager(patient_id)
+        manager.check_day_rollover()
+        return {
+            'medicines': [med.to_dict() for med in manager.medicines],
+            'taken': sorted(manager.history.taken_today()),
+        }
+
+    def rpc_get(self, connection, patient_id, medicine_id):
+        return self._medicine(self._manager(patient_id), medicine_id).to_dict()
+
+    def rpc_add(self, connection, patient_id, medicine):
+        self._validate(medicine)
+        manager = self._manager(patient_id)
+        medicine = dict(medicine)
+        medicine.pop('id', None)
+        manager.add_medicine(medicine)
+        return manager.get_medicine_by_id(medicine['id']).to_dict()
+
+    def rpc_edit(self, connection, patient_id, medicine_id, medicine):
+        self._validate(medicine)
+        manager = self._manager(patient_id)
+        self._medicine(manager, medicine_id)
+        manager.edit_medicine(medicine_id, dict(medicine))
+        return manager.get_medicine_by_id(medicine_id).to_dict()
+
+    def rpc_bulk_add(self, connection, patient_id, medicines):
+        """Add a list of medicines with one write; returns their new IDs"""
+        if not isinstance(medicines, list):
+            raise RpcError(INVALID_PARAMS, "'medicines' must be a list")
+        for medicine in medicines:
+            self._validate(medicine)
+        manager = self._manager(patient_id)
+        medicines = [dict(medicine) for medicine in medicines]
+        for medicine in medicines:
+            medicine.pop('id', None)
+        manager.bulk_add(medicines)
+        return [medicine['id'] for medicine in medicines]
+
+    def rpc_bulk_update(self, connection, patient_id, medicines):
+        """Replace several medicines (each object carries its 'id') with one write"""
+        if not isinstance(medicines, list):
+            raise RpcError(INVALID_PARAMS, "'medicines' must be a list")
+        manager = self._manager(patient_id)
+        for medicine in medicines:
+            self._validate(medicine)
+            self._medicine(manager, medicine.get('id'))
+        return manager.bulk_update({medicine['id']: dict(medicine) for medicine in medicines})
+
+    def rpc_bulk_delete(self, connection, patient_id, medicine_ids):
+        manager = self._manager(patient_id)
+        if not isinstance(medicine_ids, list):
+            raise RpcError(INVALID_PARAMS, "'medicine_ids' must be a list")
+        for medicine_id in medicine_ids:
+            self._medicine(manager, medicine_id)
+        return manager.bulk_delete(medicine_ids)
+
+    def rpc_delete(self, connection, patient_id, medicine_id):
+        manager = self._manager(patient_id)
+        self._medicine(manager, medicine_id)
+        return manager.delete_medicine(medicine_id)
+
+    def rpc_ack(self, connection, patient_id, doses, day=None):
+        """Mark [[medicine_id, "HH:MM"], ...] scheduled on `day` ("YYYY-MM-DD", default today) as taken; returns how many were new"""
+        manager = self._manager(patient_id)
+        try:
+            pairs = [(self._medicine(manager, medicine_id).id, time) for medicine_id, time in doses]
+        except (TypeError, ValueError):
+            raise RpcError(INVALID_PARAMS, "'doses' must be a list of [medicine_id, time] pairs")
+        try:
+            day = date.fromisoformat(day) if day is not None else None
+        except (TypeError, ValueError):
+            raise RpcError(INVALID_PARAMS, "'day' must be a \"YYYY-MM-DD\" date")
+        return self.registry.take_doses(patient_id, pairs, day)
+
+    def rpc_is_dose_taken(self, connection, patient_id, medicine_id, time):
+        if self.registry.get_patient(patient_id) is None:
+            raise RpcError(NOT_FOUND, f"Unknown patient {patient_id}")
+        return self.registry.is_dose_taken(patient_id, medicine_id, time)
+
+    def rpc_schedule(self, connection, patient_id=None):
+        """Today's doses of one patient, or of all patients when patient_id is omitted"""
+        if patient_id is None:
+            return self.schedule_with_status()
+        return self._manager(patient_id).get_today_schedule()
+
+    def rpc_due_now(self, connection, lookback_minutes=60):
+        return self.registry.due_now(lookback_minutes=lookback_minutes)
+
+    def rpc_adherence(self, connection, first, last, patient_id=None):
+        """Adherence per medicine of one patient, or per patient, for the days first..last ("YYYY-MM-DD")"""
+        try:
+            first, last = date.fromisoformat(first), date.fromisoformat(last)
+        except (TypeError, ValueError):
+            raise RpcError(INVALID_PARAMS, "'first' and 'last' must be \"YYYY-MM-DD\" dates")
+        if patient_id is not None and self.registry.get_patient(patient_id) is None:
+            raise RpcError(NOT_FOUND, f"Unknown patient {patient_id}")
+        return self.registry.adherence(first, last, patient_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless MediMate scheduler with a Unix-socket API")
+    parser.add_argument("--socket", default=default_socket_path(), help="Unix socket path")
+    parser.add_argument("--data-dir", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="Directory with patients.json and the medicine data")
+    args = parser.parse_args(argv)
+    registry = PatientRegistry(args.data_dir, write_behind=0.5)
+    daemon = MediMateDaemon(registry, args.socket)
+    try:
+        asyncio.run(daemon.serve())
+    except RuntimeError as e:
+        print(e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+from collections import OrderedDict
+import os
+import select
+import socket
+import tempfile
+import threading
+
+from codec import dumps, loads
+from dose_history import DoseHistory
+from medicine_manager import MedicineManager, MEDICINE_ADDED, MEDICINE_REMOVED, MEDICINES_RESET
+from records import Medicine
+from storage import MemoryStorage
+
+
+def default_socket_path():
+    """Socket of the local daemon: $MEDIMATE_SOCKET, else per-user runtime dir"""
+    path = os.environ.get("MEDIMATE_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "medimate.sock")
+    return os.path.join(tempfile.gettempdir(), f"medimate-{os.getuid()}.sock")
+
+
+def encode_message(message):
+    return dumps(message) + b"\n"
+
+
+class DaemonError(Exception):
+    """Error reply from the daemon (JSON-RPC error object)"""
+
+    def __init__(self, code, message):
+        super().__init__(f"{message} ({code})")
+        self.code = code
+
+
+class DaemonClient:
+    """Blocking JSON-RPC client for the daemon socket.
+
+    Messages are JSON objects, one per line. call() waits for the reply
+    with its id; notifications (due doses, data changes) that arrive in
+    between are kept in `pending` until dispatch() hands them to
+    `on_notification(method, params)`. dispatch() also reads whatever is
+    waiting on the socket without blocking, so an event loop can call it
+    when fileno() becomes readable.
+    """
+
+    def __init__(self, path=None, timeout=10.0):
+        self.path = path or default_socket_path()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(self.path)
+        self.pending = []
+        self.on_notification = None
+        self._buffer = b""
+        self._next_id = 1
+        self._lock = threading.RLock()
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def call(self, method, **params):
+        """Send one request and return its result (raises DaemonError)"""
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            self.sock.sendall(encode_message(
+                {'jsonrpc': "2.0", 'id': request_id, 'method': method, 'params': params}))
+            while True:
+                message = self._read_message(block=True)
+                if message.get('id') != request_id:
+                    self.pending.append(message)
+                    continue
+                error = message.get('error')
+                if error is not None:
+                    raise DaemonError(error.get('code'), error.get('message'))
+                return message.get('result')
+
+    def dispatch(self):
+        """Deliver queued and already-received notifications; returns how many"""
+        with self._lock:
+            while True:
+                message = self._read_message(block=False)
+                if message is None:
+                    break
+                self.pending.append(message)
+            messages, self.pending = self.pending, []
+            for message in messages:
+                if 'method' in message and self.on_notification is not None:
+                    self.on_notification(message['method'], message.get('params') or {})
+            return len(messages)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def _read_message(self, block):
+        while b"\n" not in self._buffer:
+            if not block and not select.select([self.sock], [], [], 0)[0]:
+                return None
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionError("MediMate daemon closed the connection")
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return loads(line)
+
+
+def connect_daemon(path=None):
+    """DaemonClient for a running daemon, or None when none is listening"""
+    try:
+        return DaemonClient(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+
+
+class RemotePatients:
+    """PatientRegistry look-alike backed by the daemon (UI thin-client mode).
+
+    Each opened patient gets a RemoteMedicineManager: a read-only mirror
+    of the daemon's data that the daemon keeps current through "changed"
+    notifications. Due doses arrive as "due" notifications and go to
+    `on_due(item)`. `defer_dispatch`, if given, is called when
+    notifications were picked up during a call, so the event loop can
+    deliver them outside that call (the UI passes a 0 ms QTimer).
+    """
+
+    def __init__(self, client, max_open=8, defer_dispatch=None):
+        self.client = client
+        self.max_open = max_open
+        self.defer_dispatch = defer_dispatch
+        self.on_due = None
+        self._open = OrderedDict()  # patient_id -> RemoteMedicineManager, urutan LRU
+        self._pinned = set()
+        client.on_notification = self.on_notification
+        client.call('subscribe', topics=['due', 'changes'])
+
+    def call(self, method, **params):
+        result = self.client.call(method, **params)
+        if self.client.pending and self.defer_dispatch is not None:
+            self.defer_dispatch()
+        return result
+
+    def dispatch(self):
+        return self.client.dispatch()
+
+    def on_notification(self, method, params):
+        if method == 'changed':
+            manager = self._open.get(params['patient_id'])
+            if manager is not None:
+                manager.apply_change(params['event'], params['medicine_id'],
+                                     params.get('medicine'), params.get('taken', []))
+        elif method == 'due' and self.on_due is not None:
+            self.on_due(params)
+
+    def patients(self):
+        return self.call('patients')
+
+    def get_patient(self, patient_id):
+        return next((p for p in self.patients() if p['id'] == patient_id), None)
+
+    def add_patient(self, name):
+        return self.call('add_patient', name=name)
+
+    def manager(self, patient_id):
+        # Lock klien dipegang sampai mirror terdaftar, agar notifikasi
+        # yang datang setelah snapshot tidak terlewat
+        with self.client._lock:
+            manager = self._open.get(patient_id)
+            if manager is not None:
+                self._open.move_to_end(patient_id)
+                return manager
+            snapshot = self.call('list', patient_id=patient_id)
+            manager = RemoteMedicineManager(self, patient_id, snapshot['medicines'], snapshot['taken'])
+            self._open[patient_id] = manager
+            for stale_id in list(self._open):
+                if len(self._open) <= self.max_open:
+                    break
+                if stale_id not in self._pinned:
+                    del self._open[stale_id]
+            return manager
+
+    def pin(self, patient_id):
+        self._pinned.add(patient_id)
+
+    def unpin(self, patient_id):
+        self._pinned.discard(patient_id)
+
+    def open_count(self):
+        return len(self._open)
+
+    def today_schedule(self):
+        return self.call('schedule')
+
+    def due_now(self, lookback_minutes=60):
+        return self.call('due_now', lookback_minutes=lookback_minutes)
+
+    def adherence(self, first, last, patient_id=None):
+        return self.call('adherence', first=first.isoformat(), last=last.isoformat(), patient_id=patient_id)
+
+    def is_dose_taken(self, patient_id, medicine_id, time, histories=None):
+        manager = self._open.get(patient_id)
+        if manager is not None:
+            return manager.is_dose_taken(medicine_id, time)
+        return self.call('is_dose_taken', patient_id=patient_id, medicine_id=medicine_id, time=time)
+
+    def take_doses(self, patient_id, doses, day=None):
+        return self.call('ack', patient_id=patient_id, doses=[list(dose) for dose in doses],
+                         day=day.isoformat() if day else None)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self._open.clear()
+        self.client.close()
+
+
+class RemoteMedicineManager(MedicineManager):
+    """MedicineManager mirror of one patient on the daemon.
+
+    Queries run on the local copy (same indexes as MedicineManager);
+    changes are sent to the daemon, which applies and stores them and
+    sends the result back as a "changed" notification. That notification
+    is dispatched before the mutating method returns, so callers see the
+    same synchronous events as with a local manager.
+    """
+
+    # Record per request bulk; satu baris request ke daemon dibatasi 16 MiB
+    BULK_CHUNK = 10000
+
+    def __init__(self, patients, patient_id, medicines, taken):
+        self.patients = patients
+        self.patient_id = patient_id
+        self._in_bulk = False
+        self._reload_pending = False
+        history = DoseHistory(None)
+        history.record_taken_many([tuple(dose) for dose in taken])
+        super().__init__(MemoryStorage(medicines), history=history)
+
+    def _request(self, method, **params):
+        try:
+            result = self.patients.client.call(method, patient_id=self.patient_id, **params)
+        except DaemonError as e:
+            print(f"Daemon rejected {method}: {e}")
+            return None
+        self.patients.dispatch()
+        return result
+
+    def add_medicine(self, medicine_data):
+        medicine = self._request('add', medicine=medicine_data)
+        if medicine is None:
+            return False
+        medicine_data.update(medicine)
+        return True
+
+    def edit_medicine(self, medicine_id, updated_data):
+        return self._request('edit', medicine_id=medicine_id, medicine=updated_data) is not None
+
+    def delete_medicine(self, medicine_id):
+        return bool(self._request('delete', medicine_id=medicine_id))
+
+    def bulk_add(self, medicines):
+        def send(chunk):
+            ids = self._request('bulk_add', medicines=chunk)
+            for medicine_data, medicine_id in zip(chunk, ids or []):
+                medicine_data['id'] = medicine_id
+            return ids is not None
+        return self._bulk(send, medicines)
+
+    def bulk_update(self, updates):
+        medicines = [dict(updated_data, id=medicine_id) for medicine_id, updated_data in updates.items()]
+        return self._bulk(lambda chunk: bool(self._request('bulk_update', medicines=chunk)), medicines)
+
+    def bulk_delete(self, medicine_ids):
+        return self._bulk(lambda chunk: bool(self._request('bulk_delete', medicine_ids=chunk)), list(medicine_ids))
+
+    def _bulk(self, send, items):
+        # Request dipecah per BULK_CHUNK; mirror dimuat ulang sekali di akhir
+        self._in_bulk = True
+        try:
+            for start in range(0, len(items), self.BULK_CHUNK):
+                if not send(items[start:start + self.BULK_CHUNK]):
+                    return False
+            return True
+        finally:
+            self._in_bulk = False
+            if self._reload_pending:
+                self.reload()
+
+    def reload(self):
+        """Replace the mirror with a fresh snapshot from the daemon"""
+        self._reload_pending = False
+        snapshot = self.patients.call('list', patient_id=self.patient_id)
+        self.history.record_taken_many([tuple(dose) for dose in snapshot['taken']
+                                        if not self.history.is_taken(*dose)])
+        self.storage = MemoryStorage(snapshot['medicines'])
+        self._index_medicines(self.load_medicines())
+        self._emit(MEDICINES_RESET, None)
+
+    def take_doses(self, doses, day=None):
+        return self._request('ack', doses=[[medicine.id, time] for medicine, time in doses],
+                             day=day.isoformat() if day else None) is not None
+
+    def apply_change(self, event, medicine_id, medicine, taken):
+        """Apply a change notification from the daemon and emit it locally"""
+        if event == MEDICINES_RESET:
+            self._reload_pending = True
+            if not self._in_bulk:
+                self.reload()
+            return
+        new_doses = [(medicine_id, time) for time in taken if not self.history.is_taken(medicine_id, time)]
+        self.history.record_taken_many(new_doses)
+        if medicine is not None:
+            medicine = Medicine.from_dict(medicine)
+        if event == MEDICINE_REMOVED:
+            if self._by_id.pop(medicine_id, None) is None:
+                return
+            self._unindex(medicine_id)
+        elif event == MEDICINE_ADDED or medicine_id not in self._by_id:
+            self._by_id[medicine_id] = medicine
+            self._index(medicine)
+        else:
+            self._by_id[medicine_id] = medicine
+            self._reindex(medicine)
+        self._list_cache = None
+        self._emit(event, medicine_id, medicine)
+
+    def sync_external(self):
+        # Data milik daemon; perubahannya datang sebagai notifikasi
+        return None
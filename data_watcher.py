@@ -0,0 +1,67 @@
+import os
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer
+
+
+class DataFileWatcher(QObject):
+    """Picks up changes other processes make to the medicine data file.
+
+    Watches the storage's data files plus their directory (a sync job
+    that saves through a temp file + rename replaces the file, which a
+    plain file watch loses). Bursts of change notifications are
+    debounced into one MedicineManager.sync_external() call; that merges
+    only the records that differ, so the UI updates through the normal
+    change events. The directory also holds files the app writes itself
+    (journal, temp files, patients.json, history), so a notification only
+    counts when a watched data file changed, and the sync only runs when
+    the storage reports a change it did not make.
+    """
+
+    DEBOUNCE_MS = 500
+
+    def __init__(self, medicine_manager, parent=None):
+        super().__init__(parent)
+        self.medicine_manager = medicine_manager
+        self.paths = [os.path.abspath(path) for path in medicine_manager.storage.watch_paths()]
+        self.watcher = QFileSystemWatcher(self)
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(self.DEBOUNCE_MS)
+        self.debounce.timeout.connect(self.sync)
+        self.watcher.fileChanged.connect(self.on_change)
+        self.watcher.directoryChanged.connect(self.on_change)
+        directories = {os.path.dirname(path) for path in self.paths}
+        self.watcher.addPaths(sorted(directories))
+        self.watch_files()
+        self.stamps = self.file_stamps()
+
+    def watch_files(self):
+        # File yang belum ada atau baru diganti lewat rename didaftarkan ulang
+        watched = set(self.watcher.files())
+        missing = [path for path in self.paths if path not in watched and os.path.exists(path)]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def file_stamps(self):
+        stamps = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stamps.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError:
+                stamps.append(None)
+        return stamps
+
+    def on_change(self, path):
+        # Perubahan folder karena file lain (journal, temp, riwayat) diabaikan
+        stamps = self.file_stamps()
+        if stamps == self.stamps:
+            return
+        self.stamps = stamps
+        self.debounce.start()
+
+    def sync(self):
+        self.watch_files()
+        # Tulisan kita sendiri (mis. compact) tidak perlu flush dan muat ulang
+        if self.medicine_manager.storage.changed_externally():
+            self.medicine_manager.sync_external()
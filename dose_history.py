@@ -0,0 +1,120 @@
+from datetime import date, datetime
+import os
+
+from codec import dumps, loads
+
+
+class DoseHistory:
+    """Append-only dose log, partitioned into one file per day.
+
+    Taking a dose appends one line to history/YYYY-MM-DD.jsonl; the
+    medicine records themselves never change for it. Only today's
+    partition is kept in memory as a set, so "is this dose taken today"
+    is a single lookup, and midnight rollover just switches to a new,
+    empty partition. Pass directory=None to keep history in memory only.
+    """
+
+    def __init__(self, directory, clock=date.today):
+        self.directory = directory
+        self.clock = clock
+        self.day = None
+        self._taken = set()  # (medicine_id, "HH:MM") untuk hari ini
+        self._needs_newline = False
+        self.rollover()
+
+    def rollover(self):
+        """Switch to today's partition; returns True if the day changed"""
+        today = self.clock()
+        if today == self.day:
+            return False
+        self.day = today
+        self._taken = {(entry['medicine_id'], entry['time']) for entry in self.entries(today)}
+        self._needs_newline = self._has_partial_line(today)
+        return True
+
+    def is_taken(self, medicine_id, time):
+        return (medicine_id, time) in self._taken
+
+    def taken_today(self):
+        """(medicine_id, time) pairs taken in the current partition"""
+        return set(self._taken)
+
+    def taken_on(self, day):
+        """(medicine_id, time) pairs taken on `day`; today's come from memory"""
+        if day == self.day:
+            return set(self._taken)
+        return {(entry['medicine_id'], entry['time']) for entry in self.entries(day)}
+
+    def record_taken(self, medicine_id, time, taken_at=None):
+        """Append a taken dose to today's partition"""
+        self.record_taken_many([(medicine_id, time)], taken_at)
+
+    def record_taken_many(self, doses, taken_at=None, day=None):
+        """Append several (medicine_id, time) doses with a single fsync.
+
+        `day` is the day the doses were scheduled for (default: today);
+        a late acknowledgement of an earlier day goes to that day's
+        partition and leaves today's statuses alone.
+        """
+        taken_at = (taken_at or datetime.now()).isoformat()
+        day = day or self.day
+        if day == self.day:
+            self._taken.update(doses)
+        if self.directory is None or not doses:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        lines = b"".join(
+            dumps({'medicine_id': medicine_id, 'time': time, 'taken_at': taken_at}) + b"\n"
+            for medicine_id, time in doses)
+        with open(self._partition_path(day), 'ab') as f:
+            if self._needs_newline if day == self.day else self._has_partial_line(day):
+                # Tutup baris yang terpotong karena crash sebelumnya
+                f.write(b"\n")
+                if day == self.day:
+                    self._needs_newline = False
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def entries(self, day):
+        """All entries recorded for `day` (a date)"""
+        if self.directory is None:
+            return []
+        path = self._partition_path(day)
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    entries.append(loads(line))
+                except ValueError:
+                    print(f"Skipping incomplete history entry in {path}")
+        return entries
+
+    def days(self):
+        """Dates that have a partition on disk, oldest first"""
+        if self.directory is None or not os.path.isdir(self.directory):
+            return []
+        days = []
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext == ".jsonl":
+                try:
+                    days.append(date.fromisoformat(stem))
+                except ValueError:
+                    pass
+        return sorted(days)
+
+    def _has_partial_line(self, day):
+        if self.directory is None:
+            return False
+        path = self._partition_path(day)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return False
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def _partition_path(self, day):
+        return os.path.join(self.directory, f"{day.isoformat()}.jsonl")
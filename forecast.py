@@ -0,0 +1,260 @@
+from datetime import date, timedelta
+from functools import lru_cache
+import math
+import os
+import re
+
+try:
+    import numpy as np
+except ImportError:  # NumPy opsional; tanpa NumPy dihitung per baris
+    np = None
+
+# Satuan kekuatan obat: "500 mg" berarti satu tablet/kapsul per minum,
+# bukan 500 unit stok
+STRENGTH_UNITS = {'mg', 'mcg', 'µg', 'ug', 'g', 'gr', 'gram', 'iu', 'ui'}
+DOSE_RE = re.compile(r"(\d+(?:[.,]\d+)?)(?:\s*/\s*(\d+))?\s*([^\W\d_]+)?")
+
+
+def horizon_from_env(default=5.0):
+    """Low-stock horizon in days from MEDIMATE_LOW_STOCK_DAYS, or `default` if unset or invalid"""
+    value = os.environ.get("MEDIMATE_LOW_STOCK_DAYS")
+    if value is None:
+        return default
+    try:
+        days = float(value)
+    except ValueError:
+        days = math.nan
+    if not (math.isfinite(days) and days >= 0):
+        print(f"[WARNING] MEDIMATE_LOW_STOCK_DAYS={value!r} tidak valid, memakai {default:g} hari")
+        return default
+    return days
+
+
+# Ambang "hampir habis" dalam hari; MEDIMATE_LOW_STOCK_DAYS untuk mengganti
+DEFAULT_HORIZON_DAYS = horizon_from_env()
+
+
+class DoseQuantity:
+    """A dose string parsed once: amount, unit and stock units used per intake"""
+
+    __slots__ = ('amount', 'unit', 'stock_units')
+
+    def __init__(self, amount, unit, stock_units):
+        self.amount = amount
+        self.unit = unit
+        self.stock_units = stock_units
+
+    def __repr__(self):
+        return f"DoseQuantity({self.amount!r}, {self.unit!r}, stock_units={self.stock_units!r})"
+
+
+@lru_cache(maxsize=4096)
+def parse_dose(dose, stock_unit=None):
+    """Parse "2 tablet", "1/2 tablet", "2,5 ml" or "500 mg" into a DoseQuantity.
+
+    stock_units is what one intake takes from the stock: the amount when
+    the dose is counted in stock units, one piece when the dose is a
+    strength such as mg (unless the stock itself is counted in that
+    unit), and 1 when nothing can be parsed. Results are cached, since
+    most medicines share a handful of dose strings.
+    """
+    match = DOSE_RE.search(dose)
+    if match is None:
+        return DoseQuantity(1.0, None, 1)
+    number, denominator, unit = match.groups()
+    amount = float(number.replace(",", "."))
+    if denominator:
+        amount /= int(denominator) or 1
+    unit = unit.lower() if unit else None
+    if unit in STRENGTH_UNITS and (stock_unit or "").lower() != unit:
+        stock_units = 1
+    else:
+        # Stok disimpan utuh: setengah tablet tetap mengambil satu
+        stock_units = max(1, math.ceil(amount))
+    return DoseQuantity(amount, unit, stock_units)
+
+
+class StockForecast:
+    """Days until each medicine runs out, kept next to the other indexes.
+
+    One row per medicine holds its stock and its stock units used per day
+    (dose parsed once * doses per day, averaged over the recurrence
+    rule). days_left for the whole inventory is one vector division;
+    after that a change only recomputes its own row. Tapered medicines
+    use each remaining step's own dose; their row holds the equivalent
+    average use up to the day they run out, so the division still holds.
+    Medicines without a schedule (or whose course ends before the stock
+    does) never run out, unless the stock is already zero. Uses NumPy
+    when installed and plain lists otherwise; NumPy arrays keep spare
+    capacity so adding a row is amortized O(1).
+    """
+
+    def __init__(self, horizon_days=DEFAULT_HORIZON_DAYS):
+        self.horizon_days = horizon_days
+        self._rows = {}          # medicine_id -> index baris
+        self._ids = []
+        self._stock = self._array([])
+        self._per_day = self._array([])
+        self._days_left = self._array([])
+        self._low = set()        # ID yang habis dalam horizon
+
+    def __len__(self):
+        return len(self._ids)
+
+    @staticmethod
+    def _array(values):
+        if np is not None:
+            return np.asarray(values, dtype=np.float64)
+        return [float(value) for value in values]
+
+    def rebuild(self, medicines):
+        """Recompute every row in one pass (load time)"""
+        self._ids = [med.id for med in medicines]
+        self._rows = {medicine_id: row for row, medicine_id in enumerate(self._ids)}
+        self._stock = self._array([med.stock for med in medicines])
+        self._per_day = self._array([self._parse(med)[1] for med in medicines])
+        self._days_left = self._compute_days_left(self._stock, self._per_day)
+        self._recount_low()
+
+    def set_horizon(self, days):
+        self.horizon_days = days
+        self._recount_low()
+
+    def add(self, medicine):
+        medicine_id = medicine.id
+        row = len(self._ids)
+        self._rows[medicine_id] = row
+        self._ids.append(medicine_id)
+        stock, per_day = self._parse(medicine)
+        days = self._days(stock, per_day)
+        if np is None:
+            self._stock.append(stock)
+            self._per_day.append(per_day)
+            self._days_left.append(days)
+        else:
+            self._reserve(row + 1)
+            self._stock[row] = stock
+            self._per_day[row] = per_day
+            self._days_left[row] = days
+        self._update_low(medicine_id, days)
+
+    def update(self, medicine):
+        row = self._rows.get(medicine.id)
+        if row is None:
+            self.add(medicine)
+            return
+        stock, per_day = self._parse(medicine)
+        self._stock[row] = stock
+        self._per_day[row] = per_day
+        self._days_left[row] = self._days(stock, per_day)
+        self._update_low(medicine.id, self._days_left[row])
+
+    def remove(self, medicine_id):
+        row = self._rows.pop(medicine_id, None)
+        if row is None:
+            return
+        self._low.discard(medicine_id)
+        # Baris terakhir dipindah ke lubang, jadi tidak ada pergeseran
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+            for values in (self._stock, self._per_day, self._days_left):
+                values[row] = values[last]
+        self._ids.pop()
+        if np is None:
+            for values in (self._stock, self._per_day, self._days_left):
+                values.pop()
+
+    @staticmethod
+    def dose(medicine, day=None):
+        """Parsed dose of a Medicine (of its taper step on `day`, if given)"""
+        dose = medicine.dose
+        if day is not None and medicine.recurrence is not None and medicine.recurrence.taper:
+            dose = medicine.doses_on(day)[1]
+        return parse_dose(dose, medicine.stock_unit)
+
+    def days_left(self, medicine_id):
+        """Days until the stock runs out (inf when it is not used up), or None"""
+        row = self._rows.get(medicine_id)
+        return None if row is None else float(self._days_left[row])
+
+    def runs_out_on(self, medicine_id, today=None):
+        """Date the stock runs out at the current pace, or None if it never does"""
+        days = self.days_left(medicine_id)
+        if days is None or math.isinf(days):
+            return None
+        return (today or date.today()) + timedelta(days=math.floor(days))
+
+    def low_stock_ids(self):
+        """IDs running out within the horizon"""
+        return set(self._low)
+
+    # --- internal ---
+
+    def _parse(self, medicine):
+        stock = float(medicine.stock)
+        rule = medicine.recurrence
+        if rule is not None and rule.taper:
+            return stock, self._taper_per_day(medicine, stock, date.today())
+        per_day = self.dose(medicine).stock_units * medicine.doses_per_day()
+        return stock, float(per_day)
+
+    def _taper_per_day(self, medicine, stock, today):
+        # Stok dipakai langkah demi langkah dengan dosis langkah itu; hasilnya
+        # rata-rata pemakaian per hari sampai stok habis (0 jika cukup sampai kursus selesai)
+        rule = medicine.recurrence
+        doses = rule.daily_rate(medicine.minutes, rule.start)
+        remaining = stock
+        step_start = rule.start
+        for step_days, step_dose in rule.taper:
+            step_end = step_start + timedelta(days=step_days)
+            if step_end > today:
+                first = max(step_start, today)
+                per_day = parse_dose(step_dose, medicine.stock_unit).stock_units * doses
+                span = (step_end - first).days
+                if per_day > 0 and per_day * span >= remaining:
+                    days = (first - today).days + remaining / per_day
+                    return stock / days if days > 0 else float(per_day)
+                remaining -= per_day * span
+            step_start = step_end
+        return 0.0
+
+    @staticmethod
+    def _days(stock, per_day):
+        if per_day > 0:
+            return stock / per_day
+        return math.inf if stock > 0 else 0.0
+
+    def _compute_days_left(self, stock, per_day):
+        if np is None:
+            return [self._days(s, p) for s, p in zip(stock, per_day)]
+        # Tanpa jadwal: tidak pernah habis, kecuali stoknya sudah nol
+        days = np.where(stock > 0, np.inf, 0.0)
+        np.divide(stock, per_day, out=days, where=per_day > 0)
+        return days
+
+    def _reserve(self, size):
+        capacity = len(self._stock)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 16)
+        for name in ('_stock', '_per_day', '_days_left'):
+            grown = np.empty(capacity)
+            old = getattr(self, name)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def _recount_low(self):
+        if np is None:
+            self._low = {mid for mid, days in zip(self._ids, self._days_left) if days <= self.horizon_days}
+            return
+        rows = np.flatnonzero(self._days_left[:len(self._ids)] <= self.horizon_days)
+        self._low = {self._ids[row] for row in rows.tolist()}
+
+    def _update_low(self, medicine_id, days):
+        if days <= self.horizon_days:
+            self._low.add(medicine_id)
+        else:
+            self._low.discard(medicine_id)
@@ -0,0 +1,124 @@
+import glob
+import importlib
+import importlib.util
+import os
+import sys
+import traceback
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer
+from PyQt6.QtWidgets import QApplication
+
+# Modul UI yang bisa dimuat ulang tanpa kehilangan state aplikasi
+UI_MODULE = "medimate"
+THEME_MODULE = "theme"
+
+
+class HotReloader(QObject):
+    """Development mode: reload UI code in the running process.
+
+    One QFileSystemWatcher follows every .py file next to medimate.py
+    (and the directory itself, since editors often save by replacing the
+    file). Changes are debounced, then:
+
+    - theme.py is reloaded and its stylesheet re-applied;
+    - medimate.py is loaded as a fresh module, the live window is
+      switched to the new MediMateApp class and its pages are rebuilt
+      (rows and dialogs created afterwards use the new classes), while
+      MedicineManager, active_alarms, the alarm scheduler and the
+      current page stay as they are;
+    - other modules hold data or state, so a change there only prints a
+      note that a restart is needed.
+
+    A module that fails to load is reported and the running code is kept.
+    """
+
+    DEBOUNCE_MS = 300
+
+    def __init__(self, window, source_file, parent=None):
+        super().__init__(parent)
+        self.window = window
+        self.directory = os.path.dirname(os.path.abspath(source_file))
+        self.ui_file = os.path.abspath(source_file)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.addPath(self.directory)
+        self.watcher.fileChanged.connect(self.on_change)
+        self.watcher.directoryChanged.connect(self.on_change)
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(self.DEBOUNCE_MS)
+        self.debounce.timeout.connect(self.reload_changed)
+        self.mtimes = self.scan()
+        self.watcher.addPaths(list(self.mtimes))
+        print(f"Hot reload aktif, memantau {len(self.mtimes)} file di {self.directory}")
+
+    def scan(self):
+        mtimes = {}
+        for path in glob.glob(os.path.join(self.directory, "*.py")):
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+        return mtimes
+
+    def on_change(self, path):
+        self.debounce.start()
+
+    def reload_changed(self):
+        mtimes = self.scan()
+        changed = {path for path, mtime in mtimes.items() if self.mtimes.get(path) != mtime}
+        self.mtimes = mtimes
+        # File yang diganti editor (save lewat rename) hilang dari watcher
+        missing = set(mtimes) - set(self.watcher.files())
+        if missing:
+            self.watcher.addPaths(list(missing))
+        if not changed:
+            return
+
+        names = {os.path.splitext(os.path.basename(path))[0] for path in changed}
+        if THEME_MODULE in names:
+            self.reload_theme()
+        if UI_MODULE in names:
+            self.reload_ui()
+        for name in sorted(names - {THEME_MODULE, UI_MODULE, "hot_reload"}):
+            print(f"[hot reload] {name}.py berubah; modul data/state, restart untuk menerapkan")
+
+    def reload_theme(self):
+        try:
+            theme = importlib.reload(importlib.import_module(THEME_MODULE))
+        except Exception:
+            traceback.print_exc()
+            print("[hot reload] theme.py gagal dimuat, tema lama tetap dipakai")
+            return
+        QApplication.instance().setStyleSheet(theme.STYLESHEET)
+        print("[hot reload] theme.py dimuat ulang")
+
+    def reload_ui(self):
+        spec = importlib.util.spec_from_file_location(UI_MODULE, self.ui_file)
+        module = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(module)
+        except Exception:
+            traceback.print_exc()
+            print(f"[hot reload] {os.path.basename(self.ui_file)} gagal dimuat, kode lama tetap berjalan")
+            return
+        sys.modules[UI_MODULE] = module
+        swap_window_classes(self.window, module)
+        print(f"[hot reload] {os.path.basename(self.ui_file)} dimuat ulang, halaman dibangun ulang")
+
+
+def swap_window_classes(window, module):
+    """Point the live window at the classes of a freshly loaded medimate module"""
+    manager = window.medicine_manager
+    # Callback terdaftar sebagai bound method lama; daftarkan ulang setelah swap
+    if manager is not None:
+        manager.unsubscribe(window.on_medicine_changed)
+    window.alarm_center.acknowledged.disconnect(window.acknowledge_doses)
+
+    window.__class__ = module.MediMateApp
+
+    window.alarm_center.acknowledged.connect(window.acknowledge_doses)
+    if window.daemon is not None:
+        window.patients.on_due = window.on_dose_due
+    if manager is not None:
+        manager.subscribe(window.on_medicine_changed)
+        window.refresh_pages()
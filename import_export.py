@@ -0,0 +1,256 @@
+"""Bulk import and export of medicines as CSV or JSON.
+
+Imports stream the file: rows are read a batch at a time, validated on a
+small thread pool while the next batch is read, and every valid row is
+added with one MedicineManager.bulk_add (one storage write). Invalid rows
+are skipped and reported with their line (CSV) or item number (JSON).
+
+CSV columns: name, dose, stock, stock_unit, times, priority, alarm_sound,
+notes, recurrence; times are "HH:MM" separated by ";" or spaces, e.g.
+"08:00; 20:00", and recurrence is the rule as JSON, e.g.
+{"freq": "weekly", "byday": ["MO", "FR"]} (see recurrence.py).
+JSON: an array of medicine objects, or one object per line (JSON Lines);
+exports to .jsonl/.ndjson are written as JSON Lines.
+
+Usage: python import_export.py import|export FILE [--patient ID]
+"""
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+
+from codec import dumps
+from records import SchemaError, decode_medicine
+from storage import atomic_write_json
+
+CSV_FIELDS = ('name', 'dose', 'stock', 'stock_unit', 'times', 'priority', 'alarm_sound', 'notes', 'recurrence')
+TIME_SEPARATOR = re.compile(r"[;,\s]+")
+FORMATS = {'.csv': 'csv', '.json': 'json', '.jsonl': 'json', '.ndjson': 'json'}
+JSON_LINES = ('.jsonl', '.ndjson')
+# Satu record JSON lebih besar dari ini dianggap file rusak, bukan potongan chunk
+MAX_RECORD_CHARS = 1 << 20
+
+RowError = namedtuple('RowError', 'row message')
+
+
+class ImportReport:
+    """Outcome of one import: how many rows were added and which were rejected"""
+
+    def __init__(self, path):
+        self.path = path
+        self.added = 0
+        self.errors = []   # [RowError], urutan sesuai file
+        self.saved = True
+
+    def summary(self, limit=10):
+        lines = [f"{self.added} obat diimpor dari {os.path.basename(self.path)}"]
+        if self.errors:
+            lines.append(f"{len(self.errors)} baris dilewati:")
+            lines += [f"  baris {error.row}: {error.message}" for error in self.errors[:limit]]
+            if len(self.errors) > limit:
+                lines.append(f"  ... dan {len(self.errors) - limit} lainnya")
+        return "\n".join(lines)
+
+
+def detect_format(path):
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported file type: {path} (use .csv, .json or .jsonl)")
+    return fmt
+
+
+def iter_csv_rows(f):
+    """(line number, raw record) per CSV row; column names are case-insensitive"""
+    reader = csv.DictReader(f)
+    if reader.fieldnames is None:
+        return
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    for row in reader:
+        record = {key: value.strip() for key, value in row.items()
+                  if key and isinstance(value, str) and value.strip()}
+        if 'times' in record:
+            record['times'] = [time for time in TIME_SEPARATOR.split(record['times']) if time]
+        if 'recurrence' in record:
+            try:
+                record['recurrence'] = json.loads(record['recurrence'])
+            except ValueError:
+                pass  # dilaporkan sebagai aturan tidak valid saat validasi
+        yield reader.line_num, record
+
+
+def iter_json_rows(f, chunk_size=1 << 16):
+    """(item number, raw record) per object of a JSON array or JSON Lines file.
+
+    Objects are decoded one at a time from a sliding buffer, so the file
+    is never held in memory as a whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size)
+    eof = not buffer
+    pos = 0
+    in_array = None
+    number = 0
+    while True:
+        while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ",")):
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                return
+            buffer, pos = f.read(chunk_size), 0
+            eof = not buffer
+            continue
+        if in_array is None:
+            in_array = buffer[pos] == "["
+            if in_array:
+                pos += 1
+                continue
+        if in_array and buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            complete = end < len(buffer) or eof
+        except ValueError:
+            if eof or len(buffer) - pos > MAX_RECORD_CHARS:
+                raise
+            complete = False
+        if not complete:
+            # Objek terpotong di batas chunk: sambung dengan chunk berikutnya
+            more = f.read(chunk_size)
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        number += 1
+        yield number, item
+        pos = end
+
+
+def _validate_chunk(rows):
+    records = []
+    errors = []
+    for row, raw in rows:
+        try:
+            if isinstance(raw, dict):
+                # Impor selalu membuat obat baru; ID dari file tidak dipakai
+                raw.pop('id', None)
+            records.append(decode_medicine(raw))
+        except SchemaError as e:
+            errors.append(RowError(row, str(e)))
+    return records, errors
+
+
+def validated_chunks(rows, chunk_size=1000, workers=None):
+    """Yield (records, errors) per chunk of `rows`, validated on a thread pool.
+
+    At most a few chunks are in flight, so a large file streams through
+    in constant memory apart from the valid records themselves.
+    """
+    workers = workers or min(4, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="medimate-import") as pool:
+        pending = deque()
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                pending.append(pool.submit(_validate_chunk, chunk))
+                chunk = []
+                if len(pending) > workers:
+                    yield pending.popleft().result()
+        if chunk:
+            pending.append(pool.submit(_validate_chunk, chunk))
+        while pending:
+            yield pending.popleft().result()
+
+
+def read_medicines(path, fmt=None, chunk_size=1000, workers=None):
+    """Read and validate a CSV/JSON file; returns (records, ImportReport).
+
+    Nothing is added yet, so this can run off the thread that owns the
+    manager; import_medicines adds the records afterwards.
+    """
+    fmt = fmt or detect_format(path)
+    report = ImportReport(path)
+    records = []
+    # utf-8-sig: CSV dari Excel diawali BOM
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = iter_csv_rows(f) if fmt == 'csv' else iter_json_rows(f)
+        for valid, errors in validated_chunks(rows, chunk_size, workers):
+            records += valid
+            report.errors += errors
+    return records, report
+
+
+def add_records(manager, records, report):
+    """Add records from read_medicines with one bulk_add; fills in `report`"""
+    if records:
+        report.saved = manager.bulk_add(records)
+        report.added = len(records)
+    return report
+
+
+def import_medicines(manager, path, fmt=None, chunk_size=1000, workers=None):
+    """Import a CSV/JSON file into `manager`; returns an ImportReport.
+
+    A file that cannot be read or parsed raises OSError/ValueError and
+    nothing is added.
+    """
+    records, report = read_medicines(path, fmt, chunk_size, workers)
+    return add_records(manager, records, report)
+
+
+def export_medicines(medicines, path, fmt=None):
+    """Write medicines to a CSV or JSON file (same columns the importer reads)"""
+    fmt = fmt or detect_format(path)
+    if fmt == 'json' and os.path.splitext(path)[1].lower() in JSON_LINES:
+        # Satu objek per baris, sama seperti yang dibaca iter_json_rows
+        with open(path, 'wb') as f:
+            for medicine in medicines:
+                f.write(dumps(medicine.to_dict()) + b"\n")
+        return
+    if fmt == 'json':
+        atomic_write_json(path, [medicine.to_dict() for medicine in medicines], pretty=True)
+        return
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        for medicine in medicines:
+            writer.writerow([medicine.name, medicine.dose, medicine.stock, medicine.stock_unit or "",
+                             "; ".join(medicine.times), medicine.priority or "",
+                             medicine.alarm_sound or "", medicine.notes or "",
+                             json.dumps(medicine.recurrence.to_dict()) if medicine.recurrence else ""])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import or export MediMate medicines (CSV/JSON)")
+    parser.add_argument('action', choices=('import', 'export'))
+    parser.add_argument('file')
+    parser.add_argument('--patient', type=int, default=1, help="patient ID (default: 1)")
+    parser.add_argument('--data-dir', default=os.path.dirname(os.path.abspath(__file__)))
+    args = parser.parse_args(argv)
+
+    from daemon_client import RemotePatients, connect_daemon
+    from patients import PatientRegistry
+    client = connect_daemon()
+    # Daemon aktif memegang data; tulis lewat daemon agar tidak bentrok
+    patients = RemotePatients(client) if client is not None else PatientRegistry(args.data_dir)
+    try:
+        if patients.get_patient(args.patient) is None:
+            print(f"Unknown patient {args.patient}")
+            return 1
+        manager = patients.manager(args.patient)
+        if args.action == 'import':
+            report = import_medicines(manager, args.file)
+            print(report.summary(limit=50))
+            return 0 if report.saved else 1
+        export_medicines(manager.medicines, args.file)
+        print(f"Exported {manager.get_medicines_count()} medicines to {args.file}")
+        return 0
+    finally:
+        patients.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
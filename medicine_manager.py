@@ -0,0 +1,501 @@
+from datetime import datetime, timedelta
+import os
+
+from codec import paused_gc
+from dose_history import DoseHistory
+from forecast import StockForecast
+from records import Medicine
+from recurrence import iter_days
+from schedule_index import ScheduleCalendar, ScheduleIndex
+from search_index import SearchIndex
+from storage import WriteBehindStorage, open_storage
+
+
+# Jenis event perubahan data yang dikirim ke subscriber
+MEDICINE_ADDED = 'added'
+MEDICINE_UPDATED = 'updated'
+MEDICINE_REMOVED = 'removed'
+# Perubahan massal (bulk_*): medicine_id None, subscriber membaca ulang semuanya
+MEDICINES_RESET = 'reset'
+
+
+def _minute_ceil(moment):
+    # Dosis dijadwalkan per menit: 08:00:30 jatuh setelah dosis 08:00
+    return moment.hour * 60 + moment.minute + (1 if moment.second or moment.microsecond else 0)
+
+
+class MedicineManager:
+    def __init__(self, storage=None, write_behind=None, history=None, load=True):
+        self.data_dir = os.path.dirname(os.path.abspath(__file__))
+        if storage is None:
+            # Pilih backend lewat MEDIMATE_STORAGE=json|sqlite
+            storage = open_storage(os.environ.get("MEDIMATE_STORAGE", "json"), self.data_dir)
+        if write_behind is not None:
+            # Tulis di thread terpisah, perubahan dalam `write_behind` detik digabung
+            storage = WriteBehindStorage(storage, window=write_behind)
+        self.storage = storage
+        self.data_file = storage.path
+        if history is None:
+            # Riwayat minum disimpan terpisah dari data obat, satu file per hari
+            history_dir = None
+            if storage.path != ":memory:":
+                history_dir = os.path.join(os.path.dirname(os.path.abspath(storage.path)), "history")
+            history = DoseHistory(history_dir)
+        self.history = history
+        # Index ID -> obat; urutan dict = urutan tampilan di UI
+        self._by_id = {}
+        self._list_cache = None
+        self._next_id = 1
+        self.schedule = ScheduleIndex(self.history.is_taken, self.history.day)
+        # Jadwal hari lain (kalender, jendela waktu) diekspansi malas per hari
+        self.calendar = ScheduleCalendar(lambda: self.medicines)
+        self.search_index = SearchIndex()
+        # Perkiraan hari sampai stok habis; dasar daftar "hampir habis"
+        self.forecast = StockForecast()
+        self._listeners = []
+        self.loaded = False
+        if load:
+            self.load()
+
+    def load(self):
+        """Read all medicines from storage and build the indexes.
+
+        Called by the constructor unless load=False; the UI passes False
+        and calls this from a background thread so the window can paint
+        first. Nothing else may touch the manager until it returns.
+        """
+        self._index_medicines(self.load_medicines())
+        self.loaded = True
+        print(f"Loaded {len(self._by_id)} medicines from {self.data_file}")
+
+    @property
+    def medicines(self):
+        """Medicines in display order (rebuilt lazily after mutations)"""
+        if self._list_cache is None:
+            self._list_cache = list(self._by_id.values())
+        return self._list_cache
+
+    def flush(self):
+        """Wait until all queued writes have reached the storage backend"""
+        if isinstance(self.storage, WriteBehindStorage):
+            return self.storage.flush()
+        return True
+
+    def write_metrics(self):
+        """Background writer metrics, or None when writes are synchronous"""
+        if isinstance(self.storage, WriteBehindStorage):
+            return self.storage.metrics()
+        return None
+
+    def close(self):
+        """Flush and close the storage backend (call on application exit)"""
+        try:
+            self.storage.close()
+        except Exception as e:
+            print(f"Error closing storage: {e}")
+
+    def subscribe(self, callback):
+        """Register callback(event, medicine_id, medicine) for data changes"""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, event, medicine_id, medicine=None):
+        for callback in list(self._listeners):
+            try:
+                callback(event, medicine_id, medicine)
+            except Exception as e:
+                print(f"Error in change listener for {event} {medicine_id}: {e}")
+
+    def load_medicines(self):
+        """Load medicines from the storage backend as Medicine records"""
+        try:
+            records = self.storage.load_all()
+            with paused_gc():
+                return [Medicine.from_dict(med) for med in records]
+        except Exception as e:
+            print(f"Error loading medicines: {e}")
+            return []
+
+    def _index_medicines(self, medicines):
+        self._by_id = {med.id: med for med in medicines}
+        self._list_cache = None
+        self.schedule.rebuild(medicines)
+        self.calendar.invalidate()
+        self.search_index.rebuild(medicines)
+        self.forecast.rebuild(medicines)
+        max_id = max(self._by_id, default=0)
+        try:
+            stored_next_id = self.storage.load_next_id() or 0
+        except Exception as e:
+            print(f"Error loading next ID: {e}")
+            stored_next_id = 0
+        self._next_id = max(stored_next_id, max_id + 1)
+
+    def sync_external(self):
+        """Merge changes another process made to the stored data.
+
+        Only records that differ from memory (compared by ID) are touched,
+        and each one emits the usual added/updated/removed event. Returns
+        (added, updated, removed) counts, or None when the storage reports
+        no outside change (our own writes never count as one).
+        """
+        if not self.storage.changed_externally():
+            return None
+        # Tulisan kita yang masih antre harus masuk dulu agar tidak tertimpa
+        self.flush()
+        try:
+            records = self.storage.load_all()
+        except Exception as e:
+            print(f"Error reloading medicines: {e}")
+            return None
+        incoming = {med['id']: Medicine.from_dict(med) for med in records}
+
+        changes = []
+        for medicine_id in [mid for mid in self._by_id if mid not in incoming]:
+            deleted = self._by_id.pop(medicine_id)
+            self._unindex(medicine_id)
+            changes.append((MEDICINE_REMOVED, medicine_id, deleted))
+        for medicine_id, medicine in incoming.items():
+            current = self._by_id.get(medicine_id)
+            if current is None:
+                self._by_id[medicine_id] = medicine
+                self._index(medicine)
+                self._next_id = max(self._next_id, medicine_id + 1)
+                changes.append((MEDICINE_ADDED, medicine_id, medicine))
+            elif current != medicine:
+                self._by_id[medicine_id] = medicine
+                self._reindex(medicine)
+                changes.append((MEDICINE_UPDATED, medicine_id, medicine))
+        if not changes:
+            return (0, 0, 0)
+
+        self._list_cache = None
+        counts = {MEDICINE_ADDED: 0, MEDICINE_UPDATED: 0, MEDICINE_REMOVED: 0}
+        for event, medicine_id, medicine in changes:
+            counts[event] += 1
+            self._emit(event, medicine_id, medicine)
+        print(f"Merged external changes from {self.data_file}: "
+              f"{counts[MEDICINE_ADDED]} added, {counts[MEDICINE_UPDATED]} updated, "
+              f"{counts[MEDICINE_REMOVED]} removed")
+        return counts[MEDICINE_ADDED], counts[MEDICINE_UPDATED], counts[MEDICINE_REMOVED]
+
+    def _index(self, medicine):
+        self.schedule.add(medicine)
+        self.calendar.invalidate()
+        self.search_index.add(medicine)
+        self.forecast.add(medicine)
+
+    def _reindex(self, medicine):
+        self.schedule.update(medicine)
+        self.calendar.invalidate()
+        self.search_index.update(medicine)
+        self.forecast.update(medicine)
+
+    def _unindex(self, medicine_id):
+        self.schedule.remove(medicine_id)
+        self.calendar.invalidate()
+        self.search_index.remove(medicine_id)
+        self.forecast.remove(medicine_id)
+
+    def _allocate_id(self, medicine_id=None):
+        if medicine_id is None:
+            medicine_id = self._next_id
+        # Disimpan bersama record-nya di save_medicine, bukan tulisan terpisah
+        self._next_id = max(self._next_id, medicine_id + 1)
+        return medicine_id
+
+    def save_medicines(self):
+        """Save the whole inventory to the storage backend"""
+        try:
+            self.storage.save_all([med.to_dict() for med in self.medicines])
+            print(f"Saved {len(self.medicines)} medicines to {self.data_file}")
+            return True
+        except Exception as e:
+            print(f"Error saving medicines: {e}")
+            return False
+
+    def save_medicine(self, medicine, next_id=None):
+        """Persist a single medicine record (and the next-ID counter in the same write)"""
+        try:
+            if next_id is None:
+                self.storage.upsert(medicine.to_dict())
+            else:
+                self.storage.write_batch([medicine.to_dict()], [], next_id)
+            return True
+        except Exception as e:
+            print(f"Error saving medicine {medicine.id}: {e}")
+            return False
+
+    def add_medicine(self, medicine_data):
+        """Add new medicine"""
+        # Generate unique ID if not exists
+        medicine_data['id'] = self._allocate_id(medicine_data.get('id'))
+
+        # Add timestamps
+        medicine_data['created_at'] = datetime.now().isoformat()
+
+        medicine = Medicine.from_dict(medicine_data)
+        self._by_id[medicine.id] = medicine
+        self._list_cache = None
+        self._index(medicine)
+        success = self.save_medicine(medicine, self._next_id)
+
+        print(f"Medicine saved: {medicine_data}")
+        self._emit(MEDICINE_ADDED, medicine.id, medicine)
+        return success
+
+    def edit_medicine(self, medicine_id, updated_data):
+        """Update existing medicine by ID"""
+        medicine = self._by_id.get(medicine_id)
+        if medicine is None:
+            print(f"Medicine with ID {medicine_id} not found for update")
+            return False
+
+        # Preserve some fields from original entry
+        updated_data['id'] = medicine_id
+        updated_data['created_at'] = medicine.created_at
+        updated_data['updated_at'] = datetime.now().isoformat()
+
+        # Update the medicine (posisi di dict tetap sama)
+        updated = Medicine.from_dict(updated_data)
+        self._by_id[medicine_id] = updated
+        self._list_cache = None
+        self._reindex(updated)
+        print(f"Medicine updated: {updated_data}")
+        success = self.save_medicine(updated)
+        self._emit(MEDICINE_UPDATED, medicine_id, updated)
+        return success
+
+    def delete_medicine(self, medicine_id):
+        """Delete medicine by ID"""
+        deleted = self._by_id.pop(medicine_id, None)
+        if deleted is None:
+            print(f"Medicine with ID {medicine_id} not found for deletion")
+            return False
+
+        self._list_cache = None
+        self._unindex(medicine_id)
+        print(f"Medicine deleted: {deleted}")
+        try:
+            self.storage.delete(medicine_id)
+            success = True
+        except Exception as e:
+            print(f"Error deleting medicine {medicine_id}: {e}")
+            success = False
+        self._emit(MEDICINE_REMOVED, medicine_id, deleted)
+        return success
+
+    def bulk_add(self, medicines):
+        """Add many medicines with one storage write and one reset event.
+
+        Like add_medicine, every dict gets its new 'id' and 'created_at';
+        an ID that is missing or already taken is replaced by a fresh one.
+        """
+        now = datetime.now().isoformat()
+        added = []
+        with paused_gc():
+            for medicine_data in medicines:
+                medicine_id = medicine_data.get('id')
+                if medicine_id is None or medicine_id in self._by_id:
+                    medicine_id = self._next_id
+                self._next_id = max(self._next_id, medicine_id + 1)
+                medicine_data['id'] = medicine_id
+                medicine_data['created_at'] = now
+                medicine = Medicine.from_dict(medicine_data)
+                self._by_id[medicine_id] = medicine
+                added.append(medicine)
+            self.schedule.add_many(added)
+            self.search_index.add_many(added)
+            for medicine in added:
+                self.forecast.add(medicine)
+        if not added:
+            return True
+        return self._commit_bulk(added, [], self._next_id, f"{len(added)} added")
+
+    def bulk_update(self, updates):
+        """Apply {medicine_id: updated_data} with one storage write and one reset event.
+
+        All IDs must exist; otherwise nothing is changed and False is returned.
+        """
+        missing = [medicine_id for medicine_id in updates if medicine_id not in self._by_id]
+        if missing:
+            print(f"Medicines with IDs {missing} not found for update")
+            return False
+        now = datetime.now().isoformat()
+        updated = []
+        with paused_gc():
+            for medicine_id, updated_data in updates.items():
+                updated_data['id'] = medicine_id
+                updated_data['created_at'] = self._by_id[medicine_id].created_at
+                updated_data['updated_at'] = now
+                medicine = Medicine.from_dict(updated_data)
+                self._by_id[medicine_id] = medicine
+                updated.append(medicine)
+            self.schedule.remove_many(updates)
+            self.schedule.add_many(updated)
+            for medicine in updated:
+                self.search_index.remove(medicine.id)
+                self.forecast.update(medicine)
+            self.search_index.add_many(updated)
+        if not updated:
+            return True
+        return self._commit_bulk(updated, [], None, f"{len(updated)} updated")
+
+    def bulk_delete(self, medicine_ids):
+        """Delete many medicines with one storage write and one reset event.
+
+        All IDs must exist; otherwise nothing is deleted and False is returned.
+        """
+        medicine_ids = list(dict.fromkeys(medicine_ids))
+        missing = [medicine_id for medicine_id in medicine_ids if medicine_id not in self._by_id]
+        if missing:
+            print(f"Medicines with IDs {missing} not found for deletion")
+            return False
+        if not medicine_ids:
+            return True
+        for medicine_id in medicine_ids:
+            del self._by_id[medicine_id]
+            self.search_index.remove(medicine_id)
+            self.forecast.remove(medicine_id)
+        self.schedule.remove_many(medicine_ids)
+        return self._commit_bulk([], medicine_ids, None, f"{len(medicine_ids)} deleted")
+
+    def _commit_bulk(self, upserts, deletes, next_id, summary):
+        self._list_cache = None
+        self.calendar.invalidate()
+        try:
+            # Satu batch = satu transaksi SQLite / satu snapshot JSON
+            self.storage.write_batch([medicine.to_dict() for medicine in upserts], deletes, next_id)
+            success = True
+        except Exception as e:
+            print(f"Error saving bulk change ({summary}): {e}")
+            success = False
+        print(f"Bulk change: {summary}")
+        self._emit(MEDICINES_RESET, None)
+        return success
+
+    def take_dose(self, medicine, time):
+        """Mark one scheduled dose as taken and reduce stock by the dose amount"""
+        return self.take_doses([(medicine, time)])
+
+    def take_doses(self, doses, day=None):
+        """Mark several (medicine, time) doses as taken with one history write.
+
+        `day` is the day the doses were scheduled for (default: today).
+        Doses that are already taken (or listed twice) are skipped, so a
+        repeated acknowledgement neither reduces the stock again nor emits
+        another event.
+        """
+        self.check_day_rollover()
+        today = day is None or day == self.history.day
+        taken = self.history.taken_on(day or self.history.day)
+        new = []
+        for medicine, time in doses:
+            key = (medicine.id, time)
+            if key not in taken:
+                taken.add(key)
+                new.append((medicine, time))
+        self.history.record_taken_many([(medicine.id, time) for medicine, time in new], day=day)
+        success = True
+        for medicine, time in new:
+            # Kurangi stok sesuai dosis hari itu (langkah taper); string dosis di-parse sekali, lalu di-cache
+            medicine.stock = max(0, medicine.stock - self.forecast.dose(medicine, day or self.history.day).stock_units)
+            self.forecast.update(medicine)
+            if today:
+                self.schedule.set_status(medicine.id, time, "Sudah Diminum")
+            else:
+                # Dosis hari lalu yang dikonfirmasi terlambat tidak mengubah status hari ini
+                self.calendar.forget(day)
+            success = self.save_medicine(medicine) and success
+            self._emit(MEDICINE_UPDATED, medicine.id, medicine)
+        return success
+
+    def get_medicine_by_id(self, medicine_id):
+        """Get medicine data by ID"""
+        return self._by_id.get(medicine_id)
+
+    def get_medicines_count(self):
+        """Get total number of medicines"""
+        return len(self._by_id)
+
+    def search(self, query):
+        """Return IDs of medicines matching `query` (None when query is empty)"""
+        return self.search_index.search(query)
+
+    def is_dose_taken(self, medicine_id, time):
+        """Whether the dose at `time` was taken today"""
+        self.check_day_rollover()
+        return self.history.is_taken(medicine_id, time)
+
+    def check_day_rollover(self):
+        """Start a fresh day of dose statuses after midnight (no inventory rewrite)"""
+        if not self.history.rollover():
+            return
+        # Item hari lain dibangun dengan status relatif ke hari yang lama
+        self.calendar.forget()
+        # Pemakaian obat beraturan bergantung pada hari ini (langkah taper, kursus selesai)
+        for medicine in self.medicines:
+            if medicine.recurrence is not None:
+                self.forecast.update(medicine)
+        for medicine_id in self.schedule.set_day(self.history.day, self.medicines):
+            self._emit(MEDICINE_UPDATED, medicine_id, self._by_id.get(medicine_id))
+
+    def get_today_schedule(self):
+        """Get today's medicine schedule with correct status"""
+        self.check_day_rollover()
+        start = datetime.combine(self.history.day, datetime.min.time())
+        return [item for _, item in self.get_schedule_window(start, start + timedelta(days=1))]
+
+    def get_schedule_window(self, start, end):
+        """Lazily yield (date, item) for every dose with start <= time < end, in time order.
+
+        start and end are datetimes. Today's items come from the live
+        schedule; other days are expanded from the recurrence rules, with
+        the status from that day's dose history, and their items are cached
+        per day. Items have the same fields as get_today_schedule() and,
+        like those, are shared: treat them as read-only.
+        """
+        self.check_day_rollover()
+        today = self.history.day
+        last = (end - timedelta(microseconds=1)).date()
+        for day in iter_days(start.date(), last):
+            lo = _minute_ceil(start) if day == start.date() else 0
+            hi = _minute_ceil(end) if day == end.date() else 24 * 60
+            if day == today:
+                for item in self.schedule.between(lo, hi - 1):
+                    yield day, item
+                continue
+            taken_on = self.history.taken_on if day < today else None
+            for item in self.calendar.items_between(day, lo, hi, taken_on):
+                yield day, item
+
+    def get_schedule_between(self, start, end):
+        """Get doses scheduled between two times, e.g. ("08:00", "12:00")"""
+        self.check_day_rollover()
+        return self.schedule.between(start, end)
+
+    def get_next_doses(self, count, after=None):
+        """Get the next `count` doses at or after `after` (default: now)"""
+        if after is None:
+            after = datetime.now().strftime("%H:%M")
+        self.check_day_rollover()
+        return self.schedule.next_doses(count, after)
+
+    def get_low_stock_medicines(self):
+        """Medicines that run out within the forecast horizon, in display order"""
+        low = self.forecast.low_stock_ids()
+        return [med for med in self.medicines if med.id in low]
+
+    def get_low_stock_count(self):
+        return len(self.forecast.low_stock_ids())
+
+    def set_low_stock_horizon(self, days):
+        """Flag medicines that run out within `days` days"""
+        self.forecast.set_horizon(days)
+
+    def days_until_empty(self, medicine_id):
+        """Days the stock of one medicine lasts at its schedule (inf if never used up)"""
+        return self.forecast.days_left(medicine_id)
@@ -1,148 +1,36 @@
 import sys
+import time
+STARTUP_STARTED = time.perf_counter()
+
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QPushButton, QFrame, QScrollArea,
                             QGridLayout, QSpacerItem, QSizePolicy, QLineEdit, QStackedWidget,
-                            QDialog, QComboBox, QSpinBox, QTextEdit, QTimeEdit, QMessageBox)
-from PyQt6.QtCore import Qt, QSize, QFileSystemWatcher, QTime, QTimer, QUrl
-from PyQt6.QtMultimedia import QSoundEffect
+                            QDialog, QComboBox, QSpinBox, QTextEdit, QTimeEdit, QMessageBox,
+                            QTableView, QHeaderView, QStyledItemDelegate, QAbstractItemView,
+                            QInputDialog, QFileDialog, QProgressDialog)
+from PyQt6.QtCore import (Qt, QSize, QTime, QTimer, QRect, QEvent,
+                          QAbstractTableModel, QModelIndex, QSortFilterProxyModel, pyqtSignal,
+                          QThread, QSocketNotifier)
 from PyQt6.QtGui import QFont, QPalette, QColor, QPainter, QPen, QLinearGradient
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import os
-import json
-
-class MedicineManager:
-    def __init__(self):
-        self.data_dir = os.path.dirname(os.path.abspath(__file__))
-        self.data_file = os.path.join(self.data_dir, "medicines.json")
-        self.medicines = self.load_medicines()
-        print(f"Loaded {len(self.medicines)} medicines from {self.data_file}")
-    
-    def load_medicines(self):
-        """Load medicines from JSON file"""
-        try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        return data
-                    return []
-            else:
-                print(f"Data file not found: {self.data_file}")
-                return []
-        except Exception as e:
-            print(f"Error loading medicines: {e}")
-            return []
-    
-    def save_medicines(self):
-        """Save medicines to JSON file"""
-        try:
-            # Pastikan direktori ada
-            os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-            
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.medicines, f, ensure_ascii=False, indent=2)
-            
-            print(f"Saved {len(self.medicines)} medicines to {self.data_file}")
-            return True
-        except Exception as e:
-            print(f"Error saving medicines: {e}")
-            return False
-    
-    def add_medicine(self, medicine_data):
-        """Add new medicine"""
-        # Generate unique ID if not exists
-        if 'id' not in medicine_data:
-            # Find highest existing ID
-            max_id = 0
-            for med in self.medicines:
-                if 'id' in med and med['id'] > max_id:
-                    max_id = med['id']
-            medicine_data['id'] = max_id + 1
-
-        # Tambahkan field status minum
-        medicine_data['taken_times'] = []  # List waktu yang sudah diminum
-        medicine_data['status_per_time'] = {}  # Dict waktu: status
-
-        # Add timestamps
-        medicine_data['created_at'] = datetime.now().isoformat()
 
-        self.medicines.append(medicine_data)
-        success = self.save_medicines()
-        
-        print(f"Medicine saved: {medicine_data}")
-        return success
-    
-    def edit_medicine(self, medicine_id, updated_data):
-        """Update existing medicine by ID"""
-        for i, medicine in enumerate(self.medicines):
-            if medicine.get('id') == medicine_id:
-                # Preserve some fields from original entry
-                updated_data['id'] = medicine_id
-                updated_data['created_at'] = medicine.get('created_at')
-                updated_data['updated_at'] = datetime.now().isoformat()
-                
-                # Update the medicine
-                self.medicines[i] = updated_data
-                print(f"Medicine updated: {updated_data}")
-                return self.save_medicines()
-                
-        print(f"Medicine with ID {medicine_id} not found for update")
-        return False
-    
-    def delete_medicine(self, medicine_id):
-        """Delete medicine by ID"""
-        for i, medicine in enumerate(self.medicines):
-            if medicine.get('id') == medicine_id:
-                deleted = self.medicines.pop(i)
-                print(f"Medicine deleted: {deleted}")
-                return self.save_medicines()
-                
-        print(f"Medicine with ID {medicine_id} not found for deletion")
-        return False
-    
-    def get_medicine_by_id(self, medicine_id):
-        """Get medicine data by ID"""
-        for medicine in self.medicines:
-            if medicine.get('id') == medicine_id:
-                return medicine
-        return None
-    
-    def get_medicines_count(self):
-        """Get total number of medicines"""
-        return len(self.medicines)
-    
-    def get_today_schedule(self):
-        """Get today's medicine schedule with correct status"""
-        schedule = []
-        for medicine in self.medicines:
-            taken_times = medicine.get('taken_times', [])
-            for time in medicine.get('times', []):
-                status = "Sudah Diminum" if time in taken_times else "Belum Diminum"
-                schedule.append({
-                    'time': time,
-                    'medicine': f"{medicine['name']} - {medicine['dose']}",
-                    'status': status
-                })
-        # Sort by time
-        schedule.sort(key=lambda x: x['time'])
-        return schedule
-    
-    def get_low_stock_medicines(self):
-        """Get medicines with low stock (less than 10)"""
-        return [med for med in self.medicines if med.get('stock', 0) < 10]
+from alarm_scheduler import AlarmScheduler
+from adherence import ON_TIME_MINUTES, combine
+from alarm_sounds import AlarmSoundBank, most_urgent, sound_for, PRIORITY_SOUNDS
+from daemon_client import RemotePatients, connect_daemon
+from data_watcher import DataFileWatcher
+from import_export import add_records, export_medicines, read_medicines
+from medicine_manager import MEDICINE_ADDED, MEDICINE_REMOVED, MEDICINES_RESET
+from patients import PatientRegistry
+from theme import STYLESHEET, app_font, set_state
 
 class StatCard(QFrame):
-    def __init__(self, value, title, gradient_colors=("#FF6B9D", "#C44569"), icon="📊"):
+    def __init__(self, value, title, accent="total", icon="📊"):
         super().__init__()
+        self.setObjectName("statCard")
+        self.setProperty("accent", accent)
         self.setFixedSize(280, 180)
-        self.setStyleSheet(f"""
-            QFrame {{
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 {gradient_colors[0]}, stop:1 {gradient_colors[1]});
-                border-radius: 25px;
-                border: none;
-            }}
-        """)
         
         layout = QVBoxLayout()
         layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -151,50 +39,31 @@ class StatCard(QFrame):
         
         # Value label - Pastikan background transparan
         value_label = QLabel(str(value))
+        self.value_label = value_label
+        value_label.setObjectName("statValue")
         value_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        value_label.setFont(QFont("Segoe UI", 52, QFont.Weight.Bold))  # Ukuran lebih besar karena fokus utama
-        value_label.setStyleSheet("""
-            QLabel {
-                background: transparent;
-                color: white;
-                border: none;
-                margin: 0px;
-                padding: 0px;
-            }
-        """)
+        value_label.setFont(app_font(52, QFont.Weight.Bold))  # Ukuran lebih besar karena fokus utama
         
         # Title label - Pastikan background transparan
         title_label = QLabel(title)
+        title_label.setObjectName("statTitle")
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        title_label.setFont(QFont("Segoe UI", 15, QFont.Weight.Medium))  # Font lebih besar karena lebih ruang
-        title_label.setStyleSheet("""
-            QLabel {
-                background: transparent;
-                color: rgba(255, 255, 255, 0.95);
-                border: none;
-                margin: 0px;
-                padding: 0px;
-            }
-        """)
+        title_label.setFont(app_font(15, QFont.Weight.Medium))  # Font lebih besar karena lebih ruang
         title_label.setWordWrap(True)
         title_label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
         
         layout.addWidget(value_label)
         layout.addWidget(title_label)
         self.setLayout(layout)
+    
+    def set_value(self, value):
+        self.value_label.setText(str(value))
 
 class MedicationRow(QFrame):
     def __init__(self, time, medication, status):
         super().__init__()
+        self.setObjectName("medicationRow")
         self.setFixedHeight(105)  # Tinggi diperbesar lagi
-        self.setStyleSheet("""
-            QFrame {
-                background-color: white;
-                border: 1px solid rgba(226, 232, 240, 0.8);
-                margin: 8px 0px;
-                border-radius: 15px;
-            }
-        """)
         
         layout = QHBoxLayout()
         layout.setContentsMargins(25, 12, 25, 12)  # Vertical padding dikurangi
@@ -202,34 +71,22 @@ class MedicationRow(QFrame):
         
         # Time container
         time_container = QFrame()
+        time_container.setObjectName("medicationTime")
         time_container.setFixedSize(80, 60)
-        time_container.setStyleSheet("""
-            QFrame {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #667eea, stop:1 #764ba2);
-                border-radius: 12px;
-                border: none;
-            }
-        """)
         
         time_layout = QVBoxLayout(time_container)
         time_layout.setContentsMargins(5, 5, 5, 5)
         time_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         time_label = QLabel(time)
-        time_label.setFont(QFont("Segoe UI", 13, QFont.Weight.Bold))
-        time_label.setStyleSheet("color: white; background: transparent; border: none;")
+        time_label.setObjectName("medicationTimeLabel")
+        time_label.setFont(app_font(13, QFont.Weight.Bold))
         time_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         time_layout.addWidget(time_label)
         
         # Container untuk medication label
         med_container = QFrame()
-        med_container.setStyleSheet("""
-            QFrame {
-                background: transparent;
-                border: none;
-            }
-        """)
+        med_container.setObjectName("medicationInfo")
         med_container_layout = QVBoxLayout(med_container)
         med_container_layout.setContentsMargins(0, 0, 0, 0)
         
@@ -238,13 +95,8 @@ class MedicationRow(QFrame):
         
         # Medication label
         med_label = QLabel(medication)
-        med_label.setFont(QFont("Segoe UI", 14, QFont.Weight.Medium))
-        med_label.setStyleSheet("""
-            color: #2D3748; 
-            background: transparent; 
-            border: none;
-            padding: 2px 0px;
-        """)
+        med_label.setObjectName("medicationName")
+        med_label.setFont(app_font(14, QFont.Weight.Medium))
         med_label.setWordWrap(True)
         
         # PERUBAHAN: Size policy yang lebih tepat untuk label
@@ -252,42 +104,13 @@ class MedicationRow(QFrame):
         
         med_container_layout.addWidget(med_label)
         
-        # Status button
+        # Status button (warna dari property "taken" di theme.STYLESHEET)
         status_btn = QPushButton(status)
-        status_btn.setFont(QFont("Segoe UI", 11, QFont.Weight.Medium))
+        status_btn.setObjectName("medicationStatus")
+        status_btn.setProperty("taken", status == "Sudah Diminum")
+        status_btn.setFont(app_font(11, QFont.Weight.Medium))
         status_btn.setFixedSize(140, 40)
         
-        if status == "Sudah Diminum":
-            status_btn.setStyleSheet("""
-                QPushButton {
-                    background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                        stop:0 #48BB78, stop:1 #38A169);
-                    color: white;
-                    border: none;
-                    border-radius: 20px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                        stop:0 #38A169, stop:1 #2F855A);
-                }
-            """)
-        else:
-            status_btn.setStyleSheet("""
-                QPushButton {
-                    background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                        stop:0 #F56565, stop:1 #E53E3E);
-                    color: white;
-                    border: none;
-                    border-radius: 20px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                        stop:0 #E53E3E, stop:1 #C53030);
-                }
-            """)
-        
         layout.addWidget(time_container)
         layout.addWidget(med_container)
         layout.addStretch()
@@ -298,62 +121,449 @@ class MedicationRow(QFrame):
 class SidebarButton(QPushButton):
     def __init__(self, text, icon="", is_active=False):
         super().__init__(f"  {icon}  {text}")
+        self.setObjectName("sidebarButton")
+        self.setProperty("active", is_active)
         self.setFixedHeight(55)
-        self.setFont(QFont("Segoe UI", 13, QFont.Weight.Medium))
+        self.setFont(app_font(13, QFont.Weight.Medium))
+    
+    def set_active(self, active):
+        set_state(self, "active", active)
+
+class ScheduleRows:
+    """Keeps a layout of schedule rows in sync with the schedule index"""
+    
+    def __init__(self, layout, schedule, make_row, empty_widget):
+        self.layout = layout
+        self.schedule = schedule
+        self.make_row = make_row
+        self.empty_widget = empty_widget
+        self.rows = {}  # index key -> row widget
+        self.keys_by_medicine = {}
+        for key, item in schedule.entries():
+            self.rows[key] = make_row(item)
+            self.keys_by_medicine.setdefault(key[1], []).append(key)
+            layout.addWidget(self.rows[key])
+        self.empty_widget.setVisible(not self.rows)
+    
+    def update(self, medicine_ids):
+        """Replace only the rows belonging to the given medicines"""
+        for medicine_id in medicine_ids:
+            for key in self.keys_by_medicine.pop(medicine_id, []):
+                row = self.rows.pop(key)
+                self.layout.removeWidget(row)
+                row.deleteLater()
+        
+        # Sisipkan urut naik agar posisi di index = posisi di layout
+        new_keys = sorted(key for medicine_id in medicine_ids
+                          for key in self.schedule.keys_for(medicine_id))
+        for key in new_keys:
+            row = self.make_row(self.schedule.item(key))
+            self.layout.insertWidget(self.schedule.position(key), row)
+            self.rows[key] = row
+            self.keys_by_medicine.setdefault(key[1], []).append(key)
+        self.empty_widget.setVisible(not self.rows)
+
+class MedicineTableModel(QAbstractTableModel):
+    """Table model over MedicineManager data for the "Daftar Obat" page"""
+    
+    HEADERS = ["Nama Obat", "Dosis", "Stok", "Jadwal", "Aksi"]
+    ID_ROLE = Qt.ItemDataRole.UserRole
+    SORT_ROLE = Qt.ItemDataRole.UserRole + 1
+    
+    def __init__(self, medicine_manager, parent=None):
+        super().__init__(parent)
+        self.medicine_manager = medicine_manager
+        self.medicine_ids = [med.id for med in medicine_manager.medicines]
+        self._rows = None  # medicine_id -> row, dibangun ulang setelah hapus
+        medicine_manager.subscribe(self.on_medicine_changed)
+    
+    def detach(self):
+        self.medicine_manager.unsubscribe(self.on_medicine_changed)
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.medicine_ids)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        medicine = self.medicine_manager.get_medicine_by_id(self.medicine_ids[index.row()])
+        if medicine is None:
+            return None
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return medicine.name
+            if column == 1:
+                return medicine.dose
+            if column == 2:
+                return f"{medicine.stock} {medicine.stock_unit or 'tablet'}"
+            if column == 3:
+                return medicine.schedule_label()
+        elif role == self.ID_ROLE:
+            return medicine.id
+        elif role == self.SORT_ROLE:
+            if column == 0:
+                return medicine.name.lower()
+            if column == 1:
+                return medicine.dose.lower()
+            if column == 2:
+                return medicine.stock
+            if column == 3:
+                # Menit-dalam-hari: urutannya sama dengan "HH:MM"
+                return min(medicine.minutes, default=-1)
+            return index.row()
+        return None
+    
+    def row_of(self, medicine_id):
+        if self._rows is None:
+            self._rows = {medicine_id: row for row, medicine_id in enumerate(self.medicine_ids)}
+        return self._rows.get(medicine_id)
+    
+    def on_medicine_changed(self, event, medicine_id, medicine):
+        if event == MEDICINES_RESET:
+            self.beginResetModel()
+            self.medicine_ids = [med.id for med in self.medicine_manager.medicines]
+            self._rows = None
+            self.endResetModel()
+            return
+        if event == MEDICINE_ADDED:
+            row = len(self.medicine_ids)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.medicine_ids.append(medicine_id)
+            if self._rows is not None:
+                self._rows[medicine_id] = row
+            self.endInsertRows()
+            return
         
-        if is_active:
-            self.setStyleSheet("""
-                QPushButton {
-                    background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                        stop:0 #667eea, stop:1 #764ba2);
-                    color: white;
-                    border: none;
-                    border-radius: 15px;
-                    text-align: left;
-                    padding-left: 20px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                        stop:0 #5a67d8, stop:1 #6b46c1);
-                }
-            """)
+        row = self.row_of(medicine_id)
+        if row is None:
+            return
+        if event == MEDICINE_REMOVED:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.medicine_ids[row]
+            self._rows = None
+            self.endRemoveRows()
         else:
-            self.setStyleSheet("""
-                QPushButton {
-                    background-color: transparent;
-                    color: #4A5568;
-                    border: none;
-                    border-radius: 15px;
-                    text-align: left;
-                    padding-left: 20px;
-                }
-                QPushButton:hover {
-                    background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                        stop:0 rgba(102, 126, 234, 0.1), stop:1 rgba(118, 75, 162, 0.1));
-                    color: #2D3748;
-                }
-            """)
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+class AdherenceTableModel(QAbstractTableModel):
+    """Table model over adherence rows (PatientRegistry.adherence) for the "Kepatuhan" page"""
+    
+    HEADERS = ["Nama", "Jadwal", "Diminum", "Patuh", "Tepat", "Telat", "Terlewat", "Streak"]
+    HEADER_TIPS = ["", "Dosis yang dijadwalkan", "Dosis yang diminum", "Dosis diminum dari yang dijadwalkan",
+                   "Dosis diminum tepat waktu dari yang dijadwalkan", "Rata-rata keterlambatan dosis yang diminum",
+                   "Dosis yang tidak diminum", "Dosis terlewat berturut-turut terpanjang (dan yang sedang berjalan)"]
+    SORT_ROLE = Qt.ItemDataRole.UserRole + 1
+    # Kepatuhan di bawah ini ditandai merah
+    LOW_ADHERENCE = 0.8
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+    
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.ToolTipRole:
+            return self.HEADER_TIPS[section] or None
+        return None
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return row['name']
+            if column == 1:
+                return str(row['scheduled'])
+            if column == 2:
+                return str(row['taken'])
+            if column == 3:
+                return f"{row['adherence']:.0%}"
+            if column == 4:
+                return f"{row['on_time_rate']:.0%}"
+            if column == 5:
+                return f"{row['avg_delay']:.0f} mnt"
+            if column == 6:
+                return str(row['missed'])
+            if column == 7:
+                current = row['current_missed_streak']
+                return f"{row['longest_missed_streak']}" + (f" (kini {current})" if current else "")
+        elif role == Qt.ItemDataRole.ForegroundRole:
+            if column == 3 and row['adherence'] < self.LOW_ADHERENCE:
+                return QColor("#E53E3E")
+        elif role == self.SORT_ROLE:
+            keys = ('name', 'scheduled', 'taken', 'adherence', 'on_time_rate',
+                    'avg_delay', 'missed', 'longest_missed_streak')
+            value = row[keys[column]]
+            return value.lower() if column == 0 else value
+        return None
+
+class MedicineFilterProxyModel(QSortFilterProxyModel):
+    """Sort proxy that can also limit rows to a set of medicine IDs"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.medicine_ids = None  # None = tampilkan semua
+    
+    def set_medicine_ids(self, medicine_ids):
+        self.medicine_ids = medicine_ids
+        self.invalidateFilter()
+    
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.medicine_ids is None:
+            return True
+        source_model = self.sourceModel()
+        return source_model.medicine_ids[source_row] in self.medicine_ids
+
+class MedicineRowDelegate(QStyledItemDelegate):
+    """Paints medicine rows with the list's look, including Edit/Hapus buttons"""
+    
+    edit_requested = pyqtSignal(int)
+    delete_requested = pyqtSignal(int)
+    
+    BUTTON_SIZE = QSize(70, 35)
+    BUTTON_STYLES = {
+        # nama: (background, hover background, warna teks)
+        "edit": ("#EDF2F7", "#E2E8F0", "#4A5568"),
+        "delete": ("#FED7D7", "#FEB2B2", "#E53E3E"),
+    }
+    
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+        self.name_font = app_font(13, QFont.Weight.Medium)
+        self.cell_font = app_font(13)
+        self.button_font = app_font(11)
+        self.hover = None  # (medicine_id, nama tombol)
+    
+    def button_rects(self, rect):
+        top = rect.center().y() - self.BUTTON_SIZE.height() // 2
+        edit_rect = QRect(rect.left() + 8, top, self.BUTTON_SIZE.width(), self.BUTTON_SIZE.height())
+        delete_rect = edit_rect.translated(self.BUTTON_SIZE.width() + 8, 0)
+        return {"edit": edit_rect, "delete": delete_rect}
+    
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = option.rect
+        if index.column() == len(MedicineTableModel.HEADERS) - 1:
+            medicine_id = index.data(MedicineTableModel.ID_ROLE)
+            painter.setFont(self.button_font)
+            labels = {"edit": "Edit", "delete": "Hapus"}
+            for name, button_rect in self.button_rects(rect).items():
+                background, hover_background, color = self.BUTTON_STYLES[name]
+                is_hover = self.hover == (medicine_id, name)
+                painter.setPen(Qt.PenStyle.NoPen)
+                painter.setBrush(QColor(hover_background if is_hover else background))
+                painter.drawRoundedRect(button_rect, 8, 8)
+                painter.setPen(QColor(color))
+                painter.drawText(button_rect, Qt.AlignmentFlag.AlignCenter, labels[name])
+        else:
+            painter.setFont(self.name_font if index.column() == 0 else self.cell_font)
+            painter.setPen(QColor("#2D3748" if index.column() == 0 else "#4A5568"))
+            text_rect = rect.adjusted(8, 0, -8, 0)
+            text = painter.fontMetrics().elidedText(
+                index.data() or "", Qt.TextElideMode.ElideRight, text_rect.width())
+            painter.drawText(text_rect, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, text)
+        
+        # Separator between rows
+        painter.setPen(QPen(QColor("#E2E8F0"), 1))
+        painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+        painter.restore()
+    
+    def editorEvent(self, event, model, option, index):
+        if index.column() != len(MedicineTableModel.HEADERS) - 1:
+            if self.hover is not None and event.type() == QEvent.Type.MouseMove:
+                self.hover = None
+                self.view.viewport().update()
+            return False
+        
+        medicine_id = index.data(MedicineTableModel.ID_ROLE)
+        if event.type() in (QEvent.Type.MouseMove, QEvent.Type.MouseButtonRelease):
+            pos = event.position().toPoint()
+            hit = None
+            for name, button_rect in self.button_rects(option.rect).items():
+                if button_rect.contains(pos):
+                    hit = name
+            hover = (medicine_id, hit) if hit else None
+            if hover != self.hover:
+                self.hover = hover
+                self.view.viewport().update(option.rect)
+            if event.type() == QEvent.Type.MouseButtonRelease and hit == "edit":
+                self.edit_requested.emit(medicine_id)
+                return True
+            if event.type() == QEvent.Type.MouseButtonRelease and hit == "delete":
+                self.delete_requested.emit(medicine_id)
+                return True
+        return False
+
+class MedicineTableView(QTableView):
+    """Table view that splits its width between columns by fixed ratios"""
+    
+    def __init__(self, column_ratios, parent=None):
+        super().__init__(parent)
+        self.column_ratios = column_ratios
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        width = self.viewport().width()
+        total = sum(self.column_ratios)
+        for column, ratio in enumerate(self.column_ratios):
+            self.setColumnWidth(column, width * ratio // total)
+    
+    def leaveEvent(self, event):
+        super().leaveEvent(event)
+        delegate = self.itemDelegate()
+        if getattr(delegate, 'hover', None) is not None:
+            delegate.hover = None
+            self.viewport().update()
+
+class StartupProfile:
+    """Timestamps of the startup steps, printed with --profile-startup"""
+    
+    def __init__(self, enabled=False, started=STARTUP_STARTED):
+        self.enabled = enabled
+        self.marks = [("process start", started)]
+        self.reported = False
+    
+    def mark(self, step):
+        if self.enabled and not self.reported:
+            self.marks.append((step, time.perf_counter()))
+    
+    def has(self, step):
+        return any(name == step for name, _ in self.marks)
+    
+    def report(self):
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        started = self.marks[0][1]
+        print("\nStartup profile")
+        print(f"  {'step':<28}{'step ms':>10}{'total ms':>10}")
+        for (_, previous), (name, at) in zip(self.marks, self.marks[1:]):
+            print(f"  {name:<28}{(at - previous) * 1000:>10.1f}{(at - started) * 1000:>10.1f}")
+
+class DataLoader(QThread):
+    """Opens a patient's medicine shard off the GUI thread; `finished` fires when done"""
+    
+    def __init__(self, patients, patient_id, parent=None):
+        super().__init__(parent)
+        self.patients = patients
+        self.patient_id = patient_id
+        self.medicine_manager = None
+        self.error = None
+    
+    def run(self):
+        try:
+            self.medicine_manager = self.patients.manager(self.patient_id)
+        except Exception as e:
+            self.error = e
+
+class DoseWriter(QThread):
+    """Records acknowledged doses of patients whose shard is not open, off the GUI thread"""
+    
+    def __init__(self, patients, doses, parent=None):
+        super().__init__(parent)
+        self.patients = patients
+        self.doses = doses  # (patient_id, day) -> [(medicine_id, "HH:MM")]
+    
+    def run(self):
+        for (patient_id, day), patient_doses in self.doses.items():
+            try:
+                self.patients.take_doses(patient_id, patient_doses, day)
+            except Exception as e:
+                print(f"Gagal mencatat dosis pasien {patient_id}: {e}")
+
+class MedicineImporter(QThread):
+    """Reads and validates an import file off the GUI thread.
+
+    The records are added by the GUI thread when `finished` fires; the
+    manager is only touched from there.
+    """
+    
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.records = []
+        self.report = None
+        self.error = None
+    
+    def run(self):
+        try:
+            self.records, self.report = read_medicines(self.path)
+        except (OSError, ValueError) as e:
+            self.error = e
+
+class AdherenceLoader(QThread):
+    """Computes adherence rows off the GUI thread.
+
+    The first call records every finished day that has no dose events
+    yet (up to a year of history per patient), which reads one history
+    partition per day.
+    """
+    
+    def __init__(self, patients, first, last, patient_id, parent=None):
+        super().__init__(parent)
+        self.patients = patients
+        self.first = first
+        self.last = last
+        self.patient_id = patient_id
+        self.rows = None
+        self.error = None
+    
+    def run(self):
+        try:
+            self.rows = self.patients.adherence(self.first, self.last, self.patient_id)
+        except Exception as e:
+            self.error = e
 
 class MediMateApp(QMainWindow):
-    def __init__(self):
+    MEDICINE_LIST_WIDTHS = [3, 2, 1, 3, 2]
+    
+    def __init__(self, profile=None):
         super().__init__()
+        self.profile = profile or StartupProfile()
         self.setWindowTitle("💊 MediMate - Smart Medicine Companion")
         self.setGeometry(100, 100, 1400, 800)
-        self.setStyleSheet("""
-            QMainWindow {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #f093fb, stop:0.5 #f5576c, stop:1 #4facfe);
-            }
-        """)
         
-        # Initialize medicine manager
-        self.medicine_manager = MedicineManager()
-        
-        # File watcher for auto-reload
-        self.file_watcher = QFileSystemWatcher()
-        self.file_watcher.addPath(__file__)
-        self.file_watcher.fileChanged.connect(self.file_changed)
+        # Satu shard data per pasien (penyimpanan ditulis di background).
+        # Obat pasien aktif dibaca di thread terpisah setelah window tampil.
+        # Jika daemon MediMate berjalan, data dan alarm ada di sana dan UI
+        # hanya menjadi klien tipis.
+        self.daemon = connect_daemon()
+        if self.daemon is not None:
+            print(f"Terhubung ke daemon MediMate di {self.daemon.path}")
+            self.patients = RemotePatients(self.daemon, defer_dispatch=self.defer_daemon_dispatch)
+            self.patients.on_due = self.on_dose_due
+            self.daemon_notifier = QSocketNotifier(self.daemon.fileno(), QSocketNotifier.Type.Read, self)
+            self.daemon_notifier.activated.connect(self.on_daemon_readable)
+        else:
+            self.patients = PatientRegistry(os.path.dirname(os.path.abspath(__file__)), write_behind=0.5)
+        self.current_patient_id = self.patients.patients()[0]['id']
+        self.medicine_manager = None
+        self.data_watcher = None
         
         # Central widget
         central_widget = QWidget()
@@ -372,13 +582,7 @@ class MediMateApp(QMainWindow):
         
         # Content container yang akan berisi berbagai halaman
         self.content_container = QFrame()
-        self.content_container.setStyleSheet("""
-            QFrame {
-                background: rgba(255, 255, 255, 0.95);
-                border-radius: 25px;
-                border: 1px solid rgba(255, 255, 255, 0.3);
-            }
-        """)
+        self.content_container.setObjectName("panel")
         
         self.content_layout = QVBoxLayout(self.content_container)
         self.content_layout.setContentsMargins(0, 0, 0, 0)
@@ -387,83 +591,253 @@ class MediMateApp(QMainWindow):
         self.stacked_widget = QStackedWidget()
         self.content_layout.addWidget(self.stacked_widget)
         
-        # Buat halaman Dashboard
-        self.dashboard_page = QWidget()
-        self.create_dashboard(self.dashboard_page)
-        self.stacked_widget.addWidget(self.dashboard_page)
-        
-        # Buat halaman Daftar Obat
-        self.medicine_list_page = QWidget()
-        self.create_medicine_list(self.medicine_list_page)
-        self.stacked_widget.addWidget(self.medicine_list_page)
+        # Halaman dibangun saat pertama kali dibuka lewat change_page.
+        # Disimpan sebagai nama method agar hot reload memakai kode baru.
+        self.page_builders = {
+            "Dashboard": "create_dashboard",
+            "Daftar Obat": "create_medicine_list",
+            "Jadwal Hari Ini": "create_today_schedule_page",
+            "Kepatuhan": "create_adherence_page",
+        }
+        self.pages = {}
         
-        # Buat halaman Jadwal Hari Ini
-        self.today_schedule_page = QWidget()
-        self.create_today_schedule_page(self.today_schedule_page)
-        self.stacked_widget.addWidget(self.today_schedule_page)
+        # Skeleton selama data dimuat
+        self.loading_label = QLabel("⏳ Memuat data obat...")
+        self.loading_label.setFont(app_font(16))
+        self.loading_label.setStyleSheet("color: #718096; border: none; background: transparent;")
+        self.loading_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.stacked_widget.addWidget(self.loading_label)
         
         # Tambahkan content container ke main layout
         main_layout.addWidget(self.content_container)
         
-        # Alarm system
+        # Alarm system; dosis dikenali per (tanggal, dose_key)
         self.active_alarms = set()
-        self.sound_effect = QSoundEffect()
-        self.sound_effect.setLoopCount(-2)  # -2 artinya infinite loop
-        self.sound_effect.setVolume(0.7)
+        self.alarm_day = date.today()
+        self.pending_alarm_items = []
+        self.alarm_triggered_at = None
+        self.playing_sound = None
+        self.dose_writers = []
+        self.medicine_importer = None
+        self.import_progress = None
+        self.adherence_loader = None   # permintaan terbaru; hasil yang lebih lama dibuang
+        self.adherence_loaders = []
+        self.alarm_center = AlarmCenter(self)
+        self.alarm_center.acknowledged.connect(self.acknowledge_doses)
+        # Nada alarm (QtMultimedia) dimuat setelah window tampil
+        self.sound_bank = None
+        # Satu timer single-shot yang di-arm ke dosis berikutnya
         self.alarm_timer = QTimer(self)
-        self.alarm_timer.timeout.connect(self.check_alarm_schedule)
-        self.alarm_timer.start(1000 * 30)  # cek setiap 30 detik
+        self.alarm_timer.setSingleShot(True)
+        self.alarm_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        # Alarm untuk semua pasien, dari ringkasan jadwal tanpa membuka shard.
+        # Dengan daemon, dosis jatuh tempo datang sebagai notifikasi.
+        self.alarm_scheduler = None
+        if self.daemon is None:
+            self.alarm_scheduler = AlarmScheduler(
+                self.patients.today_schedule,
+                self.on_dose_due,
+                lambda seconds: self.alarm_timer.start(int(seconds * 1000)),
+            )
+            self.alarm_timer.timeout.connect(self.alarm_scheduler.wake)
+        
+        # Perubahan data hanya mengupdate baris yang terdampak; halaman yang
+        # tidak terlihat diupdate saat dibuka berikutnya. Daftar Obat
+        # mengikuti perubahan lewat MedicineTableModel sendiri.
+        self.page_updaters = {
+            "Dashboard": "update_dashboard",
+            "Jadwal Hari Ini": "update_today_schedule_page",
+        }
+        self.pending_updates = {page: set() for page in self.page_updaters}
+        self.reschedule_pending = False
+        self.first_paint_done = False
+        
+        self.data_loader = DataLoader(self.patients, self.current_patient_id, self)
+        self.data_loader.finished.connect(self.on_data_loaded)
+        self.profile.mark("window constructed")
     
-    def check_alarm_schedule(self):
-        now = datetime.now().strftime("%H:%M")
-        today_schedule = self.medicine_manager.get_today_schedule()
-        for item in today_schedule:
-            key = f"{item['time']}|{item['medicine']}"
-            if item['time'] == now and item['status'] == 'Belum Diminum' and key not in self.active_alarms:
-                self.active_alarms.add(key)
-                self.show_alarm_notification(item, key)
-
-    def show_alarm_notification(self, item, alarm_key):
-        alarm_path = os.path.join(os.path.dirname(__file__), "alarm.wav")
-        if not os.path.exists(alarm_path):
-            print("[WARNING] File alarm.wav tidak ditemukan. Alarm tidak akan berbunyi.")
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            self.profile.mark("first paint")
+            # Baca data baru setelah skeleton tergambar
+            QTimer.singleShot(0, self.data_loader.start)
+    
+    def on_data_loaded(self):
+        loader = self.sender() or self.data_loader
+        if loader is not self.data_loader:
+            return  # pasien sudah diganti lagi sebelum selesai dimuat
+        if loader.error is not None:
+            self.loading_label.setText(f"❌ Gagal memuat data obat:\n{loader.error}")
+            return
+        self.profile.mark("data loaded")
+        self.medicine_manager = loader.medicine_manager
+        self.patients.pin(loader.patient_id)
+        self.medicine_manager.subscribe(self.on_medicine_changed)
+        if self.daemon is None:
+            # Perubahan dari proses lain (mis. sync apotek) ikut masuk
+            self.data_watcher = DataFileWatcher(self.medicine_manager, self)
         else:
-            self.sound_effect.setSource(QUrl.fromLocalFile(alarm_path))
-            self.sound_effect.play()
-        dlg = AlarmDialog(self, item, lambda: self.stop_alarm(item, alarm_key))
-        dlg.exec()
-
-    def stop_alarm(self, item, alarm_key):
-        self.sound_effect.stop()
-        # Update status di medicines.json
-        for med in self.medicine_manager.medicines:
-            # Cek nama dan dosis cocok
-            med_name_dose = f"{med['name']} - {med['dose']}"
-            if med_name_dose == item['medicine']:
-                # Tambahkan waktu ke taken_times jika belum ada
-                if item['time'] not in med.get('taken_times', []):
-                    med.setdefault('taken_times', []).append(item['time'])
-                # Kurangi stok sesuai dosis
-                try:
-                    dose = int(''.join(filter(str.isdigit, str(med.get('dose', 1)))))
-                except Exception:
-                    dose = 1
-                med['stock'] = max(0, med.get('stock', 0) - dose)
-        self.medicine_manager.save_medicines()
-        self.active_alarms.discard(alarm_key)
+            # Notifikasi yang terbaca oleh thread loader
+            self.on_daemon_readable()
         self.refresh_pages()
+        self.profile.mark(f"page built: {self.current_page}")
+        QTimer.singleShot(0, self.init_alarm_sounds)
+    
+    def defer_daemon_dispatch(self):
+        # Hanya dari thread GUI; sisa notifikasi dari thread lain diambil saat thread itu selesai
+        if QThread.currentThread() is self.thread():
+            QTimer.singleShot(0, self.on_daemon_readable)
+    
+    def on_daemon_readable(self):
+        try:
+            self.patients.dispatch()
+        except (ConnectionError, OSError) as e:
+            self.daemon_notifier.setEnabled(False)
+            QMessageBox.warning(self, "Daemon terputus",
+                                f"Koneksi ke daemon MediMate terputus ({e}).\n"
+                                "Jalankan ulang aplikasi setelah daemon aktif kembali.")
+    
+    def switch_patient(self, patient_id):
+        """Show another patient's medicines; their shard is loaded in the background"""
+        if patient_id == self.current_patient_id or patient_id is None:
+            return
+        if self.medicine_manager is not None:
+            self.medicine_manager.unsubscribe(self.on_medicine_changed)
+        if self.data_watcher is not None:
+            self.data_watcher.deleteLater()
+            self.data_watcher = None
+        for page in self.pages.values():
+            self.stacked_widget.removeWidget(page)
+            page.deleteLater()
+        self.pages = {}
+        self.adherence_loader = None
+        if getattr(self, 'medicine_model', None) is not None:
+            self.medicine_model.detach()
+            self.medicine_model = None
+        self.patients.unpin(self.current_patient_id)
+        self.current_patient_id = patient_id
+        self.medicine_manager = None
+        self.loading_label.setText("⏳ Memuat data obat...")
+        self.stacked_widget.setCurrentWidget(self.loading_label)
+        
+        self.data_loader = DataLoader(self.patients, patient_id, self)
+        self.data_loader.finished.connect(self.on_data_loaded)
+        self.data_loader.start()
+    
+    def add_patient(self):
+        name, ok = QInputDialog.getText(self, "Tambah Pasien", "Nama pasien:")
+        if ok and name.strip():
+            patient = self.patients.add_patient(name.strip())
+            self.patient_picker.addItem(patient['name'], patient['id'])
+            self.patient_picker.setCurrentIndex(self.patient_picker.count() - 1)
+            self.patient_count_label.setText(f"{len(self.patients.patients())} pasien terdaftar")
+    
+    def shutdown(self):
+        """Wait for a pending load and dose writes, then flush and close every patient shard"""
+        self.data_loader.wait()
+        for writer in list(self.dose_writers):
+            writer.wait()
+        if self.medicine_importer is not None:
+            self.medicine_importer.wait()
+        for loader in list(self.adherence_loaders):
+            loader.wait()
+        self.patients.close()
+    
+    def init_alarm_sounds(self):
+        if self.sound_bank is None:
+            # QtMultimedia di-import dan nada di-decode sekali di sini,
+            # bukan saat startup atau setiap alarm berbunyi
+            self.sound_bank = AlarmSoundBank()
+            self.profile.mark("alarm sounds loaded")
+            self.profile.report()
+    
+    def on_dose_due(self, item):
+        # Dipanggil dari timer; dosis dikumpulkan lalu dikirim sekaligus
+        self.check_alarm_day()
+        item.setdefault('date', self.alarm_day.isoformat())
+        key = (item['date'], item['dose_key'])
+        # Status hanya tersedia untuk hari ini; dosis hari lalu yang baru
+        # terkejar setelah tengah malam belum pernah dibunyikan
+        if item['date'] == self.alarm_day.isoformat() and self.patients.is_dose_taken(
+                item['patient_id'], item['medicine_id'], item['time']):
+            return
+        if key not in self.active_alarms:
+            self.active_alarms.add(key)
+            if not self.pending_alarm_items:
+                self.alarm_triggered_at = time.perf_counter()
+                QTimer.singleShot(0, self.deliver_alarms)
+            self.pending_alarm_items.append(item)
+
+    def check_alarm_day(self):
+        """After midnight, forget alarm state of earlier days.
+
+        Groups of earlier days that are still on screen stay until they
+        are acknowledged (for their own day); dismissed ones are dropped.
+        """
+        today = date.today()
+        if today == self.alarm_day:
+            return
+        self.alarm_day = today
+        if not self.alarm_center.isVisible():
+            self.alarm_center.drop_before(today.isoformat())
+        pending = self.alarm_center.dose_keys()
+        self.active_alarms = {key for key in self.active_alarms
+                              if key[0] >= today.isoformat() or key in pending}
+
+    def deliver_alarms(self):
+        items, self.pending_alarm_items = self.pending_alarm_items, []
+        if not items:
+            return
+        self.alarm_center.add_doses(items)
+        self.alarm_center.show()
+        self.alarm_center.raise_()
+        self.init_alarm_sounds()
+        # Grup yang sedang berbunyi memakai nada paling mendesak di antaranya;
+        # prioritas dan nada ikut di item dari ringkasan jadwal
+        sound_id = most_urgent(sound_for(item) for item in items)
+        if self.sound_bank.is_playing():
+            sound_id = most_urgent((sound_id, self.playing_sound))
+        self.playing_sound = sound_id
+        self.sound_bank.play(sound_id, self.alarm_triggered_at)
+
+    def acknowledge_doses(self, items):
+        """Mark a whole group of due doses as taken and silence the alarm"""
+        doses = {}  # (patient_id, day) -> [(medicine_id, time)]
+        for item in items:
+            # Dicatat untuk hari jadwalnya, bukan hari saat dikonfirmasi
+            day = date.fromisoformat(item['date'])
+            doses.setdefault((item['patient_id'], day), []).append((item['medicine_id'], item['time']))
+            self.active_alarms.discard((item['date'], item['dose_key']))
+        # Pasien aktif (shard terbuka) dan daemon langsung; shard lain dibuka
+        # di thread terpisah, tidak satu manager per dosis di thread GUI
+        background = {}
+        for (patient_id, day), patient_doses in doses.items():
+            if self.daemon is not None or (patient_id == self.current_patient_id
+                                           and self.medicine_manager is not None):
+                self.patients.take_doses(patient_id, patient_doses, day)
+            else:
+                background[patient_id, day] = patient_doses
+        if background:
+            writer = DoseWriter(self.patients, background, self)
+            writer.finished.connect(self.on_doses_written)
+            self.dose_writers.append(writer)
+            writer.start()
+        if self.sound_bank is not None and (not items or not self.alarm_center.has_pending()):
+            self.sound_bank.stop()
+    
+    def on_doses_written(self):
+        writer = self.sender()
+        if writer in self.dose_writers:
+            self.dose_writers.remove(writer)
+            writer.deleteLater()
     
     def create_sidebar(self, main_layout):
         # Sidebar
         sidebar = QFrame()
+        sidebar.setObjectName("panel")
         sidebar.setFixedWidth(300)
-        sidebar.setStyleSheet("""
-            QFrame {
-                background: rgba(255, 255, 255, 0.95);
-                border-radius: 25px;
-                border: 1px solid rgba(255, 255, 255, 0.3);
-            }
-        """)
         
         sidebar_layout = QVBoxLayout(sidebar)
         sidebar_layout.setContentsMargins(25, 35, 25, 35)
@@ -474,11 +848,11 @@ class MediMateApp(QMainWindow):
         logo_layout.setSpacing(0)
         
         logo_label = QLabel("💊")
-        logo_label.setFont(QFont("Segoe UI Emoji", 24))
+        logo_label.setFont(app_font(24, family="Segoe UI Emoji"))
         logo_label.setContentsMargins(0, 0, 0, 0)
         
         title_label = QLabel("MediMate")
-        title_label.setFont(QFont("Segoe UI", 24, QFont.Weight.Bold))
+        title_label.setFont(app_font(24, QFont.Weight.Bold))
         title_label.setStyleSheet("""
             color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
                 stop:0 #667eea, stop:1 #764ba2);
@@ -497,7 +871,8 @@ class MediMateApp(QMainWindow):
         nav_buttons = [
             ("Dashboard", "🏠", self.current_page == "Dashboard"),
             ("Daftar Obat", "💊", self.current_page == "Daftar Obat"),
-            ("Jadwal Hari Ini", "📅", self.current_page == "Jadwal Hari Ini")
+            ("Jadwal Hari Ini", "📅", self.current_page == "Jadwal Hari Ini"),
+            ("Kepatuhan", "📊", self.current_page == "Kepatuhan")
         ]
         
         # Store buttons to update active state later
@@ -513,38 +888,38 @@ class MediMateApp(QMainWindow):
         
         # User section
         user_frame = QFrame()
+        user_frame.setObjectName("userCard")
         user_frame.setFixedHeight(80)
-        user_frame.setStyleSheet("""
-            QFrame {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 rgba(102, 126, 234, 0.1), stop:1 rgba(118, 75, 162, 0.1));
-                border-radius: 15px;
-                padding: 15px;
-            }
-        """)
         user_layout = QHBoxLayout(user_frame)
         user_layout.setContentsMargins(15, 15, 15, 15)
         
         user_info = QVBoxLayout()
         user_info.setSpacing(4)
-        user_name = QLabel("John Doe")
-        user_name.setFont(QFont("Segoe UI", 14, QFont.Weight.Bold))
-        user_name.setStyleSheet("color: #2D3748;")
-        
-        user_status = QLabel("Premium User")
-        user_status.setFont(QFont("Segoe UI", 11))
-        user_status.setStyleSheet("color: #667eea;")
-        
-        user_info.addWidget(user_name)
-        user_info.addWidget(user_status)
-        
-        user_avatar = QLabel("👤")
-        user_avatar.setFont(QFont("Segoe UI Emoji", 24))
-        user_avatar.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        
-        user_layout.addLayout(user_info)
-        user_layout.addStretch()
-        user_layout.addWidget(user_avatar)
+        # Pilih pasien yang datanya ditampilkan
+        self.patient_picker = QComboBox()
+        self.patient_picker.setFont(app_font(14, QFont.Weight.Bold))
+        self.patient_picker.setStyleSheet("color: #2D3748; background: transparent; border: none;")
+        self.patient_picker.setMaxVisibleItems(20)
+        for patient in self.patients.patients():
+            self.patient_picker.addItem(patient['name'], patient['id'])
+        self.patient_picker.currentIndexChanged.connect(
+            lambda index: self.switch_patient(self.patient_picker.itemData(index)))
+        
+        self.patient_count_label = QLabel(f"{len(self.patients.patients())} pasien terdaftar")
+        self.patient_count_label.setFont(app_font(11))
+        self.patient_count_label.setStyleSheet("color: #667eea;")
+        
+        user_info.addWidget(self.patient_picker)
+        user_info.addWidget(self.patient_count_label)
+        
+        add_patient_btn = QPushButton("👤+")
+        add_patient_btn.setFont(app_font(16, family="Segoe UI Emoji"))
+        add_patient_btn.setToolTip("Tambah pasien")
+        add_patient_btn.setStyleSheet("background: transparent; border: none;")
+        add_patient_btn.clicked.connect(self.add_patient)
+        
+        user_layout.addLayout(user_info, 1)
+        user_layout.addWidget(add_patient_btn)
         
         sidebar_layout.addWidget(user_frame)
         main_layout.addWidget(sidebar)
@@ -560,7 +935,7 @@ class MediMateApp(QMainWindow):
         
         # Dashboard title
         title_label = QLabel("Dashboard")
-        title_label.setFont(QFont("Segoe UI", 28, QFont.Weight.Bold))
+        title_label.setFont(app_font(28, QFont.Weight.Bold))
         title_label.setStyleSheet("""
             color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
                 stop:0 #2D3748, stop:1 #4A5568);
@@ -568,7 +943,7 @@ class MediMateApp(QMainWindow):
         
         # Date and time
         date_time = QLabel(datetime.now().strftime("%A, %B %d, %Y"))
-        date_time.setFont(QFont("Segoe UI", 13))
+        date_time.setFont(app_font(13))
         date_time.setStyleSheet("color: #718096;")
         
         header_layout.addWidget(title_label)
@@ -583,31 +958,29 @@ class MediMateApp(QMainWindow):
         # Get dynamic data
         total_medicines = self.medicine_manager.get_medicines_count()
         today_schedule = self.medicine_manager.get_today_schedule()
-        low_stock_count = len(self.medicine_manager.get_low_stock_medicines())
+        low_stock_count = self.medicine_manager.get_low_stock_count()
+        horizon = self.medicine_manager.forecast.horizon_days
         
         # Create stat cards with dynamic data
         cards_data = [
-            (total_medicines, "Total Obat\nAktif", ("#FF6B9D", "#C44569"), "💊"),
-            (len(today_schedule), "Jadwal\nHari Ini", ("#4FACFE", "#00F2FE"), "📅"),
-            (low_stock_count, "Obat Hampir\nHabis", ("#FA709A", "#FEE140"), "⚠️")
+            ("total", total_medicines, "Total Obat\nAktif", "💊"),
+            ("today", len(today_schedule), "Jadwal\nHari Ini", "📅"),
+            ("low_stock", low_stock_count, f"Habis dalam\n{horizon:g} Hari", "⚠️")
         ]
         
-        for value, title, colors, icon in cards_data:
-            card = StatCard(value, title, colors, icon)
+        # Simpan kartu agar nilainya bisa diupdate tanpa membangun ulang halaman
+        self.stat_cards = {}
+        for name, value, title, icon in cards_data:
+            card = StatCard(value, title, name, icon)
             stats_layout.addWidget(card)
+            self.stat_cards[name] = card
+        self.stat_cards["low_stock"].setToolTip(self.low_stock_tooltip())
         
         content_layout.addLayout(stats_layout)
         
         # Today's schedule section dengan data dinamis
         schedule_frame = QFrame()
-        schedule_frame.setStyleSheet("""
-            QFrame {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 rgba(255, 255, 255, 0.9), stop:1 rgba(247, 250, 252, 0.9));
-                border-radius: 20px;
-                border: 1px solid rgba(226, 232, 240, 0.5);
-            }
-        """)
+        schedule_frame.setObjectName("sectionCard")
         
         schedule_layout = QVBoxLayout(schedule_frame)
         schedule_layout.setContentsMargins(30, 25, 30, 25)
@@ -615,11 +988,11 @@ class MediMateApp(QMainWindow):
         # Schedule header
         schedule_header = QHBoxLayout()
         schedule_title = QLabel("📋 Jadwal Hari Ini")
-        schedule_title.setFont(QFont("Segoe UI", 20, QFont.Weight.Bold))
+        schedule_title.setFont(app_font(20, QFont.Weight.Bold))
         schedule_title.setStyleSheet("color: #2D3748; margin-bottom: 10px;")
         
         view_all_btn = QPushButton("Lihat Semua")
-        view_all_btn.setFont(QFont("Segoe UI", 11))
+        view_all_btn.setFont(app_font(11))
         view_all_btn.setStyleSheet("""
             QPushButton {
                 background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
@@ -653,26 +1026,31 @@ class MediMateApp(QMainWindow):
         """)
         schedule_layout.addWidget(separator)
         
+        # Message when no schedule (disembunyikan jika ada jadwal)
+        no_schedule_label = QLabel("📅 Belum ada jadwal obat untuk hari ini")
+        no_schedule_label.setFont(app_font(14))
+        no_schedule_label.setStyleSheet("""
+            color: #718096;
+            text-align: center;
+            padding: 40px;
+        """)
+        no_schedule_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        
         # Display today's schedule dynamically
-        if today_schedule:
-            for schedule_item in today_schedule:
-                med_row = MedicationRow(
-                    schedule_item['time'], 
-                    schedule_item['medicine'], 
-                    schedule_item['status']
-                )
-                schedule_layout.addWidget(med_row)
-        else:
-            # Show message when no schedule
-            no_schedule_label = QLabel("📅 Belum ada jadwal obat untuk hari ini")
-            no_schedule_label.setFont(QFont("Segoe UI", 14))
-            no_schedule_label.setStyleSheet("""
-                color: #718096;
-                text-align: center;
-                padding: 40px;
-            """)
-            no_schedule_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            schedule_layout.addWidget(no_schedule_label)
+        rows_layout = QVBoxLayout()
+        rows_layout.setContentsMargins(0, 0, 0, 0)
+        schedule_layout.addLayout(rows_layout)
+        schedule_layout.addWidget(no_schedule_label)
+        self.dashboard_schedule_rows = ScheduleRows(
+            rows_layout,
+            self.medicine_manager.schedule,
+            lambda schedule_item: MedicationRow(
+                schedule_item['time'],
+                schedule_item['medicine'],
+                schedule_item['status']
+            ),
+            no_schedule_label
+        )
         
         content_layout.addWidget(schedule_frame)
         content_layout.addStretch()
@@ -688,7 +1066,7 @@ class MediMateApp(QMainWindow):
         
         # Page title
         title_label = QLabel("Daftar Obat")
-        title_label.setFont(QFont("Segoe UI", 28, QFont.Weight.Bold))
+        title_label.setFont(app_font(28, QFont.Weight.Bold))
         title_label.setStyleSheet("""
             color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
                 stop:0 #2D3748, stop:1 #4A5568);
@@ -696,7 +1074,7 @@ class MediMateApp(QMainWindow):
         
         # Add medicine button
         add_btn = QPushButton("+ Tambah Obat")
-        add_btn.setFont(QFont("Segoe UI", 12, QFont.Weight.Bold))
+        add_btn.setFont(app_font(12, QFont.Weight.Bold))
         add_btn.setStyleSheet("""
             QPushButton {
                 background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
@@ -713,8 +1091,31 @@ class MediMateApp(QMainWindow):
         """)
         add_btn.clicked.connect(self.show_add_medicine_dialog)
         
+        # Import/export CSV atau JSON (mis. saat pasien baru masuk)
+        file_buttons = []
+        for text, handler in (("📥 Impor", self.import_medicines_from_file),
+                              ("📤 Ekspor", self.export_medicines_to_file)):
+            file_btn = QPushButton(text)
+            file_btn.setFont(app_font(12, QFont.Weight.Bold))
+            file_btn.setStyleSheet("""
+                QPushButton {
+                    background: white;
+                    color: #4A5568;
+                    border: 1px solid #E2E8F0;
+                    border-radius: 15px;
+                    padding: 10px 20px;
+                }
+                QPushButton:hover {
+                    background: #F7FAFC;
+                }
+            """)
+            file_btn.clicked.connect(handler)
+            file_buttons.append(file_btn)
+        
         header_layout.addWidget(title_label)
         header_layout.addStretch()
+        for file_btn in file_buttons:
+            header_layout.addWidget(file_btn)
         header_layout.addWidget(add_btn)
         content_layout.addLayout(header_layout)
         
@@ -723,8 +1124,9 @@ class MediMateApp(QMainWindow):
         search_layout.setContentsMargins(0, 10, 0, 20)
         
         search_bar = QLineEdit()
+        self.search_bar = search_bar
         search_bar.setPlaceholderText("Cari obat...")
-        search_bar.setFont(QFont("Segoe UI", 12))
+        search_bar.setFont(app_font(12))
         search_bar.setFixedHeight(45)
         search_bar.setStyleSheet("""
             QLineEdit {
@@ -746,167 +1148,113 @@ class MediMateApp(QMainWindow):
         search_layout.addWidget(search_bar)
         content_layout.addLayout(search_layout)
         
+        # Pencarian dijalankan setelah pengguna berhenti mengetik sebentar
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.apply_search)
+        search_bar.textChanged.connect(lambda text: self.search_timer.start())
+        
         # Medicine list frame
         list_frame = QFrame()
-        list_frame.setStyleSheet("""
-            QFrame {
-                background: white;
-                border-radius: 20px;
-                border: 1px solid rgba(226, 232, 240, 0.8);
-            }
-        """)
+        list_frame.setObjectName("listCard")
         
         list_layout = QVBoxLayout(list_frame)
         list_layout.setContentsMargins(25, 25, 25, 25)
         list_layout.setSpacing(15)
         
-        # Headers
-        headers_layout = QHBoxLayout()
-        headers = ["Nama Obat", "Dosis", "Stok", "Jadwal", "Aksi"]
-        widths = [3, 2, 1, 3, 2]
-        
-        for i, header in enumerate(headers):
-            header_label = QLabel(header)
-            header_label.setFont(QFont("Segoe UI", 13, QFont.Weight.Bold))
-            header_label.setStyleSheet("color: #4A5568;")
-            header_layout = QHBoxLayout()
-            header_layout.setContentsMargins(0, 0, 0, 0)
-            header_layout.addWidget(header_label)
-            
-            if i < len(headers) - 1:  # Don't add stretch to last header
-                header_layout.addStretch()
-            
-            headers_layout.addLayout(header_layout, widths[i])
-        
-        list_layout.addLayout(headers_layout)
-        
-        # Separator
-        separator = QFrame()
-        separator.setFrameShape(QFrame.Shape.HLine)
-        separator.setStyleSheet("""
-            border: none;
-            height: 2px;
-            background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                stop:0 rgba(226, 232, 240, 0.5), stop:1 rgba(226, 232, 240, 0.8));
-            margin: 5px 0px 15px 0px;
+        # Model/view: hanya baris yang terlihat yang digambar
+        if getattr(self, 'medicine_model', None) is not None:
+            self.medicine_model.detach()
+        self.medicine_model = MedicineTableModel(self.medicine_manager, self)
+        self.medicine_proxy = MedicineFilterProxyModel(self)
+        self.medicine_proxy.setSourceModel(self.medicine_model)
+        self.medicine_proxy.setSortRole(MedicineTableModel.SORT_ROLE)
+        
+        self.medicine_table = MedicineTableView(self.MEDICINE_LIST_WIDTHS)
+        self.medicine_table.setModel(self.medicine_proxy)
+        self.medicine_delegate = MedicineRowDelegate(self.medicine_table)
+        self.medicine_delegate.edit_requested.connect(self.edit_medicine_by_id)
+        self.medicine_delegate.delete_requested.connect(self.delete_medicine_by_id)
+        self.medicine_table.setItemDelegate(self.medicine_delegate)
+        self.medicine_table.setMouseTracking(True)
+        self.medicine_table.setShowGrid(False)
+        self.medicine_table.setWordWrap(False)
+        self.medicine_table.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.medicine_table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.medicine_table.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.medicine_table.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.medicine_table.setStyleSheet("""
+            QTableView {
+                background: transparent;
+                border: none;
+            }
+            QHeaderView::section {
+                background: transparent;
+                color: #4A5568;
+                border: none;
+                border-bottom: 2px solid rgba(226, 232, 240, 0.8);
+                padding: 0px 8px 12px 8px;
+            }
         """)
-        list_layout.addWidget(separator)
-        
-        # Medicine rows - display from saved data
-        medicines = self.medicine_manager.medicines
-        
-        if medicines:
-            for medicine in medicines:
-                row_layout = QHBoxLayout()
-                
-                # Name
-                name_label = QLabel(medicine['name'])
-                name_label.setFont(QFont("Segoe UI", 13, QFont.Weight.Medium))
-                name_label.setStyleSheet("color: #2D3748;")
-                name_layout = QHBoxLayout()
-                name_layout.addWidget(name_label)
-                name_layout.addStretch()
-                
-                # Dose
-                dose_label = QLabel(medicine['dose'])
-                dose_label.setFont(QFont("Segoe UI", 13))
-                dose_label.setStyleSheet("color: #4A5568;")
-                dose_layout = QHBoxLayout()
-                dose_layout.addWidget(dose_label)
-                dose_layout.addStretch()
-                
-                # Stock
-                stock_text = f"{medicine['stock']} {medicine.get('stock_unit', 'tablet')}"
-                stock_label = QLabel(stock_text)
-                stock_label.setFont(QFont("Segoe UI", 13))
-                stock_label.setStyleSheet("color: #4A5568;")
-                stock_layout = QHBoxLayout()
-                stock_layout.addWidget(stock_label)
-                stock_layout.addStretch()
-                
-                # Schedule
-                schedule_text = ", ".join(medicine.get('times', []))
-                schedule_label = QLabel(schedule_text)
-                schedule_label.setFont(QFont("Segoe UI", 13))
-                schedule_label.setStyleSheet("color: #4A5568;")
-                schedule_layout = QHBoxLayout()
-                schedule_layout.addWidget(schedule_label)
-                schedule_layout.addStretch()
-                
-                # Actions
-                action_layout = QHBoxLayout()
-                
-                edit_btn = QPushButton("Edit")
-                edit_btn.setFont(QFont("Segoe UI", 11))
-                edit_btn.setFixedSize(70, 35)
-                edit_btn.setStyleSheet("""
-                    QPushButton {
-                        background: #EDF2F7;
-                        color: #4A5568;
-                        border: none;
-                        border-radius: 8px;
-                    }
-                    QPushButton:hover {
-                        background: #E2E8F0;
-                    }
-                """)
-                # Tambahkan koneksi tombol edit
-                edit_btn.clicked.connect(lambda checked, med=medicine: self.show_edit_medicine_dialog(med))
-                delete_btn = QPushButton("Hapus")
-                delete_btn.setFont(QFont("Segoe UI", 11))
-                delete_btn.setFixedSize(70, 35)
-                delete_btn.setStyleSheet("""
-                    QPushButton {
-                        background: #FED7D7;
-                        color: #E53E3E;
-                        border: none;
-                        border-radius: 8px;
-                    }
-                    QPushButton:hover {
-                        background: #FEB2B2;
-                    }
-                """)
-                # Tambahkan koneksi tombol hapus
-                delete_btn.clicked.connect(lambda checked, med=medicine: self.delete_medicine_with_confirm(med))
-                
-                action_layout.addWidget(edit_btn)
-                action_layout.addWidget(delete_btn)
-                
-                # Add all to row
-                row_layout.addLayout(name_layout, widths[0])
-                row_layout.addLayout(dose_layout, widths[1])
-                row_layout.addLayout(stock_layout, widths[2])
-                row_layout.addLayout(schedule_layout, widths[3])
-                row_layout.addLayout(action_layout, widths[4])
-                
-                # Add row to list
-                list_layout.addLayout(row_layout)
-                
-                # Add separator between rows
-                if medicines.index(medicine) < len(medicines) - 1:
-                    row_separator = QFrame()
-                    row_separator.setFrameShape(QFrame.Shape.HLine)
-                    row_separator.setStyleSheet("""
-                        border: none;
-                        height: 1px;
-                        background: #E2E8F0;
-                        margin: 8px 0px;
-                    """)
-                    list_layout.addWidget(row_separator)
-        else:
-            # Show message when no medicines
-            no_medicine_label = QLabel("💊 Belum ada obat yang ditambahkan")
-            no_medicine_label.setFont(QFont("Segoe UI", 14))
-            no_medicine_label.setStyleSheet("""
-                color: #718096;
-                text-align: center;
-                padding: 40px;
-            """)
-            no_medicine_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            list_layout.addWidget(no_medicine_label)
         
-        content_layout.addWidget(list_frame)
-        content_layout.addStretch()
+        # Tinggi baris tetap agar view tidak perlu mengukur 50k baris
+        vertical_header = self.medicine_table.verticalHeader()
+        vertical_header.setVisible(False)
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(56)
+        
+        horizontal_header = self.medicine_table.horizontalHeader()
+        horizontal_header.setFont(app_font(13, QFont.Weight.Bold))
+        horizontal_header.setDefaultAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
+        horizontal_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        horizontal_header.setHighlightSections(False)
+        # Tanpa kolom sort awal: urutan tetap sama dengan data
+        horizontal_header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.medicine_table.setSortingEnabled(True)
+        list_layout.addWidget(self.medicine_table)
+        
+        # Show message when no medicines
+        self.no_medicine_label = QLabel("💊 Belum ada obat yang ditambahkan")
+        self.no_medicine_label.setFont(app_font(14))
+        self.no_medicine_label.setStyleSheet("""
+            color: #718096;
+            text-align: center;
+            padding: 40px;
+        """)
+        self.no_medicine_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        list_layout.addWidget(self.no_medicine_label)
+        self.medicine_model.rowsInserted.connect(self.update_no_medicine_label)
+        self.medicine_model.rowsRemoved.connect(self.update_no_medicine_label)
+        # Hasil pencarian dihitung ulang jika data berubah saat sedang mencari
+        self.medicine_model.rowsInserted.connect(self.refresh_search)
+        self.medicine_model.dataChanged.connect(self.refresh_search)
+        self.update_no_medicine_label()
+        
+        content_layout.addWidget(list_frame, 1)
+    
+    def update_no_medicine_label(self):
+        is_empty = self.medicine_model.rowCount() == 0
+        self.no_medicine_label.setVisible(is_empty)
+        self.medicine_table.setVisible(not is_empty)
+    
+    def apply_search(self):
+        medicine_ids = self.medicine_manager.search(self.search_bar.text())
+        self.medicine_proxy.set_medicine_ids(medicine_ids)
+    
+    def refresh_search(self):
+        if self.search_bar.text().strip():
+            self.search_timer.start()
+    
+    def edit_medicine_by_id(self, medicine_id):
+        medicine = self.medicine_manager.get_medicine_by_id(medicine_id)
+        if medicine is not None:
+            self.show_edit_medicine_dialog(medicine)
+    
+    def delete_medicine_by_id(self, medicine_id):
+        medicine = self.medicine_manager.get_medicine_by_id(medicine_id)
+        if medicine is not None:
+            self.delete_medicine_with_confirm(medicine)
     
     def create_today_schedule_page(self, page):
         content_layout = QVBoxLayout(page)
@@ -916,32 +1264,22 @@ class MediMateApp(QMainWindow):
         # Header
         header_layout = QHBoxLayout()
         title_label = QLabel("Jadwal Hari Ini")
-        title_label.setFont(QFont("Segoe UI", 28, QFont.Weight.Bold))
+        title_label.setFont(app_font(28, QFont.Weight.Bold))
         title_label.setStyleSheet("color: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #2D3748, stop:1 #4A5568);")
         header_layout.addWidget(title_label)
         header_layout.addStretch()
         content_layout.addLayout(header_layout)
 
-        # Ambil jadwal hari ini
-        today_schedule = self.medicine_manager.get_today_schedule()
-
         # Frame utama
         schedule_frame = QFrame()
-        schedule_frame.setStyleSheet("""
-            QFrame {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 rgba(255, 255, 255, 0.9), stop:1 rgba(247, 250, 252, 0.9));
-                border-radius: 20px;
-                border: 1px solid rgba(226, 232, 240, 0.5);
-            }
-        """)
+        schedule_frame.setObjectName("sectionCard")
         schedule_layout = QVBoxLayout(schedule_frame)
         schedule_layout.setContentsMargins(30, 25, 30, 25)
         schedule_layout.setSpacing(15)
 
         # Judul
         schedule_title = QLabel("📋 Jadwal Obat Hari Ini")
-        schedule_title.setFont(QFont("Segoe UI", 20, QFont.Weight.Bold))
+        schedule_title.setFont(app_font(20, QFont.Weight.Bold))
         schedule_title.setStyleSheet("color: #2D3748; margin-bottom: 10px;")
         schedule_layout.addWidget(schedule_title)
 
@@ -958,69 +1296,50 @@ class MediMateApp(QMainWindow):
         schedule_layout.addWidget(separator)
 
         # Daftar jadwal
-        if today_schedule:
-            for item in today_schedule:
-                row = QFrame()
-                row.setStyleSheet("""
-                    QFrame {
-                        background: white;
-                        border-radius: 12px;
-                        border: 1px solid #E2E8F0;
-                        margin-bottom: 10px;
-                    }
-                """)
-                row_layout = QHBoxLayout(row)
-                row_layout.setContentsMargins(18, 10, 18, 10)
-                row_layout.setSpacing(20)
-                time_label = QLabel(item['time'])
-                time_label.setFont(QFont("Segoe UI", 15, QFont.Weight.Bold))
-                time_label.setStyleSheet("color: #667eea;")
-                med_label = QLabel(item['medicine'])
-                med_label.setFont(QFont("Segoe UI", 14))
-                med_label.setStyleSheet("color: #2D3748;")
-                
-                # Badge status
-                status = 'Sudah Diminum' if self.is_time_taken(item) else item['status']
-                status_badge = QLabel(status)
-                status_badge.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
-                if status == 'Belum Diminum':
-                    status_badge.setStyleSheet("""
-                        QLabel {
-                            background: #FFF5F5;
-                            color: #E53E3E;
-                            border: 1.5px solid #FEB2B2;
-                            border-radius: 12px;
-                            padding: 4px 16px;
-                            min-width: 90px;
-                            text-align: center;
-                        }
-                    """)
-                else:
-                    status_badge.setStyleSheet("""
-                        QLabel {
-                            background: #F0FFF4;
-                            color: #38A169;
-                            border: 1.5px solid #68D391;
-                            border-radius: 12px;
-                            padding: 4px 16px;
-                            min-width: 90px;
-                            text-align: center;
-                        }
-                    """)
-                row_layout.addWidget(time_label, 1)
-                row_layout.addWidget(med_label, 4)
-                row_layout.addWidget(status_badge, 2)
-                schedule_layout.addWidget(row)
-        else:
-            no_schedule_label = QLabel("Tidak ada jadwal obat untuk hari ini.")
-            no_schedule_label.setFont(QFont("Segoe UI", 14))
-            no_schedule_label.setStyleSheet("color: #718096; text-align: center; padding: 40px;")
-            no_schedule_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            schedule_layout.addWidget(no_schedule_label)
+        no_schedule_label = QLabel("Tidak ada jadwal obat untuk hari ini.")
+        no_schedule_label.setFont(app_font(14))
+        no_schedule_label.setStyleSheet("color: #718096; text-align: center; padding: 40px;")
+        no_schedule_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        
+        rows_layout = QVBoxLayout()
+        rows_layout.setContentsMargins(0, 0, 0, 0)
+        rows_layout.setSpacing(15)
+        schedule_layout.addLayout(rows_layout)
+        schedule_layout.addWidget(no_schedule_label)
+        self.schedule_page_rows = ScheduleRows(
+            rows_layout,
+            self.medicine_manager.schedule,
+            self.create_schedule_row,
+            no_schedule_label
+        )
 
         content_layout.addWidget(schedule_frame)
         content_layout.addStretch()
 
+    def create_schedule_row(self, item):
+        row = QFrame()
+        row.setObjectName("scheduleRow")
+        row_layout = QHBoxLayout(row)
+        row_layout.setContentsMargins(18, 10, 18, 10)
+        row_layout.setSpacing(20)
+        time_label = QLabel(item['time'])
+        time_label.setObjectName("scheduleTime")
+        time_label.setFont(app_font(15, QFont.Weight.Bold))
+        med_label = QLabel(item['medicine'])
+        med_label.setObjectName("scheduleMedicine")
+        med_label.setFont(app_font(14))
+        
+        # Badge status
+        status = 'Sudah Diminum' if self.is_time_taken(item) else item['status']
+        status_badge = QLabel(status)
+        status_badge.setObjectName("statusBadge")
+        status_badge.setProperty("taken", status != 'Belum Diminum')
+        status_badge.setFont(app_font(11, QFont.Weight.Bold))
+        row_layout.addWidget(time_label, 1)
+        row_layout.addWidget(med_label, 4)
+        row_layout.addWidget(status_badge, 2)
+        return row
+
     def show_add_medicine_dialog(self):
         dialog = AddMedicineDialog(self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
@@ -1032,128 +1351,345 @@ class MediMateApp(QMainWindow):
             if self.medicine_manager.add_medicine(medicine_data):
                 # Show success message
                 QMessageBox.information(self, "Berhasil", "Obat berhasil ditambahkan!")
-                
-                # Refresh dashboard and medicine list
-                self.refresh_pages()
             else:
                 # Show error message
                 QMessageBox.critical(self, "Error", "Gagal menyimpan obat!")
     
+    def import_medicines_from_file(self):
+        if self.medicine_importer is not None or self.medicine_manager is None:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Impor Obat", "", "Data obat (*.csv *.json *.jsonl)")
+        if not path:
+            return
+        # File (bisa puluhan ribu baris) dibaca dan divalidasi di thread terpisah;
+        # dialog modal menahan input (mis. ganti pasien) sampai obat ditambahkan
+        self.import_progress = QProgressDialog(f"Mengimpor {os.path.basename(path)}...", None, 0, 0, self)
+        self.import_progress.setWindowTitle("Impor Obat")
+        self.import_progress.setWindowModality(Qt.WindowModality.ApplicationModal)
+        self.import_progress.setMinimumDuration(0)
+        self.import_progress.show()
+        self.medicine_importer = MedicineImporter(path, self)
+        self.medicine_importer.finished.connect(self.on_medicines_imported)
+        self.medicine_importer.start()
+    
+    def on_medicines_imported(self):
+        importer = self.medicine_importer
+        self.medicine_importer = None
+        importer.deleteLater()
+        report = importer.report
+        if importer.error is None:
+            # Satu bulk_add di thread GUI (pemilik manager); halaman dibangun
+            # ulang lewat event reset-nya
+            add_records(self.medicine_manager, importer.records, report)
+        self.import_progress.close()
+        self.import_progress.deleteLater()
+        self.import_progress = None
+        
+        if importer.error is not None:
+            QMessageBox.critical(self, "Error", f"Gagal membaca {os.path.basename(importer.path)}:\n{importer.error}")
+        elif not report.saved:
+            QMessageBox.critical(self, "Error", "Gagal menyimpan obat hasil impor!")
+        elif report.errors:
+            QMessageBox.warning(self, "Impor Selesai", report.summary())
+        else:
+            QMessageBox.information(self, "Berhasil", report.summary())
+    
+    def export_medicines_to_file(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Ekspor Obat", "obat.csv",
+                                              "CSV (*.csv);;JSON (*.json);;JSON Lines (*.jsonl)")
+        if not path:
+            return
+        try:
+            export_medicines(self.medicine_manager.medicines, path)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", f"Gagal mengekspor obat:\n{e}")
+            return
+        QMessageBox.information(self, "Berhasil",
+                                f"{self.medicine_manager.get_medicines_count()} obat diekspor ke {os.path.basename(path)}")
+    
     def show_edit_medicine_dialog(self, medicine):
         dialog = EditMedicineDialog(self, medicine)
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            updated_data = dialog.get_medicine_data()
-            updated_data['id'] = medicine.get('id')
-            updated_data['created_at'] = medicine.get('created_at')
+            # Mulai dari record lengkap: nada khusus, aturan recurrence dan
+            # field tambahan yang tidak ada di form jangan sampai hilang
+            updated_data = medicine.to_dict()
+            updated_data.update(dialog.get_medicine_data())
             if self.medicine_manager.edit_medicine(medicine.get('id'), updated_data):
                 QMessageBox.information(self, "Berhasil", "Obat berhasil diupdate!")
-                self.refresh_pages()
             else:
                 QMessageBox.critical(self, "Error", "Gagal mengupdate obat!")
     
+    def on_medicine_changed(self, event, medicine_id, medicine):
+        # Jadwal berubah, arm ulang alarm ke dosis berikutnya. Banyak
+        # perubahan sekaligus (satu grup alarm) cukup satu kali reschedule.
+        if event == MEDICINES_RESET:
+            # Perubahan massal: halaman dibangun ulang (termasuk reschedule),
+            # bukan diperbarui per baris
+            self.refresh_pages()
+            return
+        if not self.reschedule_pending:
+            self.reschedule_pending = True
+            QTimer.singleShot(0, self.reschedule_alarms)
+        
+        for pending in self.pending_updates.values():
+            pending.add(medicine_id)
+        self.apply_pending_updates(self.current_page)
+    
+    def reschedule_alarms(self):
+        self.reschedule_pending = False
+        if self.alarm_scheduler is not None:
+            self.alarm_scheduler.reschedule()
+    
+    def apply_pending_updates(self, page_name):
+        pending = self.pending_updates.get(page_name)
+        if pending:
+            medicine_ids = sorted(pending)
+            pending.clear()
+            getattr(self, self.page_updaters[page_name])(medicine_ids)
+    
+    ADHERENCE_PERIODS = ((7, "7 hari"), (30, "30 hari"), (90, "90 hari"), (365, "1 tahun"))
+    
+    def create_adherence_page(self, page):
+        content_layout = QVBoxLayout(page)
+        content_layout.setContentsMargins(40, 40, 40, 40)
+        content_layout.setSpacing(30)
+        
+        # Header: judul, periode dan cakupan (pasien ini per obat / semua pasien)
+        header_layout = QHBoxLayout()
+        title_label = QLabel("Kepatuhan")
+        title_label.setFont(app_font(28, QFont.Weight.Bold))
+        title_label.setStyleSheet("color: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #2D3748, stop:1 #4A5568);")
+        header_layout.addWidget(title_label)
+        header_layout.addStretch()
+        
+        combo_style = """
+            QComboBox {
+                background: white;
+                border: 1px solid #E2E8F0;
+                border-radius: 10px;
+                padding: 8px 15px;
+                color: #2D3748;
+            }
+        """
+        self.adherence_period = QComboBox()
+        for days, label in self.ADHERENCE_PERIODS:
+            self.adherence_period.addItem(label, days)
+        self.adherence_period.setCurrentIndex(1)
+        self.adherence_scope = QComboBox()
+        self.adherence_scope.addItem("Per obat (pasien ini)", False)
+        self.adherence_scope.addItem("Per pasien (semua)", True)
+        for combo in (self.adherence_period, self.adherence_scope):
+            combo.setFont(app_font(12))
+            combo.setStyleSheet(combo_style)
+            combo.currentIndexChanged.connect(lambda index: self.load_adherence())
+            header_layout.addWidget(combo)
+        content_layout.addLayout(header_layout)
+        
+        # Ringkasan periode
+        stats_layout = QHBoxLayout()
+        stats_layout.setSpacing(20)
+        self.adherence_cards = {}
+        for name, accent, title in (("adherence", "total", "Dosis\nDiminum"),
+                                    ("on_time", "today", "Tepat\nWaktu"),
+                                    ("delay", "low_stock", "Rata-rata\nTerlambat")):
+            card = StatCard("-", title, accent)
+            stats_layout.addWidget(card)
+            self.adherence_cards[name] = card
+        content_layout.addLayout(stats_layout)
+        
+        list_frame = QFrame()
+        list_frame.setObjectName("listCard")
+        list_layout = QVBoxLayout(list_frame)
+        list_layout.setContentsMargins(25, 25, 25, 25)
+        list_layout.setSpacing(15)
+        
+        self.adherence_period_label = QLabel()
+        self.adherence_period_label.setFont(app_font(12))
+        self.adherence_period_label.setStyleSheet("color: #718096;")
+        list_layout.addWidget(self.adherence_period_label)
+        
+        self.adherence_model = AdherenceTableModel(self)
+        adherence_proxy = QSortFilterProxyModel(self)
+        adherence_proxy.setSourceModel(self.adherence_model)
+        adherence_proxy.setSortRole(AdherenceTableModel.SORT_ROLE)
+        self.adherence_table = QTableView()
+        self.adherence_table.setModel(adherence_proxy)
+        self.adherence_table.setShowGrid(False)
+        self.adherence_table.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.adherence_table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.adherence_table.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.adherence_table.setWordWrap(False)
+        self.adherence_table.setStyleSheet("""
+            QTableView {
+                background: transparent;
+                border: none;
+                color: #2D3748;
+            }
+            QHeaderView::section {
+                background: transparent;
+                color: #4A5568;
+                border: none;
+                border-bottom: 2px solid rgba(226, 232, 240, 0.8);
+                padding: 0px 8px 12px 8px;
+            }
+        """)
+        self.adherence_table.setFont(app_font(12))
+        vertical_header = self.adherence_table.verticalHeader()
+        vertical_header.setVisible(False)
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(44)
+        horizontal_header = self.adherence_table.horizontalHeader()
+        horizontal_header.setFont(app_font(12, QFont.Weight.Bold))
+        horizontal_header.setDefaultAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
+        horizontal_header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        horizontal_header.setHighlightSections(False)
+        # Urutan awal: kepatuhan terendah di atas
+        self.adherence_table.setSortingEnabled(True)
+        self.adherence_table.sortByColumn(3, Qt.SortOrder.AscendingOrder)
+        list_layout.addWidget(self.adherence_table)
+        
+        self.no_adherence_label = QLabel("📊 Belum ada riwayat dosis untuk periode ini")
+        self.no_adherence_label.setFont(app_font(14))
+        self.no_adherence_label.setStyleSheet("color: #718096; padding: 40px;")
+        self.no_adherence_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        list_layout.addWidget(self.no_adherence_label)
+        
+        content_layout.addWidget(list_frame, 1)
+        self.load_adherence()
+    
+    def load_adherence(self):
+        """Fill the "Kepatuhan" page for the selected period (finished days only)"""
+        days = self.adherence_period.currentData()
+        all_patients = self.adherence_scope.currentData()
+        last = date.today() - timedelta(days=1)
+        first = last - timedelta(days=days - 1)
+        # Dihitung di thread terpisah; halaman tetap bisa dipakai sementara itu
+        self.adherence_period_label.setText("⏳ Menghitung kepatuhan...")
+        loader = AdherenceLoader(self.patients, first, last,
+                                 None if all_patients else self.current_patient_id, self)
+        loader.finished.connect(self.on_adherence_loaded)
+        self.adherence_loader = loader
+        self.adherence_loaders.append(loader)
+        loader.start()
+    
+    def on_adherence_loaded(self):
+        loader = self.sender()
+        if loader in self.adherence_loaders:
+            self.adherence_loaders.remove(loader)
+            loader.deleteLater()
+        if self.daemon is not None:
+            # Notifikasi yang terbaca oleh thread kepatuhan
+            self.on_daemon_readable()
+        if loader is not self.adherence_loader:
+            return  # periode/halaman sudah berganti sebelum selesai
+        self.adherence_loader = None
+        if loader.error is not None:
+            self.adherence_period_label.setText(f"❌ Gagal menghitung kepatuhan: {loader.error}")
+            return
+        rows = loader.rows
+        first, last = loader.first, loader.last
+        self.adherence_model.set_rows(rows)
+        total = combine(rows)
+        has_rows = bool(rows)
+        self.adherence_cards["adherence"].set_value(f"{total['adherence']:.0%}" if has_rows else "-")
+        self.adherence_cards["on_time"].set_value(f"{total['on_time_rate']:.0%}" if has_rows else "-")
+        self.adherence_cards["delay"].set_value(f"{total['avg_delay']:.0f}m" if has_rows else "-")
+        self.adherence_period_label.setText(
+            f"{first.strftime('%d/%m/%Y')} - {last.strftime('%d/%m/%Y')}: {total['taken']} dari "
+            f"{total['scheduled']} dosis diminum, {total['missed']} terlewat "
+            f"(terlambat = lebih dari {ON_TIME_MINUTES} menit)")
+        self.no_adherence_label.setVisible(not has_rows)
+        self.adherence_table.setVisible(has_rows)
+    
+    def update_dashboard(self, medicine_ids):
+        self.stat_cards["total"].set_value(self.medicine_manager.get_medicines_count())
+        self.stat_cards["today"].set_value(len(self.medicine_manager.schedule))
+        self.stat_cards["low_stock"].set_value(self.medicine_manager.get_low_stock_count())
+        self.stat_cards["low_stock"].setToolTip(self.low_stock_tooltip())
+        self.dashboard_schedule_rows.update(medicine_ids)
+    
+    def low_stock_tooltip(self, limit=10):
+        """The medicines that run out first, with the days they have left"""
+        manager = self.medicine_manager
+        low = sorted(manager.forecast.low_stock_ids(), key=manager.days_until_empty)
+        lines = []
+        for medicine_id in low[:limit]:
+            medicine = manager.get_medicine_by_id(medicine_id)
+            days = manager.days_until_empty(medicine_id)
+            lines.append(f"{medicine.name}: {'habis' if days < 1 else f'{days:.0f} hari lagi'}")
+        if len(low) > limit:
+            lines.append(f"... dan {len(low) - limit} obat lain")
+        return "\n".join(lines) or "Tidak ada obat yang segera habis"
+    
+    def update_today_schedule_page(self, medicine_ids):
+        self.schedule_page_rows.update(medicine_ids)
+    
     def refresh_pages(self):
-        # Refresh dashboard
-        self.stacked_widget.removeWidget(self.dashboard_page)
-        self.dashboard_page = QWidget()
-        self.create_dashboard(self.dashboard_page)
-        self.stacked_widget.insertWidget(0, self.dashboard_page)
-        
-        # Refresh medicine list
-        self.stacked_widget.removeWidget(self.medicine_list_page)
-        self.medicine_list_page = QWidget()
-        self.create_medicine_list(self.medicine_list_page)
-        self.stacked_widget.insertWidget(1, self.medicine_list_page)
-        
-        # Refresh today schedule page
-        self.stacked_widget.removeWidget(self.today_schedule_page)
-        self.today_schedule_page = QWidget()
-        self.create_today_schedule_page(self.today_schedule_page)
-        self.stacked_widget.insertWidget(2, self.today_schedule_page)
-        
-        # Set current page
-        if self.current_page == "Dashboard":
-            self.stacked_widget.setCurrentIndex(0)
-        elif self.current_page == "Daftar Obat":
-            self.stacked_widget.setCurrentIndex(1)
-        elif self.current_page == "Jadwal Hari Ini":
-            self.stacked_widget.setCurrentIndex(2)
+        """Rebuild the current page from scratch; others rebuild when opened"""
+        if self.alarm_scheduler is not None:
+            self.alarm_scheduler.reschedule()
+        for pending in self.pending_updates.values():
+            pending.clear()
+        for page in self.pages.values():
+            self.stacked_widget.removeWidget(page)
+            page.deleteLater()
+        self.pages = {}
+        self.adherence_loader = None
+        if getattr(self, 'medicine_model', None) is not None:
+            self.medicine_model.detach()
+            self.medicine_model = None
+        self.show_page(self.current_page)
+    
+    def show_page(self, page_name):
+        page = self.pages.get(page_name)
+        if page is None:
+            page = QWidget()
+            getattr(self, self.page_builders[page_name])(page)
+            self.stacked_widget.addWidget(page)
+            self.pages[page_name] = page
+            # Halaman baru sudah memakai data terbaru
+            self.pending_updates.get(page_name, set()).clear()
+        else:
+            self.apply_pending_updates(page_name)
+        self.stacked_widget.setCurrentWidget(page)
     
     def change_page(self, page_name):
         # Update current page
         self.current_page = page_name
-        
-        # Set stacked widget index
-        if page_name == "Dashboard":
-            self.stacked_widget.setCurrentIndex(0)
-        elif page_name == "Daftar Obat":
-            self.stacked_widget.setCurrentIndex(1)
-        elif page_name == "Jadwal Hari Ini":
-            self.stacked_widget.setCurrentIndex(2)
-        # Add more pages as needed
+        if self.medicine_manager is not None:
+            self.show_page(page_name)
         
         # Update sidebar button states
         for name, btn in self.nav_buttons_dict.items():
-            if name == page_name:
-                btn.setStyleSheet("""
-                    QPushButton {
-                        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                            stop:0 #667eea, stop:1 #764ba2);
-                        color: white;
-                        border: none;
-                        border-radius: 15px;
-                        text-align: left;
-                        padding-left: 20px;
-                        font-weight: bold;
-                    }
-                    QPushButton:hover {
-                        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                            stop:0 #5a67d8, stop:1 #6b46c1);
-                    }
-                """)
-            else:
-                btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: transparent;
-                        color: #4A5568;
-                        border: none;
-                        border-radius: 15px;
-                        text-align: left;
-                        padding-left: 20px;
-                    }
-                    QPushButton:hover {
-                        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                            stop:0 rgba(102, 126, 234, 0.1), stop:1 rgba(118, 75, 162, 0.1));
-                        color: #2D3748;
-                    }
-                """)
-    
-    def file_changed(self):
-        print("File changed, restarting...")
-        QApplication.quit()
-        os.execv(sys.executable, ['python'] + sys.argv)
-
+            btn.set_active(name == page_name)
+    
     def delete_medicine_with_confirm(self, medicine):
         reply = QMessageBox.question(self, "Konfirmasi Hapus", f"Yakin ingin menghapus obat '{medicine['name']}'?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             if self.medicine_manager.delete_medicine(medicine.get('id')):
                 QMessageBox.information(self, "Berhasil", "Obat berhasil dihapus!")
-                self.refresh_pages()
             else:
                 QMessageBox.critical(self, "Error", "Gagal menghapus obat!")
 
     def is_time_taken(self, item):
-        for med in self.medicine_manager.medicines:
-            if f"{med['name']} - {med['dose']}" == item['medicine']:
-                return 'taken_times' in med and item['time'] in med['taken_times']
-        return False
+        return self.medicine_manager.is_dose_taken(item['medicine_id'], item['time'])
 
-class AlarmDialog(QDialog):
-    def __init__(self, parent, item, stop_callback):
+class AlarmCenter(QDialog):
+    """Non-modal alarm window listing due doses grouped by due day and time.
+
+    Doses that become due while the window is open are queued into it
+    instead of opening another dialog, and each time group is
+    acknowledged with one button, so a burst of simultaneous doses never
+    blocks the event loop or stacks modal dialogs.
+    """
+    acknowledged = pyqtSignal(list)
+
+    def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Alarm Obat!")
         self.setWindowFlags(self.windowFlags() | Qt.WindowType.WindowStaysOnTopHint)
-        self.setModal(True)
-        self.setFixedSize(480, 300)  # Perbesar sedikit
+        self.setModal(False)
+        self.resize(480, 420)
         self.setStyleSheet("""
             QDialog {
                 background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
@@ -1161,51 +1697,113 @@ class AlarmDialog(QDialog):
                 border-radius: 20px;
             }
         """)
+        self.groups = {}  # ("YYYY-MM-DD", "HH:MM") -> {'items': {dose_key: item}, 'frame', 'info'}
         main = QVBoxLayout(self)
         main.setContentsMargins(30, 30, 30, 30)
         main.setSpacing(18)
         icon = QLabel("⏰")
-        icon.setFont(QFont("Segoe UI Emoji", 48))
+        icon.setFont(app_font(48, family="Segoe UI Emoji"))
         icon.setAlignment(Qt.AlignmentFlag.AlignCenter)
         main.addWidget(icon)
         title = QLabel("Waktunya Minum Obat!")
-        title.setFont(QFont("Segoe UI", 20, QFont.Weight.Bold))
+        title.setFont(app_font(20, QFont.Weight.Bold))
         title.setStyleSheet("color: #2D3748;")
         title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         main.addWidget(title)
-        info = QLabel(f"{item['medicine']}\nJam: {item['time']}")
-        info.setFont(QFont("Segoe UI", 14))
-        info.setStyleSheet("color: #4A5568;")
-        info.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setStyleSheet("QScrollArea { border: none; background: transparent; }")
+        groups_widget = QWidget()
+        groups_widget.setStyleSheet("background: transparent;")
+        self.groups_layout = QVBoxLayout(groups_widget)
+        self.groups_layout.setContentsMargins(0, 0, 0, 0)
+        self.groups_layout.setSpacing(12)
+        self.groups_layout.addStretch()
+        scroll.setWidget(groups_widget)
+        main.addWidget(scroll)
+    
+    def add_doses(self, items):
+        """Queue due doses into their time groups"""
+        changed = set()
+        for item in items:
+            key = (item['date'], item['time'])
+            group = self.groups.get(key)
+            if group is None:
+                group = self.create_group(key)
+            group['items'][item['dose_key']] = item
+            changed.add(key)
+        for key in changed:
+            group = self.groups[key]
+            # Label daftar obat dibangun sekali per batch, bukan per dosis
+            group['info'].setText("\n".join(
+                f"{item['patient_name']}: {item['medicine']}" if item.get('patient_name') else item['medicine']
+                for item in group['items'].values()))
+    
+    def create_group(self, key):
+        day, time = key
+        frame = QFrame()
+        frame.setObjectName("alarmGroup")
+        layout = QVBoxLayout(frame)
+        layout.setContentsMargins(18, 14, 18, 14)
+        layout.setSpacing(8)
+        header = QLabel(f"Jam: {time}")
+        if day != date.today().isoformat():
+            # Dosis hari lalu yang belum dikonfirmasi
+            header.setText(f"Jam: {time} ({date.fromisoformat(day).strftime('%d/%m/%Y')})")
+        header.setObjectName("alarmGroupHeader")
+        header.setFont(app_font(14, QFont.Weight.Bold))
+        layout.addWidget(header)
+        info = QLabel()
+        info.setObjectName("alarmGroupInfo")
+        info.setFont(app_font(13))
         info.setWordWrap(True)  # Aktifkan word wrap
-        info.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
-        main.addWidget(info)
+        layout.addWidget(info)
         btn = QPushButton("Sudah Diminum dan Matikan Alarm")
-        btn.setFont(QFont("Segoe UI", 13, QFont.Weight.Bold))
-        btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 #43E97B, stop:1 #38F9D7);
-                color: white;
-                border: none;
-                border-radius: 12px;
-                padding: 12px 18px;
-                font-size: 15px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 #38D86A, stop:1 #32E5C4);
-            }
-        """)
-        btn.clicked.connect(self.accept)
-        main.addWidget(btn)
-        self.accepted.connect(stop_callback)
+        btn.setObjectName("acknowledgeButton")
+        btn.setFont(app_font(13, QFont.Weight.Bold))
+        btn.clicked.connect(lambda: self.acknowledge_group(key))
+        layout.addWidget(btn)
+        
+        # Grup diurutkan menurut tanggal lalu jam jatuh tempo
+        position = sorted(list(self.groups) + [key]).index(key)
+        self.groups_layout.insertWidget(position, frame)
+        group = {'items': {}, 'frame': frame, 'info': info}
+        self.groups[key] = group
+        return group
+    
+    def acknowledge_group(self, key):
+        group = self.groups.pop(key, None)
+        if group is None:
+            return
+        group['frame'].deleteLater()
+        if not self.groups:
+            self.hide()
+        self.acknowledged.emit(list(group['items'].values()))
+    
+    def drop_before(self, day):
+        """Remove the groups of days before `day` ("YYYY-MM-DD") without acknowledging them"""
+        for key in [key for key in self.groups if key[0] < day]:
+            self.groups.pop(key)['frame'].deleteLater()
+    
+    def dose_keys(self):
+        """(date, dose_key) of every queued dose"""
+        return {(day, dose_key) for (day, _), group in self.groups.items() for dose_key in group['items']}
+    
+    def has_pending(self):
+        return bool(self.groups)
+    
+    def closeEvent(self, event):
+        # Menutup jendela hanya menyembunyikan; dosis tetap antre
+        event.ignore()
+        self.hide()
+        self.acknowledged.emit([])
 
 class AddMedicineDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Tambah Obat Baru")
-        self.setFixedSize(500, 750)
+        self.setFixedSize(500, 800)
         self.setModal(True)
         
         # Set dialog style
@@ -1235,7 +1833,7 @@ class AddMedicineDialog(QDialog):
         form_layout.setSpacing(18)
           # Title
         title_label = QLabel("💊 Tambah Obat Baru")
-        title_label.setFont(QFont("Segoe UI", 18, QFont.Weight.Bold))
+        title_label.setFont(app_font(18, QFont.Weight.Bold))
         title_label.setStyleSheet("""
             color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
                 stop:0 #667eea, stop:1 #764ba2);
@@ -1254,7 +1852,7 @@ class AddMedicineDialog(QDialog):
         # Stock
         stock_layout = QHBoxLayout()
         stock_label = QLabel("Stok:")
-        stock_label.setFont(QFont("Segoe UI", 12, QFont.Weight.Medium))
+        stock_label.setFont(app_font(12, QFont.Weight.Medium))
         stock_label.setStyleSheet("color: #2D3748;")
         
         self.stock_spinbox = QSpinBox()
@@ -1263,19 +1861,35 @@ class AddMedicineDialog(QDialog):
         self.stock_spinbox.setStyleSheet(self.get_input_style())
         self.stock_spinbox.setFixedHeight(40)
         
-        stock_unit = QComboBox()
-        stock_unit.addItems(["tablet", "kapsul", "ml", "mg", "vial", "sachet"])
-        stock_unit.setStyleSheet(self.get_input_style())
-        stock_unit.setFixedHeight(40)
+        self.stock_unit = QComboBox()
+        self.stock_unit.addItems(["tablet", "kapsul", "ml", "mg", "vial", "sachet"])
+        self.stock_unit.setStyleSheet(self.get_input_style())
+        self.stock_unit.setFixedHeight(40)
         
         stock_layout.addWidget(stock_label, 1)
         stock_layout.addWidget(self.stock_spinbox, 2)
-        stock_layout.addWidget(stock_unit, 1)
+        stock_layout.addWidget(self.stock_unit, 1)
         form_layout.addLayout(stock_layout)
         
+        # Priority (menentukan nada alarm)
+        priority_layout = QHBoxLayout()
+        priority_label = QLabel("Prioritas:")
+        priority_label.setFont(app_font(12, QFont.Weight.Medium))
+        priority_label.setStyleSheet("color: #2D3748;")
+        
+        self.priority = QComboBox()
+        self.priority.addItems(list(PRIORITY_SOUNDS))
+        self.priority.setCurrentText("Normal")
+        self.priority.setStyleSheet(self.get_input_style())
+        self.priority.setFixedHeight(40)
+        
+        priority_layout.addWidget(priority_label, 1)
+        priority_layout.addWidget(self.priority, 3)
+        form_layout.addLayout(priority_layout)
+        
         # Schedule section
         schedule_label = QLabel("Jadwal Konsumsi:")
-        schedule_label.setFont(QFont("Segoe UI", 12, QFont.Weight.Medium))
+        schedule_label.setFont(app_font(12, QFont.Weight.Medium))
         schedule_label.setStyleSheet("color: #2D3748; margin-top: 10px;")
         form_layout.addWidget(schedule_label)
         
@@ -1292,7 +1906,7 @@ class AddMedicineDialog(QDialog):
         
         # Add time button
         add_time_btn = QPushButton("+ Tambah Waktu")
-        add_time_btn.setFont(QFont("Segoe UI", 11))
+        add_time_btn.setFont(app_font(11))
         add_time_btn.setStyleSheet("""
             QPushButton {
                 background: #E2E8F0;
@@ -1310,7 +1924,7 @@ class AddMedicineDialog(QDialog):
         
         # Notes
         notes_label = QLabel("Catatan (Opsional):")
-        notes_label.setFont(QFont("Segoe UI", 12, QFont.Weight.Medium))
+        notes_label.setFont(app_font(12, QFont.Weight.Medium))
         notes_label.setStyleSheet("color: #2D3748;")
         form_layout.addWidget(notes_label)
         
@@ -1325,7 +1939,7 @@ class AddMedicineDialog(QDialog):
         button_layout.setSpacing(15)
         
         cancel_btn = QPushButton("Batal")
-        cancel_btn.setFont(QFont("Segoe UI", 12, QFont.Weight.Medium))
+        cancel_btn.setFont(app_font(12, QFont.Weight.Medium))
         cancel_btn.setFixedHeight(45)
         cancel_btn.setStyleSheet("""
             QPushButton {
@@ -1342,7 +1956,7 @@ class AddMedicineDialog(QDialog):
         cancel_btn.clicked.connect(self.reject)
         
         save_btn = QPushButton("Simpan Obat")
-        save_btn.setFont(QFont("Segoe UI", 12, QFont.Weight.Bold))
+        save_btn.setFont(app_font(12, QFont.Weight.Bold))
         save_btn.setFixedHeight(45)
         save_btn.setStyleSheet("""
             QPushButton {
@@ -1366,13 +1980,13 @@ class AddMedicineDialog(QDialog):
     
     def create_form_field(self, layout, label_text, field_name, placeholder):
         label = QLabel(label_text)
-        label.setFont(QFont("Segoe UI", 12, QFont.Weight.Medium))
+        label.setFont(app_font(12, QFont.Weight.Medium))
         label.setStyleSheet("color: #2D3748;")
         layout.addWidget(label)
         
         field = QLineEdit()
         field.setPlaceholderText(placeholder)
-        field.setFont(QFont("Segoe UI", 11))
+        field.setFont(app_font(11))
         field.setFixedHeight(40)
         field.setStyleSheet(self.get_input_style())
         setattr(self, field_name, field)
@@ -1472,7 +2086,7 @@ class AddMedicineDialog(QDialog):
     
     def get_medicine_data(self):
         # Get stock unit
-        stock_unit = self.findChild(QComboBox).currentText()
+        stock_unit = self.stock_unit.currentText()
         
         # Collect data from form
         medicine_data = {
@@ -1480,6 +2094,7 @@ class AddMedicineDialog(QDialog):
             'dose': self.dose.text(),
             'stock': self.stock_spinbox.value(),
             'stock_unit': stock_unit,
+            'priority': self.priority.currentText(),
             'times': [],
             'notes': self.notes_text.toPlainText()
         }
@@ -1506,10 +2121,12 @@ class EditMedicineDialog(AddMedicineDialog):
             self.dose.setText(medicine_data.get('dose', ''))
             self.stock_spinbox.setValue(medicine_data.get('stock', 1))
             # Set stock_unit
-            stock_unit = self.findChild(QComboBox)
-            idx = stock_unit.findText(medicine_data.get('stock_unit', 'tablet'))
+            idx = self.stock_unit.findText(medicine_data.get('stock_unit', 'tablet'))
+            if idx >= 0:
+                self.stock_unit.setCurrentIndex(idx)
+            idx = self.priority.findText(medicine_data.get('priority', 'Normal'))
             if idx >= 0:
-                stock_unit.setCurrentIndex(idx)
+                self.priority.setCurrentIndex(idx)
             # Set times
             # Hapus time input default
             while self.times_layout.count():
@@ -1545,8 +2162,20 @@ class EditMedicineDialog(AddMedicineDialog):
         # Tidak perlu set id/created_at di sini, akan diatur di MediMateApp
         self.accept()
 
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MediMateApp()
+def main(argv):
+    profile = StartupProfile(enabled="--profile-startup" in argv)
+    profile.mark("imports")
+    app = QApplication(argv)
+    app.setStyleSheet(STYLESHEET)
+    profile.mark("QApplication")
+    window = MediMateApp(profile)
+    app.aboutToQuit.connect(window.shutdown)
+    if "--hot-reload" in argv:
+        # Mode development: kode UI dimuat ulang tanpa restart proses
+        from hot_reload import HotReloader
+        window.hot_reloader = HotReloader(window, __file__)
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    return app.exec()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,470 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+import os
+import threading
+
+from adherence import DoseEvents, EventLog, day_events, summarize, taken_times
+from codec import loads
+from dose_history import DoseHistory
+from medicine_manager import MedicineManager
+from recurrence import Recurrence, iter_days
+from schedule_index import parse_time
+from storage import atomic_write_json, open_storage
+
+
+class PatientRegistry:
+    """Patients, each with their own medicine shard (storage + dose history).
+
+    patients.json lists every patient with the directory of their shard
+    and a compact copy of their schedule, so cross-patient queries such
+    as "who is due now" never open a shard. Medicines taken every day are
+    kept as (minute, medicine, label) entries; medicines with a
+    recurrence rule keep the rule, which is expanded for the current
+    day. Shards are opened on demand as MedicineManagers; at most
+    `max_open` stay open and the least recently used one is flushed and
+    closed when another is needed. Pinned patients (the one shown in the
+    UI) are never evicted.
+
+    Schedule summaries are written back on flush() (close() flushes),
+    once for all shards that changed rather than per evicted shard; a
+    shard whose data files are newer than patients.json, e.g. after a
+    crash, gets its summary rebuilt the next time it is needed.
+
+    Finished days are turned into dose events (adherence.py) from the
+    same summaries and each shard's dose history, so adherence queries
+    over all patients do not open any shard either. The current
+    schedule is used for past days; edits are not versioned.
+
+    An existing single-patient install becomes patient 1, whose shard is
+    the data directory itself, so medicines.json and history/ stay put.
+    """
+
+    FILE_NAME = "patients.json"
+    # Hari lampau terjauh yang diringkas saat event dosis pertama kali dibuat
+    MAX_CATCH_UP_DAYS = 366
+    # File data shard yang menandakan ringkasan jadwal mungkin basi
+    SHARD_FILES = ("medicines.json", "medicines.journal", "medicines.db", "medicines.db-wal")
+
+    def __init__(self, data_dir, max_open=16, storage_kind=None, write_behind=None):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, self.FILE_NAME)
+        self.max_open = max_open
+        self.storage_kind = storage_kind or os.environ.get("MEDIMATE_STORAGE", "json")
+        self.write_behind = write_behind
+        self._patients = {}          # patient_id -> {'id', 'name', 'dir', 'schedule', 'rules', 'tones', 'since'}
+        self._open = OrderedDict()   # patient_id -> MedicineManager, urutan LRU
+        self._pinned = set()
+        self._due = None             # [(minute, patient_id, medicine_id, label)], terurut
+        self._due_day = None         # hari yang dipakai saat _due dibangun
+        self._dirty = False
+        self._touched = set()        # shard terbuka yang datanya berubah
+        self._stale = set()          # shard terbuka yang ringkasannya perlu dihitung ulang
+        self._listeners = []
+        self._event_logs = {}        # patient_id -> EventLog
+        self._lock = threading.RLock()
+        self._load()
+
+    # --- daftar pasien ---
+
+    def patients(self):
+        """Patients in creation order as {'id', 'name'} dicts"""
+        return [{'id': p['id'], 'name': p['name']} for p in self._patients.values()]
+
+    def get_patient(self, patient_id):
+        patient = self._patients.get(patient_id)
+        return None if patient is None else {'id': patient['id'], 'name': patient['name']}
+
+    def add_patient(self, name):
+        with self._lock:
+            patient_id = max(self._patients, default=0) + 1
+            self._patients[patient_id] = {
+                'id': patient_id,
+                'name': name,
+                'dir': os.path.join("patients", str(patient_id)),
+                'created_at': datetime.now().isoformat(),
+                'schedule': [],
+                'rules': [],
+                'tones': {},
+                'since': {},
+            }
+            self._save()
+            return self.get_patient(patient_id)
+
+    def remove_patient(self, patient_id):
+        """Drop a patient from the registry (their shard files are kept)"""
+        with self._lock:
+            if patient_id not in self._patients:
+                return False
+            self._pinned.discard(patient_id)
+            self._close_shard(patient_id)
+            del self._patients[patient_id]
+            self._event_logs.pop(patient_id, None)
+            self._due = None
+            self._save()
+            return True
+
+    # --- shard ---
+
+    def manager(self, patient_id):
+        """MedicineManager of one patient, opening (and loading) the shard if needed"""
+        with self._lock:
+            manager = self._open.get(patient_id)
+            if manager is not None:
+                self._open.move_to_end(patient_id)
+                return manager
+            if patient_id not in self._patients:
+                raise KeyError(f"Unknown patient {patient_id}")
+            manager = MedicineManager(open_storage(self.storage_kind, self.shard_dir(patient_id)),
+                                      write_behind=self.write_behind)
+            manager.subscribe(lambda event, medicine_id, medicine, pid=patient_id:
+                              self._on_shard_change(pid, event, medicine_id, medicine))
+            self._open[patient_id] = manager
+            if self._patients[patient_id]['schedule'] is None:
+                self._refresh_summary(patient_id)
+            self._evict()
+            return manager
+
+    def subscribe(self, callback):
+        """Register callback(patient_id, event, medicine_id, medicine) for changes in any open shard"""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def pin(self, patient_id):
+        self._pinned.add(patient_id)
+
+    def unpin(self, patient_id):
+        with self._lock:
+            self._pinned.discard(patient_id)
+            self._evict()
+
+    def open_count(self):
+        return len(self._open)
+
+    def shard_dir(self, patient_id):
+        return os.path.join(self.data_dir, self._patients[patient_id]['dir'])
+
+    def flush(self):
+        """Write changed schedule summaries to patients.json"""
+        with self._lock:
+            self._refresh_stale()
+            if self._dirty:
+                self._save()
+
+    def close(self):
+        """Flush and close every open shard (call on application exit)"""
+        with self._lock:
+            for patient_id in list(self._open):
+                self._close_shard(patient_id)
+            self.flush()
+
+    # --- jadwal gabungan ---
+
+    def due_between(self, start, end):
+        """Doses of all patients scheduled between two "HH:MM" times (inclusive)"""
+        due = self._due_index()
+        lo = bisect_left(due, (parse_time(start),))
+        hi = bisect_right(due, (parse_time(end), float('inf')))
+        return [self._make_item(entry) for entry in due[lo:hi]]
+
+    def due_now(self, now=None, lookback_minutes=60):
+        """Untaken doses of all patients that came due in the last `lookback_minutes`"""
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        start = max(0, minute - lookback_minutes)
+        items = self.due_between(f"{start // 60:02d}:{start % 60:02d}", now.strftime("%H:%M"))
+        histories = {}
+        due = []
+        for item in items:
+            if not self.is_dose_taken(item['patient_id'], item['medicine_id'], item['time'], histories):
+                due.append(item)
+        return due
+
+    def today_schedule(self):
+        """All patients' doses for today, ordered by time.
+
+        Status comes from the open shards; doses of closed shards are
+        reported as not taken, use is_dose_taken() before acting on one.
+        """
+        items = []
+        for entry in self._due_index():
+            item = self._make_item(entry)
+            manager = self._open.get(item['patient_id'])
+            if manager is not None and manager.is_dose_taken(item['medicine_id'], item['time']):
+                item['status'] = "Sudah Diminum"
+            items.append(item)
+        return items
+
+    def is_dose_taken(self, patient_id, medicine_id, time, histories=None):
+        """Check a dose of any patient, reading only that patient's history partition"""
+        manager = self._open.get(patient_id)
+        if manager is not None:
+            return manager.is_dose_taken(medicine_id, time)
+        histories = {} if histories is None else histories
+        history = histories.get(patient_id)
+        if history is None:
+            history = histories[patient_id] = DoseHistory(os.path.join(self.shard_dir(patient_id), "history"))
+        return history.is_taken(medicine_id, time)
+
+    def take_doses(self, patient_id, doses, day=None):
+        """Mark [(medicine_id, "HH:MM")] doses of one patient as taken; returns how many were new.
+
+        `day` is the day the doses were scheduled for (default: today).
+
+        Opens the patient's shard if needed (stock is kept there), so
+        callers on the GUI thread should do this in the background for
+        patients whose shard is not open.
+        """
+        with self._lock:
+            manager = self.manager(patient_id)
+            manager.check_day_rollover()
+            taken = manager.history.taken_on(day or manager.history.day)
+            new = []
+            for medicine_id, time in doses:
+                medicine = manager.get_medicine_by_id(medicine_id)
+                if medicine is not None and (medicine_id, time) not in taken:
+                    taken.add((medicine_id, time))
+                    new.append((medicine, time))
+            if new:
+                manager.take_doses(new, day)
+            return len(new)
+
+    # --- kepatuhan ---
+
+    def close_days(self, today=None):
+        """Record every finished day that has no dose events yet, for all patients"""
+        today = today or date.today()
+        yesterday = today - timedelta(days=1)
+        with self._lock:
+            self._ensure_summaries()
+            patient_ids = list(self._patients)
+        # Lock dilepas di antara pasien: susulan pertama (sampai setahun
+        # riwayat per pasien) tidak menahan alarm sepanjang semua pasien
+        for patient_id in patient_ids:
+            with self._lock:
+                patient = self._patients.get(patient_id)
+                if patient is None:
+                    continue
+                log = self._event_log(patient_id)
+                closed = log.closed_through()
+                if closed is not None and closed >= yesterday:
+                    continue
+                manager = self._open.get(patient_id)
+                history = manager.history if manager is not None else DoseHistory(
+                    os.path.join(self.shard_dir(patient_id), "history"))
+                if closed is None:
+                    # Belum pernah diringkas: mulai dari partisi riwayat tertua
+                    days = history.days()
+                    closed = (days[0] if days else today) - timedelta(days=1)
+                first = max(closed + timedelta(days=1), today - timedelta(days=self.MAX_CATCH_UP_DAYS))
+                events = DoseEvents()
+                for day in iter_days(first, yesterday):
+                    doses = [(minute, medicine_id) for minute, medicine_id, _ in self._summary_doses(patient, day)]
+                    events.extend(day_events(day, doses, taken_times(history.entries(day))))
+                log.append(events, yesterday)
+
+    def adherence(self, first, last, patient_id=None):
+        """Adherence stats for the days first..last (dates, inclusive).
+
+        With a patient_id: one row per medicine of that patient; without:
+        one row per patient. Rows are adherence.summarize() stats plus
+        patient_id, patient_name, medicine_id (None per patient) and
+        name. Days up to yesterday are recorded first (close_days), which
+        can take a while the first time; the UI calls this off the GUI thread.
+        """
+        self.close_days()
+        with self._lock:
+            if patient_id is not None:
+                events = self._event_log(patient_id).load(first, last)
+                manager = self.manager(patient_id)
+                rows = []
+                for medicine_id, stats in summarize(events.medicine_id, events).items():
+                    medicine = manager.get_medicine_by_id(medicine_id)
+                    rows.append(dict(stats, patient_id=patient_id,
+                                     patient_name=self._patients[patient_id]['name'],
+                                     medicine_id=medicine_id,
+                                     name=medicine.name if medicine is not None else f"Obat #{medicine_id}"))
+                return rows
+            events = DoseEvents()
+            keys = array('i')
+            for pid in self._patients:
+                patient_events = self._event_log(pid).load(first, last)
+                events.extend(patient_events)
+                keys.extend(array('i', [pid]) * len(patient_events))
+            return [dict(stats, patient_id=pid, patient_name=self._patients[pid]['name'],
+                         medicine_id=None, name=self._patients[pid]['name'])
+                    for pid, stats in summarize(keys, events).items()]
+
+    def _event_log(self, patient_id):
+        log = self._event_logs.get(patient_id)
+        if log is None:
+            log = self._event_logs[patient_id] = EventLog(
+                os.path.join(self.shard_dir(patient_id), "history", "events"))
+        return log
+
+    # --- internal ---
+
+    def _make_item(self, entry):
+        minute, patient_id, medicine_id, label = entry
+        time = f"{minute // 60:02d}:{minute % 60:02d}"
+        patient = self._patients[patient_id]
+        # Nada alarm dipilih dari ringkasan, tanpa membuka shard
+        priority, alarm_sound = patient['tones'].get(str(medicine_id), (None, None))
+        return {
+            'time': time,
+            'patient_id': patient_id,
+            'patient_name': patient['name'],
+            'medicine_id': medicine_id,
+            'dose_key': f"{patient_id}:{medicine_id}@{time}",
+            'medicine': label,
+            'priority': priority,
+            'alarm_sound': alarm_sound,
+            'status': "Belum Diminum",
+        }
+
+    def _due_index(self):
+        with self._lock:
+            self._ensure_summaries()
+            today = date.today()
+            if self._due is None or self._due_day != today:
+                self._due = sorted(
+                    (minute, patient['id'], medicine_id, label)
+                    for patient in self._patients.values()
+                    for minute, medicine_id, label in self._summary_doses(patient, today))
+                self._due_day = today
+            return self._due
+
+    def _ensure_summaries(self):
+        # Ringkasan yang belum diketahui (mis. data lama) diisi sekali
+        for patient_id in [pid for pid, p in self._patients.items() if p['schedule'] is None]:
+            self.manager(patient_id)
+        self._refresh_stale()
+
+    @staticmethod
+    def _summary_doses(patient, day):
+        """(minute, medicine_id, label) of one patient's doses on `day`, from the summary"""
+        # Obat belum terjadwal sebelum tanggal ditambahkan (penting saat
+        # hari-hari lampau diringkas dengan jadwal sekarang)
+        since = patient['since']
+        later = {medicine_id for medicine_id in since if since[medicine_id] > day.isoformat()}
+        doses = [tuple(entry) for entry in patient['schedule'] if str(entry[1]) not in later]
+        # Obat dengan aturan recurrence: hanya dosis pada hari itu
+        for medicine_id, name, dose, minutes, rule in patient['rules']:
+            if str(medicine_id) in later:
+                continue
+            minutes, dose = Recurrence.from_dict(rule).doses_on(day, minutes, dose)
+            doses.extend((minute, medicine_id, f"{name} - {dose}") for minute in minutes)
+        doses.sort()
+        return doses
+
+    def _on_shard_change(self, patient_id, event, medicine_id, medicine):
+        self._touched.add(patient_id)
+        # Ringkasan dihitung ulang saat dibutuhkan, bukan per perubahan
+        self._stale.add(patient_id)
+        self._due = None
+        for callback in list(self._listeners):
+            try:
+                callback(patient_id, event, medicine_id, medicine)
+            except Exception as e:
+                print(f"Error in patient change listener for {event} {patient_id}/{medicine_id}: {e}")
+
+    def _refresh_stale(self):
+        for patient_id in list(self._stale):
+            self._refresh_summary(patient_id)
+
+    def _refresh_summary(self, patient_id):
+        self._stale.discard(patient_id)
+        manager = self._open.get(patient_id)
+        patient = self._patients.get(patient_id)
+        if manager is None or patient is None:
+            return
+        schedule = []
+        rules = []
+        tones = {}   # str(medicine_id) -> [priority, alarm_sound], kunci JSON harus string
+        since = {}   # str(medicine_id) -> "YYYY-MM-DD" obat ditambahkan
+        for medicine in manager.medicines:
+            if medicine.priority or medicine.alarm_sound:
+                tones[str(medicine.id)] = [medicine.priority, medicine.alarm_sound]
+            if medicine.created_at:
+                since[str(medicine.id)] = medicine.created_at[:10]
+            if medicine.recurrence is None:
+                label = f"{medicine.name} - {medicine.dose}"
+                schedule.extend([minute, medicine.id, label] for minute in medicine.minutes)
+            else:
+                rules.append([medicine.id, medicine.name, medicine.dose, list(medicine.minutes),
+                              medicine.recurrence.to_dict()])
+        schedule.sort()
+        if (schedule != patient['schedule'] or rules != patient['rules']
+                or tones != patient['tones'] or since != patient['since']):
+            patient['schedule'] = schedule
+            patient['rules'] = rules
+            patient['tones'] = tones
+            patient['since'] = since
+            self._due = None
+            self._dirty = True
+
+    def _evict(self):
+        for patient_id in list(self._open):
+            if len(self._open) <= self.max_open:
+                break
+            if patient_id not in self._pinned:
+                self._close_shard(patient_id)
+
+    def _close_shard(self, patient_id):
+        if patient_id in self._stale:
+            self._refresh_summary(patient_id)
+        manager = self._open.pop(patient_id, None)
+        if manager is not None:
+            manager.close()
+            if patient_id in self._touched:
+                # patients.json harus lebih baru dari file shard yang berubah;
+                # ditulis sekali di flush(), bukan per shard yang ditutup
+                self._touched.discard(patient_id)
+                self._dirty = True
+
+    def _load(self):
+        if os.path.exists(self.path):
+            saved_at = os.path.getmtime(self.path)
+            with open(self.path, 'rb') as f:
+                data = loads(f.read())
+            for patient in data.get('patients', []):
+                patient.setdefault('schedule', None)
+                patient.setdefault('rules', [])
+                self._patients[patient['id']] = patient
+                if 'since' not in patient or self._shard_mtime(patient) > saved_at:
+                    # Ringkasan dari versi lama (tanpa nada alarm / tanggal mulai) ikut dihitung ulang
+                    patient.setdefault('tones', {})
+                    patient.setdefault('since', {})
+                    patient['schedule'] = None
+        if not self._patients:
+            # Instalasi lama: data di folder utama menjadi pasien pertama
+            self._patients[1] = {
+                'id': 1,
+                'name': "Pasien 1",
+                'dir': "",
+                'created_at': datetime.now().isoformat(),
+                'schedule': None,
+                'rules': [],
+                'tones': {},
+                'since': {},
+            }
+
+    def _shard_mtime(self, patient):
+        directory = os.path.join(self.data_dir, patient['dir'])
+        mtime = 0
+        for name in self.SHARD_FILES:
+            try:
+                mtime = max(mtime, os.path.getmtime(os.path.join(directory, name)))
+            except OSError:
+                pass
+        return mtime
+
+    def _save(self):
+        # Ringkasan shard terbuka yang berubah ikut ditulis, jangan yang basi
+        self._refresh_stale()
+        atomic_write_json(self.path, {'patients': list(self._patients.values())})
+        self._dirty = False
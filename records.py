@@ -0,0 +1,284 @@
+from datetime import date
+import re
+from typing import List, TypedDict
+
+from recurrence import Recurrence
+
+
+class MedicineRecord(TypedDict, total=False):
+    """A medicine as stored on disk and sent over the daemon protocol (see Medicine)"""
+    id: int
+    name: str
+    dose: str
+    stock: int
+    stock_unit: str
+    times: List[str]        # "HH:MM", urutan dari pengguna
+    recurrence: dict        # aturan jadwal tidak harian (lihat recurrence.py)
+    notes: str
+    priority: str
+    alarm_sound: str
+    created_at: str
+    updated_at: str
+
+
+class SchemaError(ValueError):
+    """A stored record that cannot be used as a MedicineRecord"""
+
+
+TIME_PATTERN = re.compile(r"(?:[01]\d|2[0-3]):[0-5]\d")
+# Field teks opsional; nilai lain (mis. angka) diubah ke str
+TEXT_FIELDS = ('dose', 'stock_unit', 'notes', 'priority', 'alarm_sound', 'created_at', 'updated_at')
+
+
+def decode_medicine(raw):
+    """Validate one decoded JSON object into a MedicineRecord.
+
+    Values that are clearly meant right are normalized in place ("5" as
+    stock, "8:00" as time, a numeric dose); anything the app cannot work
+    with raises SchemaError. Unknown fields are kept.
+    """
+    if not isinstance(raw, dict):
+        raise SchemaError(f"expected an object, got {type(raw).__name__}")
+    medicine_id = raw.get('id')
+    if medicine_id is not None and (type(medicine_id) is not int or medicine_id < 1):
+        raise SchemaError(f"invalid id {medicine_id!r}")
+    # Record tanpa ID (mis. baris impor) dilaporkan tanpa awalan "record None"
+    where = "" if medicine_id is None else f"record {medicine_id}: "
+    name = raw.get('name')
+    if type(name) is not str or not name.strip():
+        raise SchemaError(f"{where}missing name")
+    for field in TEXT_FIELDS:
+        value = raw.get(field)
+        if value is not None and type(value) is not str:
+            if type(value) not in (int, float):
+                raise SchemaError(f"{where}invalid {field} {value!r}")
+            raw[field] = str(value)
+    if 'dose' not in raw:
+        raw['dose'] = ""
+    stock = raw.get('stock', 0)
+    if type(stock) is not int or stock < 0:
+        try:
+            raw['stock'] = max(0, int(stock))
+        except (TypeError, ValueError):
+            raise SchemaError(f"{where}invalid stock {stock!r}") from None
+    elif 'stock' not in raw:
+        raw['stock'] = 0
+    times = raw.get('times')
+    if times is None:
+        raw['times'] = []
+    elif type(times) is not list:
+        raise SchemaError(f"{where}times must be a list")
+    elif not all(type(time) is str and TIME_PATTERN.fullmatch(time) for time in times):
+        raw['times'] = [_normalize_time(where, time) for time in times]
+    if raw.get('recurrence') is not None:
+        try:
+            Recurrence.from_dict(raw['recurrence'], default_start=date.today())
+        except ValueError as e:
+            raise SchemaError(f"{where}invalid recurrence: {e}") from None
+    return raw
+
+
+def _normalize_time(where, time):
+    hours, _, minutes = time.partition(":") if type(time) is str else ("", "", "")
+    if not (hours.isdigit() and minutes.isdigit() and int(hours) < 24 and int(minutes) < 60):
+        raise SchemaError(f"{where}invalid time {time!r}")
+    return f"{int(hours):02d}:{int(minutes):02d}"
+
+
+def decode_medicines(items, source):
+    """Validate a list of decoded records; returns (records, rejected raw items)"""
+    if not isinstance(items, list):
+        print(f"Ignoring {source}: expected a list of medicines")
+        return [], []
+    records = []
+    rejected = []
+    for raw in items:
+        try:
+            records.append(decode_medicine(raw))
+        except SchemaError as e:
+            print(f"Skipping invalid medicine in {source}: {e}")
+            rejected.append(raw)
+    return records, rejected
+
+
+# Jam "HH:MM" per menit-dalam-hari, dibagi semua record (satu objek per menit)
+TIME_LABELS = tuple(f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60))
+MINUTES = tuple(range(24 * 60))
+
+
+MINUTE_OF = {label: minute for minute, label in zip(MINUTES, TIME_LABELS)}
+
+
+def pack_times(times):
+    """["08:00", "20:00"] -> (480, 1200), using the shared int objects"""
+    minutes = []
+    for time in times:
+        minute = MINUTE_OF.get(time) if type(time) is str else None
+        if minute is None:
+            minute = _parse_minute(time)
+            if minute is None:
+                print(f"Ignoring invalid schedule time {time!r}")
+                continue
+        minutes.append(minute)
+    return tuple(minutes)
+
+
+def _parse_minute(time):
+    if type(time) is int:
+        return MINUTES[time] if 0 <= time < 24 * 60 else None
+    hours, _, mins = str(time).partition(":")
+    if not (hours.isdigit() and mins.isdigit() and int(hours) < 24 and int(mins) < 60):
+        return None
+    return MINUTES[int(hours) * 60 + int(mins)]
+
+
+def parse_recurrence(data, created_at=None):
+    """Recurrence from its stored form (start defaults to the creation day), or None if invalid"""
+    try:
+        start = date.fromisoformat(created_at[:10]) if created_at else date.today()
+    except ValueError:
+        start = date.today()
+    try:
+        return Recurrence.from_dict(data, default_start=start)
+    except ValueError as e:
+        print(f"Ignoring invalid recurrence {data!r}: {e}")
+        return None
+
+
+class Medicine:
+    """One medicine in memory: fixed slots instead of a dict per record.
+
+    Dose times are a tuple of minute-of-day ints (`minutes`); `times`
+    gives the "HH:MM" strings back. `recurrence` is a parsed Recurrence,
+    or None for a medicine taken every day. Records are created from and
+    turned back into plain dicts only where data enters or leaves the
+    manager (storage, the daemon protocol, the add/edit dialogs). Item
+    access (medicine['name'], .get(), 'x' in medicine) keeps working for
+    code that reads a record like a dict; fields the app does not know
+    are kept in `extra` so they survive a round trip.
+    """
+
+    __slots__ = ('id', 'name', 'dose', 'stock', 'stock_unit', 'minutes', 'recurrence', 'notes',
+                 'priority', 'alarm_sound', 'created_at', 'updated_at', 'extra')
+
+    FIELDS = ('id', 'name', 'dose', 'stock', 'stock_unit', 'times', 'recurrence', 'notes',
+              'priority', 'alarm_sound', 'created_at', 'updated_at')
+    # Field lama yang tidak dibawa ke memori (status minum ada di DoseHistory)
+    LEGACY_FIELDS = ('taken_times', 'status_per_time')
+    KNOWN_FIELDS = frozenset(FIELDS + LEGACY_FIELDS)
+    # Slot yang tidak dibaca/ditulis lewat medicine[key] apa adanya
+    INTERNAL_SLOTS = ('minutes', 'recurrence', 'extra')
+
+    def __init__(self, id=None, name="", dose="", stock=0, stock_unit=None, minutes=(), notes=None,
+                 priority=None, alarm_sound=None, created_at=None, updated_at=None, extra=None,
+                 recurrence=None):
+        self.id = id
+        self.name = name
+        self.dose = dose
+        self.stock = stock
+        self.stock_unit = stock_unit
+        self.minutes = minutes
+        self.recurrence = recurrence
+        self.notes = notes
+        self.priority = priority
+        self.alarm_sound = alarm_sound
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        extra = None
+        unknown = data.keys() - cls.KNOWN_FIELDS
+        if unknown:
+            extra = {key: data[key] for key in unknown}
+        recurrence = data.get('recurrence')
+        if recurrence is not None:
+            recurrence = parse_recurrence(recurrence, data.get('created_at'))
+        return cls(data.get('id'), data.get('name', ""), str(data.get('dose', "")), int(data.get('stock') or 0),
+                   data.get('stock_unit'), pack_times(data.get('times') or ()), data.get('notes'),
+                   data.get('priority'), data.get('alarm_sound'), data.get('created_at'),
+                   data.get('updated_at'), extra, recurrence)
+
+    def to_dict(self):
+        """Plain dict for storage and JSON (fields that are not set are left out)"""
+        data = {'id': self.id, 'name': self.name, 'dose': self.dose, 'stock': self.stock}
+        for field in ('stock_unit', 'notes', 'priority', 'alarm_sound', 'created_at', 'updated_at'):
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        data['times'] = self.times
+        if self.recurrence is not None:
+            data['recurrence'] = self.recurrence.to_dict()
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def doses_on(self, day):
+        """(minutes, dose) of this medicine's doses on `day` (a date)"""
+        if self.recurrence is None:
+            return self.minutes, self.dose
+        return self.recurrence.doses_on(day, self.minutes, self.dose)
+
+    def doses_per_day(self, today=None):
+        """Average number of doses per day from `today` on"""
+        if self.recurrence is None:
+            return len(self.minutes)
+        return self.recurrence.daily_rate(self.minutes, today)
+
+    def schedule_label(self):
+        """Times plus the recurrence, e.g. "08:00, 20:00 (Sen, Rab, Jum)" """
+        label = ", ".join(self.times)
+        if self.recurrence is not None:
+            label += f" ({self.recurrence.describe(self.minutes)})"
+        return label
+
+    @property
+    def times(self):
+        return [TIME_LABELS[minute] for minute in self.minutes]
+
+    def __eq__(self, other):
+        if not isinstance(other, Medicine):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Medicine({self.to_dict()!r})"
+
+    # --- akses seperti dict ---
+
+    def __getitem__(self, key):
+        if key == 'times':
+            return self.times
+        if key == 'recurrence' and self.recurrence is not None:
+            return self.recurrence.to_dict()
+        if key in self.__slots__ and key not in self.INTERNAL_SLOTS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __setitem__(self, key, value):
+        if key == 'times':
+            self.minutes = pack_times(value)
+        elif key == 'recurrence':
+            self.recurrence = None if value is None else parse_recurrence(value, self.created_at)
+        elif key in self.__slots__ and key not in self.INTERNAL_SLOTS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
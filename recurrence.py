@@ -0,0 +1,238 @@
+"""Recurrence rules for medicines that are not taken every day.
+
+A rule is stored on the medicine as a small JSON object, loosely after
+iCalendar RRULE:
+
+    {"freq": "weekly", "byday": ["MO", "WE", "FR"]}          Sen/Rab/Jum
+    {"freq": "hourly", "interval": 8}                        tiap 8 jam
+    {"freq": "daily", "start": "2026-10-18", "until": "2026-10-27"}
+    {"freq": "daily", "taper": [[3, "2 tablet"], [3, "1 tablet"]]}
+
+freq is "daily" (every `interval` days), "weekly" (on `byday` every
+`interval` weeks) or "hourly" (every `interval` hours, counted from the
+first dose time on `start`). Daily and weekly rules use the medicine's
+own `times`. `until` (last day, inclusive) or `count` (number of doses)
+end the course; `taper` is a list of [days, dose] steps from `start`,
+after which the course ends. A medicine without a rule is taken every
+day at its times.
+
+Occurrences are computed per day with plain date arithmetic, so any
+window can be expanded lazily one day at a time.
+"""
+from datetime import date, datetime, timedelta
+
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+WEEKDAY_NAMES = ('Sen', 'Sel', 'Rab', 'Kam', 'Jum', 'Sab', 'Min')
+FREQUENCIES = ('daily', 'weekly', 'hourly')
+MINUTES_PER_DAY = 24 * 60
+
+
+def iter_days(start, end):
+    """Dates from `start` up to and including `end`"""
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def _parse_date(value, field):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid {field} {value!r}") from None
+
+
+def _positive_int(value, field):
+    if type(value) is not int or value < 1:
+        raise ValueError(f"invalid {field} {value!r}")
+    return value
+
+
+class Recurrence:
+    """A parsed recurrence rule (see the module docstring for the fields)"""
+
+    __slots__ = ('freq', 'interval', 'byday', 'start', 'until', 'count', 'taper', '_count_end')
+
+    def __init__(self, freq='daily', interval=1, byday=(), start=None, until=None, count=None, taper=()):
+        self.freq = freq
+        self.interval = interval
+        self.byday = byday        # tuple indeks hari (0 = Senin)
+        self.start = start or date.today()
+        self.until = until
+        self.count = count
+        self.taper = taper        # tuple (hari, dosis)
+        self._count_end = None    # (hari terakhir, jumlah dosis di hari itu), dihitung sekali
+
+    @classmethod
+    def from_dict(cls, data, default_start=None):
+        """Parse a stored rule; raises ValueError when it cannot be used"""
+        if not isinstance(data, dict):
+            raise ValueError("recurrence must be an object")
+        freq = data.get('freq', 'daily')
+        if freq not in FREQUENCIES:
+            raise ValueError(f"unknown freq {freq!r}")
+        interval = _positive_int(data.get('interval', 1), 'interval')
+        byday = data.get('byday') or ()
+        if not isinstance(byday, (list, tuple)) or any(day not in WEEKDAYS for day in byday):
+            raise ValueError(f"invalid byday {byday!r}")
+        byday = tuple(sorted({WEEKDAYS.index(day) for day in byday}))
+        if freq == 'weekly' and not byday:
+            raise ValueError("weekly recurrence needs byday")
+        start = data.get('start')
+        start = _parse_date(start, 'start') if start is not None else default_start
+        until = data.get('until')
+        until = _parse_date(until, 'until') if until is not None else None
+        count = data.get('count')
+        count = _positive_int(count, 'count') if count is not None else None
+        taper = data.get('taper') or ()
+        if not isinstance(taper, (list, tuple)):
+            raise ValueError("taper must be a list of [days, dose] steps")
+        steps = []
+        for step in taper:
+            if not isinstance(step, (list, tuple)) or len(step) != 2:
+                raise ValueError(f"invalid taper step {step!r}")
+            steps.append((_positive_int(step[0], 'taper days'), str(step[1])))
+        return cls(freq, interval, byday, start, until, count, tuple(steps))
+
+    def to_dict(self):
+        data = {'freq': self.freq}
+        if self.interval != 1:
+            data['interval'] = self.interval
+        if self.byday:
+            data['byday'] = [WEEKDAYS[day] for day in self.byday]
+        data['start'] = self.start.isoformat()
+        if self.until is not None:
+            data['until'] = self.until.isoformat()
+        if self.count is not None:
+            data['count'] = self.count
+        if self.taper:
+            data['taper'] = [[days, dose] for days, dose in self.taper]
+        return data
+
+    def __eq__(self, other):
+        if not isinstance(other, Recurrence):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Recurrence({self.to_dict()!r})"
+
+    def describe(self, minutes=()):
+        """Short Indonesian label for the schedule column, e.g. "Sen, Rab, Jum" """
+        if self.freq == 'hourly':
+            text = f"tiap {self.interval} jam"
+        elif self.freq == 'weekly':
+            text = ", ".join(WEEKDAY_NAMES[day] for day in self.byday)
+            if self.interval > 1:
+                text += f" (tiap {self.interval} minggu)"
+        else:
+            text = "tiap hari" if self.interval == 1 else f"tiap {self.interval} hari"
+        end = self.end_day(minutes)
+        if end is not None:
+            text += f" s/d {end.strftime('%d/%m')}"
+        return text
+
+    # --- kejadian ---
+
+    def end_day(self, minutes=()):
+        """Last day with doses, or None when the course never ends"""
+        ends = []
+        if self.until is not None:
+            ends.append(self.until)
+        if self.taper:
+            ends.append(self.start + timedelta(days=sum(days for days, _ in self.taper) - 1))
+        if self.count is not None:
+            ends.append(self._count_limit(minutes)[0])
+        return min(ends, default=None)
+
+    def doses_on(self, day, minutes, dose):
+        """(minutes, dose) of the doses on `day`; minutes is () on days without any.
+
+        `minutes` are the medicine's times (minute-of-day) and `dose` its
+        dose; a taper step can replace the dose for the day.
+        """
+        if day < self.start or (self.until is not None and day > self.until):
+            return (), dose
+        offset = (day - self.start).days
+        if self.taper:
+            for days, step_dose in self.taper:
+                if offset < days:
+                    dose = step_dose
+                    break
+                offset -= days
+            else:
+                return (), dose
+        day_minutes = self._minutes_on(day, minutes)
+        if self.count is not None and day_minutes:
+            last_day, last_count = self._count_limit(minutes)
+            if day > last_day:
+                return (), dose
+            if day == last_day:
+                day_minutes = day_minutes[:last_count]
+        return day_minutes, dose
+
+    def occurrences(self, start, end, minutes, dose):
+        """Lazily yield (datetime, dose) for every dose with start <= time < end"""
+        first = max(start.date(), self.start)
+        last = (end - timedelta(microseconds=1)).date()
+        for day in iter_days(first, last):
+            day_minutes, day_dose = self.doses_on(day, minutes, dose)
+            for minute in day_minutes:
+                when = datetime(day.year, day.month, day.day, minute // 60, minute % 60)
+                if start <= when < end:
+                    yield when, day_dose
+
+    def daily_rate(self, minutes, today=None):
+        """Average doses per day from `today` on (0 once the course has ended)"""
+        today = today or date.today()
+        end = self.end_day(minutes)
+        if end is not None and end < today:
+            return 0.0
+        if self.freq == 'hourly':
+            return 24 / self.interval
+        if self.freq == 'weekly':
+            return len(minutes) * len(self.byday) / (7 * self.interval)
+        return len(minutes) / self.interval
+
+    def _minutes_on(self, day, minutes):
+        offset = (day - self.start).days
+        if self.freq == 'daily':
+            return tuple(minutes) if offset % self.interval == 0 else ()
+        if self.freq == 'weekly':
+            week = (offset + self.start.weekday()) // 7
+            if day.weekday() in self.byday and week % self.interval == 0:
+                return tuple(minutes)
+            return ()
+        # hourly: kelipatan `interval` jam dari dosis pertama di hari start
+        step = self.interval * 60
+        anchor = min(minutes, default=0)
+        day_start = offset * MINUTES_PER_DAY
+        k = max(0, -(-(day_start - anchor) // step))
+        result = []
+        for minute in range(anchor + k * step, day_start + MINUTES_PER_DAY, step):
+            result.append(minute - day_start)
+        return tuple(result)
+
+    def _count_limit(self, minutes):
+        # `count` dosis: cari sekali hari terakhirnya dan berapa dosis di hari itu
+        if self._count_end is None:
+            remaining = self.count
+            day = self.start
+            last_possible = self.until or date.max - timedelta(days=1)
+            while day <= last_possible:
+                day_minutes = self._minutes_on(day, minutes)
+                if len(day_minutes) >= remaining:
+                    self._count_end = (day, remaining)
+                    break
+                remaining -= len(day_minutes)
+                if not minutes and self.freq != 'hourly':
+                    self._count_end = (day, 0)
+                    break
+                day += timedelta(days=1)
+            else:
+                self._count_end = (last_possible, remaining)
+        return self._count_end
@@ -0,0 +1,281 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from datetime import date
+from itertools import count, repeat
+
+from records import TIME_LABELS
+
+
+def parse_time(value):
+    """Convert "HH:MM" (or a minute-of-day int) to minute-of-day"""
+    if isinstance(value, int):
+        return value
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def dose_key(medicine_id, time):
+    """Stable identity of one scheduled dose, e.g. "12@08:00" """
+    return f"{medicine_id}@{time}"
+
+
+class ScheduleIndex:
+    """One day's doses (today's for the manager) kept sorted by minute-of-day.
+
+    Entries are keyed by (minute, medicine_id, slot) in a sorted list, so
+    range queries are a bisect plus a slice. Add/edit/delete/take only
+    touch the entries of the affected medicine. Which doses fall on the
+    day comes from each medicine's recurrence rule.
+    """
+
+    def __init__(self, is_taken=lambda medicine_id, time: False, day=None):
+        self.is_taken = is_taken   # is_taken(medicine_id, "HH:MM") untuk hari ini
+        self.day = day or date.today()
+        self._keys = []            # sorted (minute, medicine_id, slot)
+        self._items = {}           # key -> schedule item dict
+        self._keys_by_medicine = {}  # medicine_id -> [key, ...]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def rebuild(self, medicines):
+        """Build the index from scratch (used once at load time)"""
+        self._keys = []
+        self._items = {}
+        self._keys_by_medicine = {}
+        for medicine in medicines:
+            self._keys.extend(self._make_entries(medicine))
+        self._keys.sort()
+
+    def set_day(self, day, medicines):
+        """Switch to another day; returns IDs whose doses or statuses differ"""
+        before = self._by_medicine()
+        self.day = day
+        self.rebuild(medicines)
+        after = self._by_medicine()
+        return {medicine_id for medicine_id in before.keys() | after.keys()
+                if before.get(medicine_id) != after.get(medicine_id)}
+
+    def add(self, medicine):
+        for key in self._make_entries(medicine):
+            insort(self._keys, key)
+
+    def add_many(self, medicines):
+        """Add several medicines with one sort instead of an insort per dose"""
+        for medicine in medicines:
+            self._keys.extend(self._make_entries(medicine))
+        self._keys.sort()
+
+    def remove_many(self, medicine_ids):
+        """Remove several medicines with one pass over the sorted keys"""
+        dropped = set()
+        for medicine_id in medicine_ids:
+            for key in self._keys_by_medicine.pop(medicine_id, []):
+                dropped.add(key)
+                del self._items[key]
+        if dropped:
+            self._keys = [key for key in self._keys if key not in dropped]
+
+    def remove(self, medicine_id):
+        for key in self._keys_by_medicine.pop(medicine_id, []):
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+            del self._items[key]
+
+    def update(self, medicine):
+        self.remove(medicine.id)
+        self.add(medicine)
+
+    def set_status(self, medicine_id, time, status):
+        """Patch the status of one dose slot without touching the rest"""
+        for key in self._keys_by_medicine.get(medicine_id, []):
+            item = self._items[key]
+            if item['time'] == time:
+                item['status'] = status
+
+    def refresh_statuses(self):
+        """Re-read every status from is_taken; returns IDs whose status changed"""
+        changed = set()
+        for (minute, medicine_id, slot), item in self._items.items():
+            status = "Sudah Diminum" if self.is_taken(medicine_id, item['time']) else "Belum Diminum"
+            if item['status'] != status:
+                item['status'] = status
+                changed.add(medicine_id)
+        return changed
+
+    def keys_for(self, medicine_id):
+        """Index keys of one medicine's dose slots"""
+        return list(self._keys_by_medicine.get(medicine_id, []))
+
+    def position(self, key):
+        """Position of `key` in time order"""
+        return bisect_left(self._keys, key)
+
+    def item(self, key):
+        return self._items[key]
+
+    def entries(self):
+        """All (key, item) pairs sorted by time"""
+        return [(key, self._items[key]) for key in self._keys]
+
+    def all(self):
+        """All of today's doses sorted by time"""
+        return [self._items[key] for key in self._keys]
+
+    def between(self, start, end):
+        """Doses with start <= time <= end ("HH:MM" or minute-of-day)"""
+        lo = bisect_left(self._keys, (parse_time(start),))
+        hi = bisect_right(self._keys, (parse_time(end), float('inf')))
+        return [self._items[key] for key in self._keys[lo:hi]]
+
+    def next_doses(self, count, after):
+        """The next `count` doses at or after `after` ("HH:MM" or minute-of-day)"""
+        lo = bisect_left(self._keys, (parse_time(after),))
+        return [self._items[key] for key in self._keys[lo:lo + count]]
+
+    def _by_medicine(self):
+        return {medicine_id: [(self._items[key]['time'], self._items[key]['status']) for key in keys]
+                for medicine_id, keys in self._keys_by_medicine.items() if keys}
+
+    def _make_entries(self, medicine):
+        medicine_id = medicine.id
+        minutes, dose = medicine.doses_on(self.day)
+        label = f"{medicine.name} - {dose}"
+        keys = []
+        # Jam sudah berupa menit-dalam-hari (tervalidasi saat record dibuat)
+        for slot, minute in enumerate(minutes):
+            time = TIME_LABELS[minute]
+            key = (minute, medicine_id, slot)
+            self._items[key] = {
+                'time': time,
+                'medicine_id': medicine_id,
+                # Identitas dosis yang stabil: obat + jam, bukan "nama - dosis"
+                'dose_key': dose_key(medicine_id, time),
+                'medicine': label,
+                'status': "Sudah Diminum" if self.is_taken(medicine_id, time) else "Belum Diminum"
+            }
+            keys.append(key)
+        self._keys_by_medicine[medicine_id] = keys
+        return keys
+
+
+class ScheduleCalendar:
+    """Doses of any day, expanded lazily and cached per day.
+
+    A day is expanded into a sorted tuple of (minute, medicine_id, slot,
+    label) entries the first time it is asked for. Medicines without a
+    recurrence rule give the same entries every day, so they are sorted
+    once and shared; only rule-based medicines are expanded per day, and
+    only between the first and last day of their course. Schedule item
+    dicts are built once per dose as templates and shared between days
+    and calls (callers must not modify them); taken doses of past days
+    get their own copy with the status filled in. At most `max_days` days stay cached (least recently used go
+    first), and any change to the medicines drops the cache; forget(day)
+    drops the items of one day after its dose history changed.
+    """
+
+    def __init__(self, get_medicines, max_days=62):
+        self.get_medicines = get_medicines
+        self.max_days = max_days
+        self._days = OrderedDict()   # date -> tuple entri, urutan LRU
+        self._items = {}             # date -> tuple item dict, sejajar dengan entri
+        self._daily = None           # entri obat tanpa aturan (sama setiap hari)
+        self._templates = None       # entri -> item dict tanpa status hari itu
+        self._ruled = None           # [(hari pertama, hari terakhir, obat)] dengan aturan recurrence
+
+    def invalidate(self):
+        self._days.clear()
+        self._items.clear()
+        self._daily = None
+        self._templates = None
+        self._ruled = None
+
+    def forget(self, day=None):
+        """Drop the cached items of `day` (of every day when None), keeping the entries"""
+        if day is None:
+            self._items.clear()
+        else:
+            self._items.pop(day, None)
+
+    def entries(self, day):
+        """All doses of `day` as sorted (minute, medicine_id, slot, label)"""
+        entries = self._days.get(day)
+        if entries is not None:
+            self._days.move_to_end(day)
+            return entries
+        if self._daily is None:
+            self._split()
+        extra = []
+        for first, last, medicine in self._ruled:
+            if not first <= day <= last:
+                continue
+            minutes, dose = medicine.doses_on(day)
+            if minutes:
+                # (minute, medicine_id, slot, label) per dosis
+                extra.extend(zip(minutes, repeat(medicine.id), count(), repeat(f"{medicine.name} - {dose}")))
+        # Dua deret terurut: timsort menggabungnya dalam waktu linear
+        entries = tuple(sorted(self._daily + tuple(extra))) if extra else self._daily
+        self._days[day] = entries
+        if len(self._days) > self.max_days:
+            self._items.pop(self._days.popitem(last=False)[0], None)
+        return entries
+
+    def items(self, day, taken_on=None):
+        """Schedule item dicts of `day` in time order, parallel to entries(day).
+
+        `taken_on(day)` gives the (medicine_id, "HH:MM") doses taken that
+        day; it is only called when the day's items are built.
+        """
+        entries = self.entries(day)
+        items = self._items.get(day)
+        if items is not None:
+            return items
+        templates = self._templates
+        # Template dipakai langsung (item read-only); entri obat beraturan
+        # mendapat template saat pertama muncul
+        items = [templates.get(entry) or templates.setdefault(entry, _schedule_item(*entry))
+                 for entry in entries]
+        taken = taken_on(day) if taken_on is not None else ()
+        if taken:
+            items = [dict(item, status="Sudah Diminum") if (item['medicine_id'], item['time']) in taken else item
+                     for item in items]
+        items = self._items[day] = tuple(items)
+        return items
+
+    def between(self, day, start, end):
+        """Entries of `day` with start <= minute < end"""
+        entries = self.entries(day)
+        return entries[bisect_left(entries, (start,)):bisect_left(entries, (end,))]
+
+    def items_between(self, day, start, end, taken_on=None):
+        """Items of `day` with start <= minute < end (see items())"""
+        entries = self.entries(day)
+        items = self.items(day, taken_on)
+        return items[bisect_left(entries, (start,)):bisect_left(entries, (end,))]
+
+    def _split(self):
+        daily = []
+        self._ruled = []
+        for medicine in self.get_medicines():
+            rule = medicine.recurrence
+            if rule is not None:
+                # Kursus yang sudah selesai (count/until/taper) dilewati tanpa dihitung per hari
+                self._ruled.append((rule.start, rule.end_day(medicine.minutes) or date.max, medicine))
+                continue
+            label = f"{medicine.name} - {medicine.dose}"
+            daily.extend((minute, medicine.id, slot, label) for slot, minute in enumerate(medicine.minutes))
+        daily.sort()
+        self._daily = tuple(daily)
+        self._templates = {entry: _schedule_item(*entry) for entry in self._daily}
+
+
+def _schedule_item(minute, medicine_id, slot, label):
+    time = TIME_LABELS[minute]
+    return {
+        'time': time,
+        'medicine_id': medicine_id,
+        'dose_key': dose_key(medicine_id, time),
+        'medicine': label,
+        'status': "Belum Diminum",
+    }
@@ -0,0 +1,151 @@
+from bisect import bisect_left, insort
+import re
+import unicodedata
+
+# Ejaan lama / serapan yang sering tertukar di nama obat, dilipat ke satu bentuk
+SPELLING_FOLDS = (
+    ("oe", "u"),
+    ("dj", "j"),
+    ("tj", "c"),
+    ("sj", "sy"),
+    ("nj", "ny"),
+    ("ch", "kh"),
+    ("ph", "f"),
+    ("x", "ks"),
+)
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def fold(text):
+    """Lowercase, strip diacritics and normalize Indonesian spelling variants"""
+    text = text.casefold()
+    if not text.isascii():
+        # Teks ASCII tidak punya diakritik; lewati NFKD (jalur umum)
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    for old, new in SPELLING_FOLDS:
+        text = text.replace(old, new)
+    return text
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Prefix + trigram index over medicine name, dose and notes.
+
+    Every query term must match a record. Short terms match word prefixes
+    (sorted distinct-token list + bisect); terms of three or more
+    characters match anywhere via trigram posting sets, verified against
+    the folded text. Set work and substring checks happen in C, so queries
+    stay in the low-millisecond range at 100k records.
+    """
+
+    FIELDS = ('name', 'dose', 'notes')
+    MAX_TRIGRAMS = 3
+
+    def __init__(self):
+        self._tokens = []     # sorted distinct tokens
+        self._postings = {}   # token -> set(medicine_id)
+        self._trigrams = {}   # trigram -> set(medicine_id)
+        self._texts = {}      # medicine_id -> folded searchable text
+
+    def rebuild(self, medicines):
+        self._postings = {}
+        self._trigrams = {}
+        self._texts = {}
+        for medicine in medicines:
+            self._index(medicine)
+        self._tokens = sorted(self._postings)
+
+    def add(self, medicine):
+        for token in self._index(medicine):
+            if len(self._postings[token]) == 1:
+                insort(self._tokens, token)
+
+    def add_many(self, medicines):
+        """Add several medicines; the token list is re-sorted once"""
+        for medicine in medicines:
+            self._index(medicine)
+        self._tokens = sorted(self._postings)
+
+    def remove(self, medicine_id):
+        text = self._texts.pop(medicine_id, None)
+        if text is None:
+            return
+        for token in set(TOKEN_RE.findall(text)):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(medicine_id)
+            if not ids:
+                del self._postings[token]
+                i = bisect_left(self._tokens, token)
+                if i < len(self._tokens) and self._tokens[i] == token:
+                    del self._tokens[i]
+        for gram in trigrams(text):
+            ids = self._trigrams.get(gram)
+            if ids is not None:
+                ids.discard(medicine_id)
+                if not ids:
+                    del self._trigrams[gram]
+
+    def update(self, medicine):
+        self.remove(medicine.id)
+        self.add(medicine)
+
+    def search(self, query):
+        """Return the set of matching medicine IDs (None for an empty query)"""
+        terms = TOKEN_RE.findall(fold(query))
+        if not terms:
+            return None
+        result = None
+        # Term terpanjang dulu: biasanya paling selektif
+        for term in sorted(set(terms), key=len, reverse=True):
+            if len(term) >= 3:
+                result = self._substring_matches(term, result)
+            else:
+                lo, hi = self._prefix_range(term)
+                if result is not None and len(result) < hi - lo:
+                    # Kandidat lebih sedikit dari token: cek awal kata di teksnya
+                    word_start = " " + term
+                    result = {medicine_id for medicine_id in result
+                              if word_start in self._texts[medicine_id]}
+                else:
+                    matches = set().union(*(self._postings[token] for token in self._tokens[lo:hi]))
+                    result = matches if result is None else result & matches
+            if not result:
+                return set()
+        return result
+
+    def _prefix_range(self, term):
+        """Slice bounds of the sorted tokens that start with `term`"""
+        return (bisect_left(self._tokens, term),
+                bisect_left(self._tokens, term + "\U0010ffff"))
+
+    def _substring_matches(self, term, within=None):
+        # Cukup beberapa trigram paling jarang; sisanya diverifikasi lewat teks
+        postings = sorted((self._trigrams.get(gram, set()) for gram in trigrams(term)),
+                          key=len)[:self.MAX_TRIGRAMS]
+        if within is not None:
+            postings.insert(0, within)
+        candidates = postings[0].intersection(*postings[1:])
+        if len(term) == 3:
+            # Satu trigram: posting set sudah tepat, tidak perlu verifikasi
+            return candidates
+        return {medicine_id for medicine_id in candidates if term in self._texts[medicine_id]}
+
+    def _index(self, medicine):
+        medicine_id = medicine.id
+        words = TOKEN_RE.findall(" ".join(fold(str(getattr(medicine, field) or "")) for field in self.FIELDS))
+        # Teks disimpan sebagai " kata kata ..." agar awal kata = " " + term
+        text = " " + " ".join(words)
+        self._texts[medicine_id] = text
+        for gram in trigrams(text):
+            self._trigrams.setdefault(gram, set()).add(medicine_id)
+        tokens = set(words)
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(medicine_id)
+        return tokens
@@ -0,0 +1,659 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+from codec import dumps, loads, paused_gc
+from records import SchemaError, decode_medicine, decode_medicines
+
+
+class MedicineStorage:
+    """Base interface for medicine storage backends"""
+
+    def load_all(self):
+        """Return all medicine records in display order"""
+        raise NotImplementedError
+
+    def save_all(self, medicines):
+        """Replace the stored inventory with the given records"""
+        raise NotImplementedError
+
+    def upsert(self, medicine):
+        """Insert or update a single medicine record"""
+        raise NotImplementedError
+
+    def delete(self, medicine_id):
+        """Delete a single medicine record by ID"""
+        raise NotImplementedError
+
+    def write_batch(self, upserts, deletes, next_id=None):
+        """Apply several changes at once (backends may use one transaction)"""
+        for medicine in upserts:
+            self.upsert(medicine)
+        for medicine_id in deletes:
+            self.delete(medicine_id)
+        if next_id is not None:
+            self.save_next_id(next_id)
+
+    def load_next_id(self):
+        """Return the persisted next-ID counter, or None if unknown"""
+        return None
+
+    def save_next_id(self, next_id):
+        """Persist the next-ID counter"""
+        pass
+
+    def watch_paths(self):
+        """Files another process may change behind our back"""
+        return []
+
+    def changed_externally(self):
+        """True if another process changed the data since our last load or write"""
+        return False
+
+    def close(self):
+        pass
+
+
+class MemoryStorage(MedicineStorage):
+    """Keeps medicines in memory only (benchmarks and dry runs)"""
+
+    path = ":memory:"
+
+    def __init__(self, medicines=None):
+        self._records = {med['id']: med for med in medicines or []}
+        self._next_id = None
+
+    def load_all(self):
+        return list(self._records.values())
+
+    def save_all(self, medicines):
+        self._records = {med['id']: med for med in medicines}
+
+    def upsert(self, medicine):
+        self._records[medicine['id']] = medicine
+
+    def delete(self, medicine_id):
+        self._records.pop(medicine_id, None)
+
+    def load_next_id(self):
+        return self._next_id
+
+    def save_next_id(self, next_id):
+        self._next_id = next_id
+
+
+class JsonStorage(MedicineStorage):
+    """Stores the inventory as a JSON snapshot plus an append-only journal.
+
+    Every mutation appends one line to the journal and fsyncs it, so a
+    save costs O(1) and survives a crash. Once the journal grows past
+    `compact_every` entries (and on close) a new snapshot is written
+    through a temp file + rename and the journal is cleared. Loading
+    replays the journal on top of the snapshot; journal entries are
+    idempotent, so a crash between the rename and the truncation is safe.
+    The journal starts with the checksum of the snapshot it builds on; when
+    another process has rewritten the snapshot since, the journal is
+    dropped instead of replaying older local edits over the new data.
+    """
+
+    def __init__(self, path, compact_every=200, pretty=False):
+        self.path = path
+        self.pretty = pretty  # snapshot berindentasi untuk dibaca manusia
+        self.meta_path = os.path.splitext(path)[0] + ".meta.json"
+        self.journal_path = os.path.splitext(path)[0] + ".journal"
+        self.compact_every = compact_every
+        self._records = {}
+        self._next_id = None
+        self._journal = None
+        self._journal_entries = 0
+        self._own_stamp = None  # stat snapshot terakhir yang kita baca/tulis
+        self._snapshot_crc = None  # checksum isi snapshot yang jadi dasar journal
+
+    def load_all(self):
+        self._records = {}
+        self._next_id = None
+        # Diambil sebelum membaca: tulisan lain selama membaca tetap terdeteksi
+        self._own_stamp = self._stamp()
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'rb') as f:
+                self._next_id = loads(f.read()).get('next_id')
+
+        self._snapshot_crc = None
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f, paused_gc():
+                raw = f.read()
+                self._snapshot_crc = zlib.crc32(raw)
+                records, rejected = decode_medicines(loads(raw), self.path)
+            quarantine_records(self.path, rejected)
+            assign_missing_ids(records)
+            for med in records:
+                self._records[med['id']] = med
+        else:
+            print(f"Data file not found: {self.path}")
+
+        self._journal_entries, damaged = self._replay_journal()
+        if self._journal_entries:
+            print(f"Replayed {self._journal_entries} journal entries from {self.journal_path}")
+        if damaged:
+            # Jangan menambah entri setelah baris yang terpotong
+            self.compact()
+        return list(self._records.values())
+
+    def save_all(self, medicines):
+        self._records = {med['id']: med for med in medicines}
+        self.compact()
+
+    def upsert(self, medicine):
+        self._records[medicine['id']] = medicine
+        self._append({'op': 'upsert', 'medicine': medicine})
+
+    def delete(self, medicine_id):
+        self._records.pop(medicine_id, None)
+        self._append({'op': 'delete', 'id': medicine_id})
+
+    def write_batch(self, upserts, deletes, next_id=None):
+        entries = [{'op': 'upsert', 'medicine': medicine} for medicine in upserts]
+        entries += [{'op': 'delete', 'id': medicine_id} for medicine_id in deletes]
+        if next_id is not None:
+            entries.append({'op': 'next_id', 'value': next_id})
+            self._next_id = next_id
+        for medicine in upserts:
+            self._records[medicine['id']] = medicine
+        for medicine_id in deletes:
+            self._records.pop(medicine_id, None)
+        if self._journal_entries + len(entries) >= self.compact_every:
+            # Batch besar: langsung satu snapshot baru, bukan ribuan baris journal
+            self.compact()
+        else:
+            self._append(*entries)
+
+    def load_next_id(self):
+        return self._next_id
+
+    def save_next_id(self, next_id):
+        self._next_id = next_id
+        self._append({'op': 'next_id', 'value': next_id})
+
+    def watch_paths(self):
+        return [self.path]
+
+    def changed_externally(self):
+        return self._stamp() != self._own_stamp
+
+    def compact(self):
+        """Write a fresh snapshot atomically and clear the journal"""
+        data = dumps(list(self._records.values()), self.pretty)
+        atomic_write_bytes(self.path, data)
+        self._own_stamp = self._stamp()
+        self._snapshot_crc = zlib.crc32(data)
+        if self._next_id is not None:
+            atomic_write_json(self.meta_path, {'next_id': self._next_id})
+        self._discard_journal()
+
+    def close(self):
+        if self._journal_entries:
+            self.compact()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _append(self, *entries):
+        if not entries:
+            return
+        if self._journal is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+            self._journal = open(self.journal_path, 'ab')
+            if self._journal.tell() == 0:
+                # Journal baru: catat snapshot yang menjadi dasarnya
+                entries = ({'op': 'base', 'snapshot': self._snapshot_crc},) + entries
+        self._journal.write(b"".join(dumps(entry) + b"\n" for entry in entries))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal_entries += sum(entry['op'] != 'base' for entry in entries)
+        if self._journal_entries >= self.compact_every:
+            self.compact()
+
+    def _discard_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_entries = 0
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return 0, False
+        count = 0
+        damaged = stale = False
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = loads(line)
+                except ValueError:
+                    # Baris terakhir bisa terpotong jika crash saat menulis
+                    print(f"Skipping incomplete journal entry in {self.journal_path}")
+                    damaged = True
+                    continue
+                op = entry.get('op')
+                if op == 'base':
+                    # Snapshot ditulis ulang proses lain setelah journal ini
+                    # dimulai: isi snapshot yang berlaku, bukan edit lama kita
+                    stale = entry.get('snapshot') != self._snapshot_crc
+                    if stale:
+                        break
+                    continue
+                if op == 'upsert':
+                    try:
+                        medicine = decode_medicine(entry['medicine'])
+                    except SchemaError as e:
+                        print(f"Skipping invalid medicine in {self.journal_path}: {e}")
+                        quarantine_records(self.path, [entry['medicine']])
+                        continue
+                    self._records[medicine['id']] = medicine
+                elif op == 'delete':
+                    self._records.pop(entry['id'], None)
+                elif op == 'next_id':
+                    self._next_id = entry['value']
+                count += 1
+        if stale:
+            print(f"Dropping journal {self.journal_path}: data file was replaced")
+            self._discard_journal()
+            return 0, False
+        return count, damaged
+
+
+class SqliteStorage(MedicineStorage):
+    """Stores medicines as indexed rows in a SQLite database (WAL mode)"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS medicines (
+            id INTEGER PRIMARY KEY,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL DEFAULT '',
+            dose TEXT NOT NULL DEFAULT '',
+            stock INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS medicine_times (
+            medicine_id INTEGER NOT NULL REFERENCES medicines(id) ON DELETE CASCADE,
+            time TEXT NOT NULL,
+            PRIMARY KEY (medicine_id, time)
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_medicines_name ON medicines(name);
+        CREATE INDEX IF NOT EXISTS idx_medicines_position ON medicines(position);
+        CREATE INDEX IF NOT EXISTS idx_medicine_times_time ON medicine_times(time);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Boleh dipakai dari thread penulis WriteBehindStorage (akses tetap serial)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(self.SCHEMA)
+        self._data_version = None
+
+    def load_all(self):
+        # data_version hanya berubah oleh commit dari koneksi lain; dibaca
+        # sebelum SELECT agar commit di tengah pembacaan tetap terdeteksi
+        self._data_version = self._read_data_version()
+        rows = self.conn.execute("SELECT data FROM medicines ORDER BY position, id")
+        with paused_gc():
+            records, rejected = decode_medicines([loads(data) for (data,) in rows], self.path)
+        quarantine_records(self.path, rejected)
+        return records
+
+    def watch_paths(self):
+        return [self.path, self.path + "-wal"]
+
+    def changed_externally(self):
+        return self._read_data_version() != self._data_version
+
+    def _read_data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def save_all(self, medicines):
+        with self.conn:
+            self.conn.execute("DELETE FROM medicine_times")
+            self.conn.execute("DELETE FROM medicines")
+            for position, med in enumerate(medicines, start=1):
+                self._write_row(med, position)
+
+    def upsert(self, medicine):
+        with self.conn:
+            row = self.conn.execute(
+                "SELECT position FROM medicines WHERE id = ?", (medicine['id'],)
+            ).fetchone()
+            if row:
+                position = row[0]
+            else:
+                (position,) = self.conn.execute(
+                    "SELECT COALESCE(MAX(position), 0) + 1 FROM medicines"
+                ).fetchone()
+            self._write_row(medicine, position)
+
+    def delete(self, medicine_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM medicines WHERE id = ?", (medicine_id,))
+
+    def write_batch(self, upserts, deletes, next_id=None):
+        with self.conn:
+            (position,) = self.conn.execute(
+                "SELECT COALESCE(MAX(position), 0) FROM medicines"
+            ).fetchone()
+            for medicine in upserts:
+                row = self.conn.execute(
+                    "SELECT position FROM medicines WHERE id = ?", (medicine['id'],)
+                ).fetchone()
+                if row is None:
+                    position += 1
+                self._write_row(medicine, row[0] if row else position)
+            self.conn.executemany(
+                "DELETE FROM medicines WHERE id = ?", [(medicine_id,) for medicine_id in deletes]
+            )
+            if next_id is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)", (str(next_id),)
+                )
+
+    def load_next_id(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+        return int(row[0]) if row else None
+
+    def save_next_id(self, next_id):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)", (str(next_id),)
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def _write_row(self, med, position):
+        self.conn.execute(
+            """
+            INSERT INTO medicines (id, position, name, dose, stock, data)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                position = excluded.position,
+                name = excluded.name,
+                dose = excluded.dose,
+                stock = excluded.stock,
+                data = excluded.data
+            """,
+            (
+                med['id'],
+                position,
+                med.get('name', ''),
+                med.get('dose', ''),
+                med.get('stock', 0),
+                dumps(med).decode('utf-8'),
+            ),
+        )
+        self.conn.execute("DELETE FROM medicine_times WHERE medicine_id = ?", (med['id'],))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO medicine_times (medicine_id, time) VALUES (?, ?)",
+            [(med['id'], t) for t in med.get('times', [])],
+        )
+
+
+class WriteBehindStorage(MedicineStorage):
+    """Queues writes and applies them to another backend on a worker thread.
+
+    Changes are coalesced per medicine ID: a burst of edits within
+    `window` seconds becomes one batch write. Records are shallow-copied
+    when queued; MedicineManager hands over fresh to_dict() snapshots, so
+    nothing the GUI thread holds is shared with the worker. Call flush()
+    to wait for everything queued so far to reach disk; close() flushes
+    and stops the worker.
+    """
+
+    def __init__(self, inner, window=0.5):
+        self.inner = inner
+        self.path = inner.path
+        self.window = window
+        self._cond = threading.Condition()
+        self._pending = {}       # medicine_id -> copy of record, or None for delete
+        self._full = None        # daftar lengkap dari save_all
+        self._next_id = None
+        self._dirty_since = None
+        self._writing = False
+        self._closed = False
+        self._stats = {'writes': 0, 'records_written': 0, 'coalesced': 0,
+                       'errors': 0, 'last_latency': 0.0, 'max_latency': 0.0, 'total_latency': 0.0}
+        self._worker = threading.Thread(target=self._run, name="medimate-writer", daemon=True)
+        self._worker.start()
+
+    def load_all(self):
+        return self.inner.load_all()
+
+    def load_next_id(self):
+        return self.inner.load_next_id()
+
+    def watch_paths(self):
+        return self.inner.watch_paths()
+
+    def changed_externally(self):
+        return self.inner.changed_externally()
+
+    def save_all(self, medicines):
+        with self._cond:
+            self._full = [dict(medicine) for medicine in medicines]
+            self._pending.clear()
+            self._mark_dirty()
+
+    def upsert(self, medicine):
+        self._queue(medicine['id'], dict(medicine))
+
+    def delete(self, medicine_id):
+        self._queue(medicine_id, None)
+
+    def write_batch(self, upserts, deletes, next_id=None):
+        with self._cond:
+            for medicine in upserts:
+                self._queue(medicine['id'], dict(medicine))
+            for medicine_id in deletes:
+                self._queue(medicine_id, None)
+            if next_id is not None:
+                self.save_next_id(next_id)
+
+    def save_next_id(self, next_id):
+        with self._cond:
+            self._next_id = next_id
+            self._mark_dirty()
+
+    def flush(self, timeout=None):
+        """Block until every queued change has been written"""
+        with self._cond:
+            if self._has_pending():
+                self._dirty_since = 0  # tulis sekarang, jangan tunggu window
+                self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._has_pending() and not self._writing, timeout)
+
+    def metrics(self):
+        """Queue depth and write latency statistics (latency in seconds)"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['queue_depth'] = len(self._pending) + (len(self._full) if self._full is not None else 0)
+            stats['avg_latency'] = stats['total_latency'] / stats['writes'] if stats['writes'] else 0.0
+            return stats
+
+    def close(self, timeout=10):
+        if not self.flush(timeout):
+            print(f"Background writer did not finish within {timeout}s")
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join()
+        self.inner.close()
+
+    def _queue(self, medicine_id, medicine):
+        with self._cond:
+            if medicine_id in self._pending:
+                self._stats['coalesced'] += 1
+            self._pending[medicine_id] = medicine
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+        self._cond.notify_all()
+
+    def _has_pending(self):
+        return bool(self._pending) or self._full is not None or self._next_id is not None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not self._has_pending():
+                        return
+                    if self._has_pending():
+                        remaining = self._dirty_since + self.window - time.monotonic()
+                        if remaining <= 0 or self._closed:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                full, pending, next_id = self._full, self._pending, self._next_id
+                self._full, self._pending, self._next_id = None, {}, None
+                self._dirty_since = None
+                self._writing = True
+
+            start = time.perf_counter()
+            try:
+                if full is not None:
+                    self.inner.save_all(full)
+                upserts = [medicine for medicine in pending.values() if medicine is not None]
+                deletes = [medicine_id for medicine_id, medicine in pending.items() if medicine is None]
+                self.inner.write_batch(upserts, deletes, next_id)
+                failed = False
+            except Exception as e:
+                print(f"Error writing medicines in background: {e}")
+                failed = True
+            latency = time.perf_counter() - start
+
+            with self._cond:
+                if failed:
+                    # Kembalikan ke antrian kecuali sudah ada perubahan yang lebih baru
+                    self._stats['errors'] += 1
+                    if full is not None and self._full is None:
+                        self._full = full
+                    for medicine_id, medicine in pending.items():
+                        self._pending.setdefault(medicine_id, medicine)
+                    if next_id is not None and self._next_id is None:
+                        self._next_id = next_id
+                    self._dirty_since = time.monotonic()
+                else:
+                    self._stats['writes'] += 1
+                    self._stats['records_written'] += len(pending) + (len(full) if full else 0)
+                    self._stats['last_latency'] = latency
+                    self._stats['max_latency'] = max(self._stats['max_latency'], latency)
+                    self._stats['total_latency'] += latency
+                self._writing = False
+                self._cond.notify_all()
+                if failed and self._closed:
+                    print(f"Discarding {len(self._pending)} unwritten changes on close")
+                    return
+            if failed:
+                time.sleep(min(self.window, 1.0) or 0.1)
+
+
+def atomic_write_json(path, data, pretty=False):
+    """Write JSON through a temp file + rename so readers never see a partial file"""
+    atomic_write_bytes(path, dumps(data, pretty))
+
+
+def atomic_write_bytes(path, data):
+    """Write bytes through a temp file + rename (fsynced, like atomic_write_json)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    # fsync direktori agar rename ikut tersimpan (tidak didukung di Windows)
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def quarantine_records(data_path, rejected):
+    """Keep records that failed validation next to the data file instead of losing them"""
+    if not rejected:
+        return
+    path = os.path.splitext(data_path)[0] + ".rejected.jsonl"
+    with open(path, 'ab') as f:
+        f.write(b"".join(dumps(raw) + b"\n" for raw in rejected))
+    print(f"Moved {len(rejected)} invalid medicines to {path}")
+
+
+def assign_missing_ids(medicines):
+    """Give records without an ID a new unique ID"""
+    next_id = max((med['id'] for med in medicines if 'id' in med), default=0) + 1
+    for med in medicines:
+        if 'id' not in med:
+            med['id'] = next_id
+            next_id += 1
+
+
+def open_storage(kind, data_dir):
+    """Create a storage backend by name ('json' or 'sqlite')"""
+    if kind == 'sqlite':
+        return SqliteStorage(os.path.join(data_dir, "medicines.db"))
+    # MEDIMATE_JSON_FORMAT=pretty menulis snapshot berindentasi
+    return JsonStorage(os.path.join(data_dir, "medicines.json"),
+                       pretty=os.environ.get("MEDIMATE_JSON_FORMAT") == "pretty")
+
+
+def migrate_json_to_sqlite(json_path, db_path):
+    """Import an existing medicines.json file into a SQLite database"""
+    # JsonStorage sudah memberi ID pada obat lama agar bisa jadi primary key
+    source = JsonStorage(json_path)
+    medicines = source.load_all()
+    # next_id ikut dipindah agar ID obat yang sudah dihapus tidak dipakai ulang
+    next_id = source.load_next_id()
+    storage = SqliteStorage(db_path)
+    try:
+        storage.save_all(medicines)
+        if next_id is not None:
+            storage.save_next_id(next_id)
+    finally:
+        storage.close()
+    return len(medicines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python storage.py <medicines.json> <medicines.db>")
+        sys.exit(1)
+    count = migrate_json_to_sqlite(sys.argv[1], sys.argv[2])
+    print(f"Migrated {count} medicines from {sys.argv[1]} to {sys.argv[2]}")
@@ -0,0 +1,126 @@
+from datetime import date, timedelta
+import random
+
+import pytest
+
+import adherence
+from adherence import LATE, MISSED, ON_TIME, DoseEvents, combine, day_events, summarize
+
+DAY = date(2026, 10, 1)
+
+
+def make_events(rows):
+    """rows: (day offset, medicine_id, minute, delay, outcome)"""
+    events = DoseEvents()
+    for offset, medicine_id, minute, delay, outcome in rows:
+        events.append((DAY + timedelta(days=offset)).toordinal(), medicine_id, minute, delay, outcome)
+    return events
+
+
+@pytest.fixture(params=["numpy", "rows"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if adherence.np is None:
+            pytest.skip("NumPy tidak terpasang")
+    else:
+        monkeypatch.setattr(adherence, "np", None)
+    return request.param
+
+
+def test_counts_rates_and_delay(backend):
+    events = make_events([
+        (0, 1, 480, 5, ON_TIME),
+        (0, 2, 480, 90, LATE),
+        (1, 1, 480, -10, ON_TIME),   # lebih awal dihitung 0 menit
+        (1, 2, 480, 0, MISSED),
+    ])
+    stats = summarize(events.medicine_id, events)
+    assert stats[1]['scheduled'] == 2
+    assert stats[1]['adherence'] == 1.0
+    assert stats[1]['avg_delay'] == 2.5
+    assert stats[2]['on_time'] == 0 and stats[2]['late'] == 1 and stats[2]['missed'] == 1
+    assert stats[2]['adherence'] == 0.5
+    assert stats[2]['on_time_rate'] == 0.0
+    assert stats[2]['avg_delay'] == 90
+
+
+def test_missed_streaks_per_group(backend):
+    # Obat 1: M M T M M M  -> terpanjang 3, berjalan 3
+    # Obat 2: M T T T M T  -> terpanjang 1, berjalan 0 (selang-seling dengan obat 1)
+    outcomes = {1: "MMTMMM", 2: "MTTTMT"}
+    rows = [(offset, medicine_id, 480, 0, MISSED if outcomes[medicine_id][offset] == "M" else ON_TIME)
+            for offset in range(6) for medicine_id in (1, 2)]
+    stats = summarize(make_events(rows).medicine_id, make_events(rows))
+    assert (stats[1]['longest_missed_streak'], stats[1]['current_missed_streak']) == (3, 3)
+    assert (stats[2]['longest_missed_streak'], stats[2]['current_missed_streak']) == (1, 0)
+
+
+def test_empty_events():
+    assert summarize([], DoseEvents()) == {}
+
+
+def test_numpy_matches_row_fallback(monkeypatch):
+    if adherence.np is None:
+        pytest.skip("NumPy tidak terpasang")
+    rng = random.Random(4)
+    rows = [(offset, rng.randrange(1, 8), minute, rng.randrange(-30, 240),
+             rng.choice((ON_TIME, ON_TIME, LATE, MISSED)))
+            for offset in range(60) for minute in (480, 780, 1200)]
+    events = make_events(rows)
+    vectorized = summarize(events.medicine_id, events)
+    monkeypatch.setattr(adherence, "np", None)
+    fallback = summarize(events.medicine_id, events)
+    assert set(fallback) == set(vectorized) == set(range(1, 8))
+    for medicine_id, stats in vectorized.items():
+        assert fallback[medicine_id] == pytest.approx(stats)
+
+
+def test_day_events_classifies_by_delay():
+    taken = {(1, "08:00"): "2026-10-01T08:20:00", (2, "08:00"): "2026-10-01T10:30:00"}
+    events = day_events(DAY, [(480, 1), (480, 2), (480, 3)], taken, on_time_minutes=60)
+    assert list(events.outcome) == [ON_TIME, LATE, MISSED]
+    assert list(events.delay) == [20, 150, 0]
+
+
+def test_combine_totals_rows():
+    events = make_events([(0, 1, 480, 10, ON_TIME), (0, 2, 480, 0, MISSED), (1, 2, 480, 0, MISSED)])
+    total = combine(list(summarize(events.medicine_id, events).values()))
+    assert total['scheduled'] == 3 and total['taken'] == 1
+    assert total['avg_delay'] == 10
+    assert total['longest_missed_streak'] == 2
+
+
+@pytest.mark.parametrize("value, minutes", [(None, 60), ("30", 30), (" 45 ", 45), ("0", 0),
+                                            ("satu jam", 60), ("", 60), ("-5", 60), ("1.5", 60)])
+def test_on_time_from_env_falls_back_on_bad_values(monkeypatch, value, minutes):
+    if value is None:
+        monkeypatch.delenv("MEDIMATE_ON_TIME_MINUTES", raising=False)
+    else:
+        monkeypatch.setenv("MEDIMATE_ON_TIME_MINUTES", value)
+    assert adherence.on_time_from_env() == minutes
+
+
+def test_close_days_records_each_day_once_across_threads(tmp_path):
+    import threading
+    from patients import PatientRegistry
+
+    registry = PatientRegistry(str(tmp_path))
+    today = date.today()
+    for name in ("Ani", "Budi", "Citra"):
+        patient_id = registry.add_patient(name)['id']
+        manager = registry.manager(patient_id)
+        manager.add_medicine({'name': "Obat", 'dose': "1 tablet", 'stock': 30, 'times': ["08:00", "20:00"]})
+        # Susulan dimulai dari partisi riwayat tertua (hari ini)
+        manager.take_dose(manager.medicines[0], "08:00")
+    registry.flush()
+    later = today + timedelta(days=5)
+    threads = [threading.Thread(target=registry.close_days, args=(later,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rows = registry.adherence(today, later - timedelta(days=1))
+    # Hari ini s.d. 4 hari lagi, dua dosis per hari, tanpa duplikat
+    assert sorted(row['patient_name'] for row in rows) == ["Ani", "Budi", "Citra"]
+    assert all((row['scheduled'], row['taken']) == (10, 1) for row in rows)
+    registry.close()
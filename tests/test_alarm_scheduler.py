@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+from alarm_scheduler import AlarmScheduler
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(clock, times, taken=()):
+    fired = []
+    armed = []
+    schedule = lambda: [{'time': t, 'dose_key': f"1:1@{t}",
+                         'status': "Sudah Diminum" if t in taken else "Belum Diminum"}
+                        for t in times]
+    scheduler = AlarmScheduler(schedule, fired.append, armed.append, clock=clock)
+    scheduler.start()
+    return scheduler, fired, armed
+
+
+def test_arms_timer_to_next_dose():
+    clock = FakeClock(datetime(2026, 10, 16, 7, 58))
+    scheduler, fired, armed = make_scheduler(clock, ["08:00", "12:00"])
+    assert armed[-1] == 120
+    assert scheduler.next_due() == datetime(2026, 10, 16, 8, 0)
+    assert fired == []
+
+
+def test_sleep_is_capped():
+    clock = FakeClock(datetime(2026, 10, 16, 6, 0))
+    _, _, armed = make_scheduler(clock, ["12:00"])
+    assert armed[-1] == AlarmScheduler.MAX_SLEEP
+
+
+def test_catch_up_fires_every_missed_dose_once_in_order():
+    clock = FakeClock(datetime(2026, 10, 16, 7, 0))
+    scheduler, fired, _ = make_scheduler(clock, ["08:00", "09:00", "10:00", "12:00"])
+    # Event loop macet / suspend: satu wake setelah beberapa dosis lewat
+    clock.now = datetime(2026, 10, 16, 10, 30)
+    scheduler.wake()
+    assert [item['time'] for item in fired] == ["08:00", "09:00", "10:00"]
+    scheduler.wake()
+    assert len(fired) == 3
+    assert scheduler.next_due() == datetime(2026, 10, 16, 12, 0)
+
+
+def test_reschedule_does_not_refire_past_doses():
+    clock = FakeClock(datetime(2026, 10, 16, 7, 0))
+    scheduler, fired, _ = make_scheduler(clock, ["08:00", "12:00"])
+    clock.now = datetime(2026, 10, 16, 8, 30)
+    scheduler.wake()
+    scheduler.reschedule()
+    scheduler.wake()
+    assert [item['time'] for item in fired] == ["08:00"]
+
+
+def test_taken_doses_are_not_fired():
+    clock = FakeClock(datetime(2026, 10, 16, 7, 0))
+    scheduler, fired, _ = make_scheduler(clock, ["08:00", "09:00"], taken={"08:00"})
+    clock.now = datetime(2026, 10, 16, 9, 0)
+    scheduler.wake()
+    assert [item['time'] for item in fired] == ["09:00"]
+
+
+def test_dose_in_current_minute_still_fires():
+    clock = FakeClock(datetime(2026, 10, 16, 8, 0, 30))
+    scheduler, fired, armed = make_scheduler(clock, ["08:00"])
+    assert armed[-1] == 0
+    scheduler.wake()
+    assert [item['time'] for item in fired] == ["08:00"]
+
+
+def test_rollover_fires_yesterdays_dose_then_rebuilds_for_today():
+    clock = FakeClock(datetime(2026, 10, 16, 23, 50))
+    scheduler, fired, armed = make_scheduler(clock, ["00:01", "08:00", "23:55"])
+    assert armed[-1] == 300
+    # Tidur melewati tengah malam
+    clock.now = datetime(2026, 10, 17, 0, 5)
+    scheduler.wake()
+    assert [(item['date'], item['time']) for item in fired] == [
+        ("2026-10-16", "23:55"), ("2026-10-17", "00:01")]
+    assert scheduler.next_due() == datetime(2026, 10, 17, 8, 0)
+
+
+def test_timer_wakes_at_midnight_without_doses():
+    clock = FakeClock(datetime(2026, 10, 16, 23, 58))
+    scheduler, fired, armed = make_scheduler(clock, ["08:00"])
+    assert armed[-1] == 120
+    clock.now += timedelta(seconds=120)
+    scheduler.wake()
+    assert fired == []
+    assert scheduler.next_due() == datetime(2026, 10, 17, 8, 0)
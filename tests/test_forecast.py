@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+import math
+
+import pytest
+
+import forecast
+from medicine_manager import MedicineManager
+from storage import MemoryStorage
+
+TODAY = date.today()
+
+
+@pytest.fixture(params=["numpy", "lists"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if forecast.np is None:
+            pytest.skip("NumPy tidak terpasang")
+    else:
+        monkeypatch.setattr(forecast, "np", None)
+    return request.param
+
+
+def tapered(stock, start=TODAY):
+    return MedicineManager(MemoryStorage([{
+        'id': 1, 'name': "Prednison", 'dose': "1 tablet", 'stock': stock, 'times': ["08:00"],
+        'recurrence': {'freq': 'daily', 'start': start.isoformat(),
+                       'taper': [[3, "2 tablet"], [3, "1 tablet"]]},
+    }]))
+
+
+@pytest.mark.parametrize("stock, start, days", [
+    (4, TODAY, 2),                          # habis di langkah pertama (2 tablet/hari)
+    (7, TODAY, 4),                          # 6 di langkah pertama, 1 di langkah kedua
+    (2, TODAY - timedelta(days=3), 2),      # sudah di langkah kedua
+    (4, TODAY + timedelta(days=2), 4),      # kursus baru mulai lusa
+])
+def test_days_until_empty_follows_taper_steps(backend, stock, start, days):
+    assert tapered(stock, start).days_until_empty(1) == pytest.approx(days)
+
+
+def test_stock_that_outlasts_the_course_never_runs_out(backend):
+    assert math.isinf(tapered(10).days_until_empty(1))
+
+
+def test_taking_a_dose_uses_the_step_dose():
+    manager = tapered(10)
+    manager.take_doses([(manager.get_medicine_by_id(1), "08:00")])
+    assert manager.get_medicine_by_id(1).stock == 8
+    manager = tapered(10, TODAY - timedelta(days=3))
+    manager.take_doses([(manager.get_medicine_by_id(1), "08:00")])
+    assert manager.get_medicine_by_id(1).stock == 9
+
+
+@pytest.mark.parametrize("value, days", [(None, 5.0), ("7", 7.0), ("2.5", 2.5), ("0", 0.0),
+                                         ("lima", 5.0), ("", 5.0), ("-3", 5.0), ("nan", 5.0), ("inf", 5.0)])
+def test_horizon_from_env_falls_back_on_bad_values(monkeypatch, value, days):
+    if value is None:
+        monkeypatch.delenv("MEDIMATE_LOW_STOCK_DAYS", raising=False)
+    else:
+        monkeypatch.setenv("MEDIMATE_LOW_STOCK_DAYS", value)
+    assert forecast.horizon_from_env() == days
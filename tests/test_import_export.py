@@ -0,0 +1,98 @@
+import io
+import json
+
+import pytest
+
+from import_export import export_medicines, import_medicines, iter_json_rows
+from medicine_manager import MedicineManager
+from storage import MemoryStorage
+
+ITEMS = [{'name': f"Obat {i}", 'dose': "1 tablet", 'stock': i, 'times': ["08:00"],
+          'notes': "kata \"kutip\" dan {kurung}"} for i in range(20)]
+
+
+def manager():
+    return MedicineManager(MemoryStorage())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+def test_json_array_split_across_chunks(chunk_size):
+    text = json.dumps(ITEMS, indent=2)
+    rows = list(iter_json_rows(io.StringIO(text), chunk_size=chunk_size))
+    assert rows == list(enumerate(ITEMS, start=1))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64])
+def test_json_lines_split_across_chunks(chunk_size):
+    text = "\n".join(json.dumps(item) for item in ITEMS) + "\n"
+    rows = list(iter_json_rows(io.StringIO(text), chunk_size=chunk_size))
+    assert rows == list(enumerate(ITEMS, start=1))
+
+
+def test_malformed_trailing_object_fails_the_whole_import(tmp_path):
+    path = tmp_path / "obat.jsonl"
+    path.write_text(json.dumps(ITEMS[0]) + "\n" + '{"name": "Rusak", "stock": ', encoding='utf-8')
+    target = manager()
+    with pytest.raises(ValueError):
+        import_medicines(target, str(path), chunk_size=1)
+    assert target.get_medicines_count() == 0
+
+
+def test_csv_with_bom_mixed_case_headers_and_semicolon_times(tmp_path):
+    path = tmp_path / "obat.csv"
+    path.write_bytes("\ufeffName,DOSE,Stock,Times\nParasetamol,500 mg,20,08:00; 20:00\n".encode('utf-8'))
+    target = manager()
+    report = import_medicines(target, str(path))
+    assert (report.added, report.errors) == (1, [])
+    medicine = target.medicines[0]
+    assert (medicine.name, medicine.dose, medicine.stock) == ("Parasetamol", "500 mg", 20)
+    assert medicine.times == ["08:00", "20:00"]
+
+
+def test_invalid_csv_rows_are_reported_by_line(tmp_path):
+    path = tmp_path / "obat.csv"
+    path.write_text("name,dose,stock,times\n"
+                    "A,1 tablet,5,08:00\n"
+                    ",1 tablet,5,08:00\n"
+                    "B,1 tablet,banyak,08:00\n"
+                    "C,1 tablet,5,25:00\n"
+                    "D,1 tablet,5,7:5\n", encoding='utf-8')
+    target = manager()
+    report = import_medicines(target, str(path), chunk_size=2)
+    assert [error.row for error in report.errors] == [3, 4, 5]
+    assert report.added == 2
+    assert [med.name for med in target.medicines] == ["A", "D"]
+    assert target.medicines[1].times == ["07:05"]
+
+
+def test_invalid_json_items_are_reported_by_item_number(tmp_path):
+    path = tmp_path / "obat.json"
+    path.write_text(json.dumps(ITEMS[:3] + [{'dose': "1"}, 3] + ITEMS[3:5]), encoding='utf-8')
+    target = manager()
+    report = import_medicines(target, str(path), chunk_size=2)
+    assert [error.row for error in report.errors] == [4, 5]
+    assert report.added == 5
+    assert report.saved
+
+
+@pytest.mark.parametrize("name", ["obat.csv", "obat.json", "obat.jsonl"])
+def test_export_import_round_trip(tmp_path, name):
+    source = manager()
+    source.bulk_add([dict(ITEMS[0]), {'name': "Mingguan", 'dose': "2 tablet", 'stock': 4,
+                                      'times': ["07:00", "19:00"], 'priority': "Tinggi",
+                                      'recurrence': {'freq': 'weekly', 'byday': ["MO", "FR"],
+                                                     'start': "2026-10-19"}}])
+    path = str(tmp_path / name)
+    export_medicines(source.medicines, path)
+    if name.endswith(".jsonl"):
+        with open(path, encoding='utf-8') as f:
+            assert len(f.read().splitlines()) == 2
+    target = manager()
+    report = import_medicines(target, path)
+    assert (report.added, report.errors) == (2, [])
+    for before, after in zip(source.medicines, target.medicines):
+        before, after = before.to_dict(), after.to_dict()
+        for key in ('id', 'created_at'):
+            before.pop(key)
+            after.pop(key)
+        assert after == before
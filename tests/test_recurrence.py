@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+from recurrence import Recurrence
+
+START = date(2026, 10, 19)  # Senin
+MORNING, EVENING = 8 * 60, 20 * 60
+
+
+def doses(rule, day, minutes=(MORNING, EVENING), dose="1 tablet"):
+    return Recurrence.from_dict(rule).doses_on(day, minutes, dose)
+
+
+def test_count_ends_mid_day():
+    rule = {'freq': 'daily', 'start': START.isoformat(), 'count': 5}
+    assert doses(rule, START) == ((MORNING, EVENING), "1 tablet")
+    assert doses(rule, START + timedelta(days=1)) == ((MORNING, EVENING), "1 tablet")
+    # Dosis ke-5 jatuh pagi hari ketiga
+    assert doses(rule, START + timedelta(days=2)) == ((MORNING,), "1 tablet")
+    assert doses(rule, START + timedelta(days=3))[0] == ()
+
+
+def test_count_on_weekly_rule_counts_only_scheduled_days():
+    rule = {'freq': 'weekly', 'byday': ['MO', 'TH'], 'start': START.isoformat(), 'count': 3}
+    taken_days = [day for day in (START + timedelta(days=n) for n in range(21))
+                  if doses(rule, day, (MORNING,))[0]]
+    assert taken_days == [START, START + timedelta(days=3), START + timedelta(days=7)]
+
+
+def test_count_with_every_other_day_interval():
+    rule = {'freq': 'daily', 'interval': 2, 'start': START.isoformat(), 'count': 2}
+    assert doses(rule, START, (MORNING,))[0] == (MORNING,)
+    assert doses(rule, START + timedelta(days=1), (MORNING,))[0] == ()
+    assert doses(rule, START + timedelta(days=2), (MORNING,))[0] == (MORNING,)
+    assert doses(rule, START + timedelta(days=4), (MORNING,))[0] == ()
+
+
+def test_count_hourly_spans_days():
+    rule = {'freq': 'hourly', 'interval': 8, 'start': START.isoformat(), 'count': 4}
+    assert doses(rule, START, (MORNING,))[0] == (8 * 60, 16 * 60)
+    assert doses(rule, START + timedelta(days=1), (MORNING,))[0] == (0, 8 * 60)
+    assert doses(rule, START + timedelta(days=2), (MORNING,))[0] == ()
+
+
+def test_taper_switches_dose_per_step_then_ends():
+    rule = {'freq': 'daily', 'start': START.isoformat(),
+            'taper': [[3, "2 tablet"], [2, "1 tablet"], [1, "1/2 tablet"]]}
+    expected = ["2 tablet"] * 3 + ["1 tablet"] * 2 + ["1/2 tablet"]
+    for offset, dose in enumerate(expected):
+        assert doses(rule, START + timedelta(days=offset)) == ((MORNING, EVENING), dose)
+    assert doses(rule, START + timedelta(days=6))[0] == ()
+    assert Recurrence.from_dict(rule).end_day() == START + timedelta(days=5)
+
+
+def test_taper_before_start_has_no_doses():
+    rule = {'freq': 'daily', 'start': START.isoformat(), 'taper': [[2, "2 tablet"]]}
+    assert doses(rule, START - timedelta(days=1)) == ((), "1 tablet")
+
+
+def test_taper_with_count_stops_at_whichever_comes_first():
+    rule = {'freq': 'daily', 'start': START.isoformat(), 'count': 3,
+            'taper': [[2, "2 tablet"], [5, "1 tablet"]]}
+    assert doses(rule, START + timedelta(days=1), (MORNING,)) == ((MORNING,), "2 tablet")
+    assert doses(rule, START + timedelta(days=2), (MORNING,)) == ((MORNING,), "1 tablet")
+    assert doses(rule, START + timedelta(days=3), (MORNING,))[0] == ()
@@ -0,0 +1,45 @@
+from datetime import date, datetime, timedelta
+
+from dose_history import DoseHistory
+from medicine_manager import MedicineManager
+from storage import MemoryStorage
+
+TODAY = date.today()
+
+
+def make_manager(tmp_path, medicines):
+    return MedicineManager(MemoryStorage(medicines), history=DoseHistory(str(tmp_path)))
+
+
+def window(manager, day, days=1):
+    start = datetime.combine(day, datetime.min.time())
+    return [(d, item['time'], item['medicine'], item['status'])
+            for d, item in manager.get_schedule_window(start, start + timedelta(days=days))]
+
+
+def test_late_ack_of_past_day_updates_cached_window(tmp_path):
+    manager = make_manager(tmp_path, [{'id': 1, 'name': "A", 'dose': "1", 'stock': 5, 'times': ["08:00", "20:00"]}])
+    yesterday = TODAY - timedelta(days=1)
+    assert [status for *_, status in window(manager, yesterday)] == ["Belum Diminum"] * 2
+    manager.take_doses([(manager.get_medicine_by_id(1), "08:00")], day=yesterday)
+    assert [status for *_, status in window(manager, yesterday)] == ["Sudah Diminum", "Belum Diminum"]
+    # Status hari ini tidak ikut berubah
+    assert not manager.is_dose_taken(1, "08:00")
+
+
+def test_window_follows_rules_and_edits(tmp_path):
+    start = TODAY + timedelta(days=1)
+    manager = make_manager(tmp_path, [
+        {'id': 1, 'name': "A", 'dose': "1", 'stock': 5, 'times': ["08:00"]},
+        {'id': 2, 'name': "B", 'dose': "1", 'stock': 5, 'times': ["09:00"],
+         'recurrence': {'freq': 'daily', 'start': start.isoformat(), 'taper': [[1, "2 tablet"], [1, "1 tablet"]]}},
+    ])
+    assert window(manager, start, days=3) == [
+        (start, "08:00", "A - 1", "Belum Diminum"),
+        (start, "09:00", "B - 2 tablet", "Belum Diminum"),
+        (start + timedelta(days=1), "08:00", "A - 1", "Belum Diminum"),
+        (start + timedelta(days=1), "09:00", "B - 1 tablet", "Belum Diminum"),
+        (start + timedelta(days=2), "08:00", "A - 1", "Belum Diminum"),
+    ]
+    manager.edit_medicine(1, {'name': "A", 'dose': "2", 'stock': 5, 'times': ["07:00"]})
+    assert window(manager, start)[0] == (start, "07:00", "A - 2", "Belum Diminum")
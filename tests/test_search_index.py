@@ -0,0 +1,84 @@
+from medicine_manager import MedicineManager
+from search_index import SearchIndex, fold
+from storage import MemoryStorage
+
+MEDICINES = [
+    {'name': "Parasetamol", 'dose': "500 mg", 'stock': 10, 'times': ["08:00"], 'notes': "setelah makan"},
+    {'name': "Amoksisilin", 'dose': "250 mg", 'stock': 10, 'times': ["08:00"]},
+    {'name': "Vitamin C", 'dose': "1 tablet", 'stock': 10, 'times': ["08:00"], 'notes': "pagi"},
+    {'name': "Obat Batuk Hitam", 'dose': "1 sendok", 'stock': 10, 'times': ["20:00"]},
+    {'name': "Crème Analgésique", 'dose': "oles", 'stock': 10, 'times': ["20:00"]},
+]
+
+
+def manager():
+    target = MedicineManager(MemoryStorage())
+    target.bulk_add([dict(medicine) for medicine in MEDICINES])
+    return target
+
+
+def names(target, query):
+    ids = target.search(query)
+    return None if ids is None else sorted(target.get_medicine_by_id(mid).name for mid in ids)
+
+
+def test_fold_strips_accents_case_and_old_spelling():
+    assert fold("CRÈME Analgésique") == "creme analgesique"
+    assert fold("Djamoe Tjap") == "jamu cap"
+    assert fold("Phenol") == fold("fenol")
+    assert fold("Amoxicillin") == fold("amoksicillin")
+
+
+def test_search_ignores_accents_case_and_spelling():
+    target = manager()
+    assert names(target, "ANALGESIQUE") == ["Crème Analgésique"]
+    assert names(target, "crème") == ["Crème Analgésique"]
+    assert names(target, "amoxisilin") == ["Amoksisilin"]
+
+
+def test_prefix_and_infix_matches():
+    target = manager()
+    # Awal kata dan di tengah kata (trigram)
+    assert names(target, "parase") == ["Parasetamol"]
+    assert names(target, "setamol") == ["Parasetamol"]
+    assert names(target, "tuk") == ["Obat Batuk Hitam"]
+    # Semua term harus cocok; catatan dan dosis ikut dicari
+    assert names(target, "makan parasetamol") == ["Parasetamol"]
+    assert names(target, "mg") == ["Amoksisilin", "Parasetamol"]
+    assert names(target, "batuk pagi") == []
+
+
+def test_short_queries_match_word_starts_only():
+    target = manager()
+    assert names(target, "vi") == ["Vitamin C"]
+    assert names(target, "c") == ["Crème Analgésique", "Vitamin C"]
+    # "am" di tengah "Parasetamol" bukan awal kata
+    assert names(target, "am") == ["Amoksisilin"]
+    assert names(target, "  ") is None
+
+
+def test_index_follows_rename_and_delete():
+    target = manager()
+    medicine_id = target.search("parasetamol").pop()
+    target.edit_medicine(medicine_id, dict(MEDICINES[0], name="Ibuprofen"))
+    assert names(target, "parasetamol") == []
+    assert names(target, "para") == []
+    assert names(target, "ibup") == ["Ibuprofen"]
+    assert names(target, "makan") == ["Ibuprofen"]
+
+    target.delete_medicine(medicine_id)
+    assert names(target, "ibuprofen") == []
+    assert names(target, "makan") == []
+    assert names(target, "mg") == ["Amoksisilin"]
+
+
+def test_removing_last_holder_drops_token():
+    index = SearchIndex()
+    target = manager()
+    index.rebuild(target.medicines)
+    vitamin = target.get_medicine_by_id(target.search("vitamin").pop())
+    index.remove(vitamin.id)
+    assert index.search("vi") == set()
+    assert "vitamin" not in index._tokens
+    index.add(vitamin)
+    assert index.search("vi") == {vitamin.id}
@@ -0,0 +1,116 @@
+import json
+import os
+
+from codec import loads
+from medicine_manager import MedicineManager
+from storage import JsonStorage
+
+
+def medicine(medicine_id, name, stock=10):
+    return {'id': medicine_id, 'name': name, 'dose': "1 tablet", 'stock': stock, 'times': ["08:00"]}
+
+
+def reopen(path, **kwargs):
+    storage = JsonStorage(path, **kwargs)
+    return storage, {med['id']: med for med in storage.load_all()}
+
+
+def test_journal_is_replayed_on_top_of_snapshot(tmp_path):
+    path = str(tmp_path / "medicines.json")
+    storage, _ = reopen(path)
+    storage.save_all([medicine(1, "A"), medicine(2, "B")])
+    storage.upsert(medicine(1, "A", stock=7))
+    storage.delete(2)
+    storage.write_batch([medicine(3, "C")], [], next_id=5)
+    # Tanpa close(): journal belum dipadatkan, seperti setelah crash
+    storage, records = reopen(path)
+    assert sorted(records) == [1, 3]
+    assert records[1]['stock'] == 7
+    assert storage.load_next_id() == 5
+
+
+def test_truncated_last_journal_line_is_skipped(tmp_path):
+    path = str(tmp_path / "medicines.json")
+    storage, _ = reopen(path)
+    storage.save_all([medicine(1, "A")])
+    storage.upsert(medicine(2, "B"))
+    storage.upsert(medicine(3, "C"))
+    # Crash di tengah menulis baris terakhir
+    with open(storage.journal_path, 'rb+') as f:
+        f.truncate(os.path.getsize(storage.journal_path) - 10)
+    storage, records = reopen(path)
+    assert sorted(records) == [1, 2]
+    # Journal yang rusak langsung dipadatkan, jadi tulisan berikutnya aman
+    assert not os.path.exists(storage.journal_path)
+    storage.upsert(medicine(4, "D"))
+    _, records = reopen(path)
+    assert sorted(records) == [1, 2, 4]
+
+
+def test_compaction_writes_snapshot_and_clears_journal(tmp_path):
+    path = str(tmp_path / "medicines.json")
+    storage, _ = reopen(path, compact_every=5)
+    for medicine_id in range(1, 5):
+        storage.upsert(medicine(medicine_id, f"Obat {medicine_id}"))
+    assert os.path.exists(storage.journal_path)
+    storage.save_next_id(6)
+    # Entri ke-5 memicu compact: snapshot berisi semuanya, journal hilang
+    assert not os.path.exists(storage.journal_path)
+    with open(path, 'rb') as f:
+        assert sorted(med['id'] for med in loads(f.read())) == [1, 2, 3, 4]
+    storage, records = reopen(path)
+    assert sorted(records) == [1, 2, 3, 4]
+    assert storage.load_next_id() == 6
+
+
+def test_close_compacts_pending_journal(tmp_path):
+    path = str(tmp_path / "medicines.json")
+    storage, _ = reopen(path)
+    storage.upsert(medicine(1, "A"))
+    storage.close()
+    assert not os.path.exists(storage.journal_path)
+    _, records = reopen(path)
+    assert list(records) == [1]
+
+
+def rewrite_externally(path, records):
+    # Seperti job sync apotek: tulis file baru lalu rename
+    tmp = path + ".sync"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(records, f)
+    os.replace(tmp, path)
+
+
+def test_external_rewrite_wins_over_older_journal(tmp_path):
+    path = str(tmp_path / "medicines.json")
+    manager = MedicineManager(JsonStorage(path))
+    manager.add_medicine({'name': "A", 'dose': "1 tablet", 'stock': 10, 'times': ["08:00"]})
+    manager.storage.compact()
+    medicine = manager.get_medicine_by_id(1)
+    manager.take_dose(medicine, "08:00")
+    assert os.path.exists(manager.storage.journal_path)   # stok 9 ada di journal
+
+    rewrite_externally(path, [medicine.to_dict() | {'stock': 100}])
+    assert manager.sync_external() == (0, 1, 0)
+    assert manager.get_medicine_by_id(1).stock == 100
+    assert not os.path.exists(manager.storage.journal_path)
+    manager.storage.compact()
+    _, records = reopen(path)
+    assert records[1]['stock'] == 100
+    manager.close()
+
+
+def test_journal_of_replaced_snapshot_is_dropped_on_load(tmp_path):
+    path = str(tmp_path / "medicines.json")
+    storage, _ = reopen(path)
+    storage.save_all([medicine(1, "A")])
+    storage.upsert(medicine(1, "A", stock=9))
+    # App mati sebelum compact, lalu file data diganti dari luar
+    rewrite_externally(path, [medicine(1, "A", stock=100)])
+    storage, records = reopen(path)
+    assert records[1]['stock'] == 100
+    assert not os.path.exists(storage.journal_path)
+    # Journal baru dimulai dari snapshot yang berlaku dan tetap diputar ulang
+    storage.upsert(medicine(1, "A", stock=99))
+    _, records = reopen(path)
+    assert records[1]['stock'] == 99
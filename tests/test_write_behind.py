@@ -0,0 +1,118 @@
+import threading
+import time
+
+from storage import MemoryStorage, WriteBehindStorage
+
+
+def medicine(medicine_id, stock=10):
+    return {'id': medicine_id, 'name': f"Obat {medicine_id}", 'dose': "1 tablet", 'stock': stock,
+            'times': ["08:00"]}
+
+
+class FlakyStorage(MemoryStorage):
+    """MemoryStorage whose writes fail `failures` times and can be held at a gate"""
+
+    def __init__(self, failures=0):
+        super().__init__()
+        self.failures = failures
+        self.gate = threading.Event()
+        self.gate.set()
+        self.entered = threading.Event()
+        self.batches = []
+        self.closed = False
+
+    def _write(self):
+        self.entered.set()
+        self.gate.wait()
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+
+    def save_all(self, medicines):
+        self._write()
+        super().save_all(medicines)
+
+    def write_batch(self, upserts, deletes, next_id=None):
+        self._write()
+        self.batches.append(([med['id'] for med in upserts], list(deletes)))
+        super().write_batch(upserts, deletes, next_id)
+
+    def close(self):
+        self.closed = True
+
+
+def stocks(storage):
+    return {med['id']: med['stock'] for med in storage.load_all()}
+
+
+def test_burst_is_coalesced_and_last_state_wins():
+    inner = FlakyStorage()
+    writer = WriteBehindStorage(inner, window=10)
+    for stock in range(1, 6):
+        writer.upsert(medicine(1, stock))
+    writer.upsert(medicine(2))
+    writer.delete(2)
+    writer.upsert(medicine(3))
+    writer.delete(3)
+    writer.upsert(medicine(3, stock=7))
+    writer.save_next_id(4)
+    assert writer.flush(timeout=5)
+    assert stocks(inner) == {1: 5, 3: 7}
+    assert inner.load_next_id() == 4
+    # Satu batch untuk semuanya (flush tidak menunggu window)
+    assert inner.batches == [([1, 3], [2])]
+    assert writer.metrics()['coalesced'] == 7
+    writer.close()
+
+
+def test_flush_blocks_until_the_write_is_done():
+    inner = FlakyStorage()
+    inner.gate.clear()
+    writer = WriteBehindStorage(inner, window=0)
+    writer.upsert(medicine(1))
+    assert inner.entered.wait(5)
+    assert not writer.flush(timeout=0.1)   # penulisan masih tertahan
+
+    done = threading.Event()
+    threading.Thread(target=lambda: writer.flush() and done.set(), daemon=True).start()
+    assert not done.wait(0.1)
+    inner.gate.set()
+    assert done.wait(5)
+    assert stocks(inner) == {1: 10}
+    writer.close()
+
+
+def test_failed_write_is_retried_not_dropped():
+    inner = FlakyStorage(failures=2)
+    writer = WriteBehindStorage(inner, window=0.01)
+    writer.save_all([medicine(1), medicine(2)])
+    writer.upsert(medicine(3))
+    assert writer.flush(timeout=5)
+    assert stocks(inner) == {1: 10, 2: 10, 3: 10}
+    assert writer.metrics()['errors'] == 2
+    writer.close()
+
+
+def test_newer_change_wins_over_requeued_failed_write():
+    inner = FlakyStorage(failures=1)
+    inner.gate.clear()
+    writer = WriteBehindStorage(inner, window=0.01)
+    writer.upsert(medicine(1, stock=5))
+    assert inner.entered.wait(5)
+    # Berubah lagi selama penulisan (yang akan gagal) berjalan
+    writer.upsert(medicine(1, stock=4))
+    inner.gate.set()
+    assert writer.flush(timeout=5)
+    assert stocks(inner) == {1: 4}
+    writer.close()
+
+
+def test_close_flushes_and_closes_the_inner_storage():
+    inner = FlakyStorage()
+    writer = WriteBehindStorage(inner, window=10)
+    started = time.monotonic()
+    writer.upsert(medicine(1))
+    writer.close()
+    assert time.monotonic() - started < 5
+    assert stocks(inner) == {1: 10}
+    assert inner.closed
@@ -0,0 +1,221 @@
+"""MediMate's look: one application-wide stylesheet and shared fonts.
+
+Widgets that are created many times (schedule rows, stat cards, sidebar
+buttons) only set an object name and, where their look depends on state,
+a dynamic property such as `taken` or `active`. Qt parses STYLESHEET
+once when it is set on the QApplication instead of re-parsing a CSS
+string for every widget.
+"""
+from functools import lru_cache
+
+from PyQt6.QtGui import QFont
+
+FONT_FAMILY = "Segoe UI"
+
+# Warna gradient kartu statistik dashboard, per nama kartu
+STAT_CARD_GRADIENTS = {
+    "total": ("#FF6B9D", "#C44569"),
+    "today": ("#4FACFE", "#00F2FE"),
+    "low_stock": ("#FA709A", "#FEE140"),
+}
+
+
+@lru_cache(maxsize=None)
+def app_font(size, weight=QFont.Weight.Normal, family=FONT_FAMILY):
+    """Shared QFont instance; setFont copies it, so sharing is safe"""
+    return QFont(family, size, weight)
+
+
+def set_state(widget, name, value):
+    """Set a dynamic property and re-apply the stylesheet rules that use it"""
+    widget.setProperty(name, value)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
+
+
+def _stat_card_rules():
+    return "".join(f"""
+    QFrame#statCard[accent="{name}"] {{
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+            stop:0 {start}, stop:1 {end});
+    }}""" for name, (start, end) in STAT_CARD_GRADIENTS.items())
+
+
+STYLESHEET = """
+    QMainWindow {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+            stop:0 #f093fb, stop:0.5 #f5576c, stop:1 #4facfe);
+    }
+
+    /* Sidebar dan area konten */
+    QFrame#panel {
+        background: rgba(255, 255, 255, 0.95);
+        border-radius: 25px;
+        border: 1px solid rgba(255, 255, 255, 0.3);
+    }
+    QFrame#userCard {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 rgba(102, 126, 234, 0.1), stop:1 rgba(118, 75, 162, 0.1));
+        border-radius: 15px;
+        padding: 15px;
+    }
+    QPushButton#sidebarButton {
+        background-color: transparent;
+        color: #4A5568;
+        border: none;
+        border-radius: 15px;
+        text-align: left;
+        padding-left: 20px;
+    }
+    QPushButton#sidebarButton:hover {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 rgba(102, 126, 234, 0.1), stop:1 rgba(118, 75, 162, 0.1));
+        color: #2D3748;
+    }
+    QPushButton#sidebarButton[active="true"] {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 #667eea, stop:1 #764ba2);
+        color: white;
+        font-weight: bold;
+    }
+    QPushButton#sidebarButton[active="true"]:hover {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 #5a67d8, stop:1 #6b46c1);
+    }
+
+    /* Kartu statistik */
+    QFrame#statCard {
+        border-radius: 25px;
+        border: none;
+    }
+    QLabel#statValue, QLabel#statTitle {
+        background: transparent;
+        color: white;
+        border: none;
+        margin: 0px;
+        padding: 0px;
+    }
+    QLabel#statTitle {
+        color: rgba(255, 255, 255, 0.95);
+    }""" + _stat_card_rules() + """
+
+    /* Kotak jadwal dan daftar obat */
+    QFrame#sectionCard {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 rgba(255, 255, 255, 0.9), stop:1 rgba(247, 250, 252, 0.9));
+        border-radius: 20px;
+        border: 1px solid rgba(226, 232, 240, 0.5);
+    }
+    QFrame#listCard {
+        background: white;
+        border-radius: 20px;
+        border: 1px solid rgba(226, 232, 240, 0.8);
+    }
+
+    /* Baris jadwal di dashboard (MedicationRow) */
+    QFrame#medicationRow {
+        background-color: white;
+        border: 1px solid rgba(226, 232, 240, 0.8);
+        margin: 8px 0px;
+        border-radius: 15px;
+    }
+    QFrame#medicationTime {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+            stop:0 #667eea, stop:1 #764ba2);
+        border-radius: 12px;
+        border: none;
+    }
+    QLabel#medicationTimeLabel {
+        color: white;
+        background: transparent;
+        border: none;
+    }
+    QFrame#medicationInfo {
+        background: transparent;
+        border: none;
+    }
+    QLabel#medicationName {
+        color: #2D3748;
+        background: transparent;
+        border: none;
+        padding: 2px 0px;
+    }
+    QPushButton#medicationStatus {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 #F56565, stop:1 #E53E3E);
+        color: white;
+        border: none;
+        border-radius: 20px;
+        font-weight: bold;
+    }
+    QPushButton#medicationStatus:hover {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 #E53E3E, stop:1 #C53030);
+    }
+    QPushButton#medicationStatus[taken="true"] {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 #48BB78, stop:1 #38A169);
+    }
+    QPushButton#medicationStatus[taken="true"]:hover {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 #38A169, stop:1 #2F855A);
+    }
+
+    /* Baris halaman Jadwal Hari Ini */
+    QFrame#scheduleRow {
+        background: white;
+        border-radius: 12px;
+        border: 1px solid #E2E8F0;
+        margin-bottom: 10px;
+    }
+    QLabel#scheduleTime {
+        color: #667eea;
+        background: transparent;
+        border: none;
+    }
+    QLabel#scheduleMedicine {
+        color: #2D3748;
+        background: transparent;
+        border: none;
+    }
+    QLabel#statusBadge {
+        background: #FFF5F5;
+        color: #E53E3E;
+        border: 1.5px solid #FEB2B2;
+        border-radius: 12px;
+        padding: 4px 16px;
+        min-width: 90px;
+    }
+    QLabel#statusBadge[taken="true"] {
+        background: #F0FFF4;
+        color: #38A169;
+        border: 1.5px solid #68D391;
+    }
+
+    /* Grup dosis di jendela alarm */
+    QFrame#alarmGroup {
+        background: rgba(255, 255, 255, 0.9);
+        border-radius: 15px;
+    }
+    QLabel#alarmGroupHeader {
+        color: #2D3748;
+        background: transparent;
+    }
+    QLabel#alarmGroupInfo {
+        color: #4A5568;
+        background: transparent;
+    }
+    QPushButton#acknowledgeButton {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 #43E97B, stop:1 #38F9D7);
+        color: white;
+        border: none;
+        border-radius: 12px;
+        padding: 12px 18px;
+        font-size: 15px;
+    }
+    QPushButton#acknowledgeButton:hover {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 #38D86A, stop:1 #32E5C4);
+    }
+"""